@@ -15,6 +15,7 @@
 import logging
 import pytest
 
+from mos_tests.functions import cinder_bulk
 from mos_tests.functions import common
 
 logger = logging.getLogger(__name__)
@@ -139,18 +140,6 @@ def check_backup_status(os_conn, backup, status='available', positive=True):
     return backup_status == status
 
 
-def check_all_backups_statuses(
-        os_conn, backups, status='available', positive=True):
-    for backup in backups:
-        if not check_backup_status(os_conn, backup, status, positive):
-            return False
-    return True
-
-
-def is_backup_deleted(os_conn, backup):
-    return len(os_conn.cinder.backups.findall(id=backup.id)) == 0
-
-
 def mount_volume(os_conn, env, vm, volume, keypair):
     os_conn.nova.volumes.create_server_volume(vm.id, volume.id)
     common.wait(
@@ -186,41 +175,28 @@ def test_creating_multiple_snapshots(os_conn, quota, volume):
     """
     #  Creation of 70 snapshots
     logger.info('Create 70 snapshots')
-    snp_list_1 = []
-    for num in range(70):
-        logger.info('{} snapshot is creating'.format(num + 1))
-        snapshot = os_conn.cinder.volume_snapshots.create(
-            volume.id, name='1st_creation_{0}'.format(num))
-        snp_list_1.append(snapshot)
-    common.wait(
-        lambda: check_all_snapshots_statuses(os_conn, snp_list_1),
-        timeout_seconds=800,
-        waiting_for='all snapshots to become in available status')
+    driver_1 = cinder_bulk.BulkDriver(os_conn.cinder.volume_snapshots)
+    snp_list_1 = driver_1.create(
+        [{'volume_id': volume.id, 'name': '1st_creation_{0}'.format(num)}
+         for num in range(70)])
+    driver_1.wait_status(snp_list_1, timeout=800)
 
     #  Delete all snapshots
     logger.info('Delete all snapshots')
-    for snapshot in snp_list_1:
-        os_conn.cinder.volume_snapshots.delete(snapshot)
+    driver_1.delete(snp_list_1)
 
     #  Launch creation of 50 snapshot without waiting of deletion
     logger.info('Launch creation of 50 snapshot without waiting '
                 'of deletion')
-    snp_list_2 = []
-
-    for num in range(50):
-        logger.info('{} snapshot is creating'.format(num + 1))
-        snapshot = os_conn.cinder.volume_snapshots.create(
-            volume.id, name='2nd_creation_{0}'.format(num))
-        snp_list_2.append(snapshot)
+    driver_2 = cinder_bulk.BulkDriver(os_conn.cinder.volume_snapshots)
+    snp_list_2 = driver_2.create(
+        [{'volume_id': volume.id, 'name': '2nd_creation_{0}'.format(num)}
+         for num in range(50)])
 
-    common.wait(
-        lambda: all([is_snapshot_deleted(os_conn, x) for x in snp_list_1]),
-        timeout_seconds=1800,
-        waiting_for='old snapshots to be deleted')
-    common.wait(
-        lambda: check_all_snapshots_statuses(os_conn, snp_list_2),
-        timeout_seconds=1800,
-        waiting_for='new snapshots to become in available status')
+    driver_1.wait_deleted(snp_list_1, timeout=1800)
+    driver_2.wait_status(snp_list_2, timeout=1800)
+    driver_1.log_stats()
+    driver_2.log_stats()
 
 
 # NOTE(rpromyshlennikov): this test is not marked as @pytest.mark.undestructive
@@ -250,43 +226,45 @@ def test_create_backup_snapshot(os_conn, volume):
                 waiting_for='Backup to become in available status')
 
 
+@pytest.yield_fixture
+def backup_volumes(os_conn):
+    """10 empty volumes, created in parallel"""
+    driver = cinder_bulk.BulkDriver(os_conn.cinder.volumes)
+    volumes = driver.create([{'size': 1, 'name': 'volume_{}'.format(i)}
+                             for i in range(1, 11)])
+    driver.wait_status(volumes, timeout=600)
+    yield volumes
+    driver.delete(volumes)
+    driver.wait_deleted(volumes, timeout=600)
+
+
 @pytest.mark.undestructive
 @pytest.mark.check_env_('is_ceph_enabled')
 @pytest.mark.testrail_id('857367')
-def test_delete_backups_in_parallel(os_conn, volume):
+def test_delete_backups_in_parallel(os_conn, backup_volumes):
     """This test case checks deletion of 10 backups in parallel
 
     Steps:
-    1. Create 10 backups
-    2. Check that all backups are in available status
-    3. Delete 10 backups in parallel
-    4. Check that all backups are deleted from the backups list
+    1. Create 10 volumes in parallel
+    2. Create backup of each volume in parallel (Cinder backs up volume
+        only when it is available, so backups of one volume can't be created
+        in parallel)
+    3. Check that all backups are in available status
+    4. Delete 10 backups in parallel
+    5. Check that all backups are deleted from the backups list
     """
-    logger.info('Create 10 backups:')
-    backups = []
-    for i in range(1, 11):
-        logger.info('Create backup #{}'.format(i))
-        backup = os_conn.cinder.backups.create(
-            volume.id, name='backup_{}'.format(i))
-        backups.append(backup)
-        common.wait(lambda: check_volume_status(os_conn, volume),
-                    timeout_seconds=300,
-                    waiting_for='volume to become in available status')
+    driver = cinder_bulk.BulkDriver(os_conn.cinder.backups)
 
-    common.wait(
-        lambda: check_all_backups_statuses(os_conn, backups),
-        timeout_seconds=600,
-        waiting_for='all backups to become in available status')
+    logger.info('Create 10 backups in parallel')
+    backups = driver.create([{'volume_id': volume.id,
+                              'name': 'backup_{}'.format(i)}
+                             for i, volume in enumerate(backup_volumes, 1)])
+    driver.wait_status(backups, timeout=600)
 
     logger.info('Delete 10 backups in parallel')
-    for i, backup in enumerate(backups, 1):
-        logger.info('Delete backup #{}'.format(i))
-        os_conn.cinder.backups.delete(backup)
-
-    common.wait(
-        lambda: all([is_backup_deleted(os_conn, x) for x in backups]),
-        timeout_seconds=1200,
-        waiting_for='all backups to be deleted')
+    driver.delete(backups)
+    driver.wait_deleted(backups, timeout=1200)
+    driver.log_stats()
 
 
 @pytest.mark.undestructive
@@ -302,29 +280,18 @@ def test_create_delete_volumes_in_parallel(os_conn):
     4. Check that all volumes are deleted from the volumes list
     """
     image = os_conn.nova.images.find(name='TestVM')
-    volumes = []
-
-    logger.info('Create 10 volumes in parallel:')
-    for i in range(1, 11):
-        logger.info('Create volume #{}'.format(i))
-        volume = os_conn.cinder.volumes.create(1, name='volume_{}'.format(i),
-                                               imageRef=image.id)
-        volumes.append(volume)
+    driver = cinder_bulk.BulkDriver(os_conn.cinder.volumes)
 
-    common.wait(
-        lambda: check_all_volumes_statuses(os_conn, volumes),
-        timeout_seconds=1200,
-        waiting_for='all volumes to become in available status')
+    logger.info('Create 10 volumes in parallel')
+    volumes = driver.create([{'size': 1,
+                              'name': 'volume_{}'.format(i),
+                              'imageRef': image.id} for i in range(1, 11)])
+    driver.wait_status(volumes, timeout=1200)
 
     logger.info('Delete 10 volumes in parallel')
-    for i, volume in enumerate(volumes, 1):
-        logger.info('Delete volume #{}'.format(i))
-        volume.delete()
-
-    common.wait(
-        lambda: all([is_volume_deleted(os_conn, x) for x in volumes]),
-        timeout_seconds=1200,
-        waiting_for='all volumes to be deleted')
+    driver.delete(volumes)
+    driver.wait_deleted(volumes, timeout=1200)
+    driver.log_stats()
 
 
 @pytest.mark.undestructive
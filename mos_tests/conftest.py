@@ -26,8 +26,9 @@ from mos_tests.environment.fuel_client import FuelClient
 from mos_tests.functions.common import gen_temp_file
 from mos_tests.functions.common import get_os_conn
 from mos_tests.functions.common import wait
-from mos_tests.functions import file_cache
+from mos_tests.functions import image_registry
 from mos_tests.functions import os_cli
+from mos_tests.functions import remote_files
 from mos_tests import settings
 
 
@@ -473,15 +474,23 @@ def openstack_client(controller_remote):
     return os_cli.OpenStack(controller_remote)
 
 
-@pytest.yield_fixture
+@pytest.yield_fixture(scope='session', autouse=True)
+def shared_images():
+    """Delete shared images on session end"""
+    yield image_registry.registry
+    image_registry.registry.cleanup()
+
+
+@pytest.yield_fixture(scope='session', autouse=True)
+def remote_test_files():
+    """Remove test files generated on nodes on session end"""
+    yield remote_files.factory
+    remote_files.factory.cleanup()
+
+
+@pytest.fixture
 def ubuntu_image_id(os_conn):
-    logger.info('Creating ubuntu image')
-    image = os_conn.glance.images.create(name="image_ubuntu",
-                                         disk_format='qcow2',
-                                         container_format='bare')
-    with file_cache.get_file(settings.UBUNTU_QCOW2_URL) as f:
-        os_conn.glance.images.upload(image.id, f)
-
-    logger.info('Ubuntu image created')
-    yield image.id
-    os_conn.glance.images.delete(image.id)
+    image = image_registry.get_image(os_conn.glance,
+                                     settings.UBUNTU_QCOW2_URL,
+                                     name="image_ubuntu")
+    return image.id
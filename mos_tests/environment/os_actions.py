@@ -12,12 +12,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from contextlib import closing
 import logging
+from multiprocessing.dummy import Pool
 import random
-import re
-import time
+import socket
 
 from cinderclient import client as cinderclient
+from contextlib2 import ExitStack
 from contextlib2 import suppress
 from dateutil.parser import parse as dateparse
 from glanceclient.v2.client import Client as GlanceClient
@@ -33,14 +35,22 @@ from novaclient import exceptions as nova_exceptions
 import paramiko
 import six
 
+from mos_tests.environment.ssh import NetNsForwardProxy
 from mos_tests.environment.ssh import NetNsProxy
+from mos_tests.environment.ssh import read_channel_result
+from mos_tests.environment.ssh import read_ssh_banner
 from mos_tests.environment.ssh import SSHClient
+from mos_tests.functions import cinder_bulk
+from mos_tests.functions import console_log
 from mos_tests.functions.common import gen_temp_file
 from mos_tests.functions.common import wait
 from mos_tests.functions import os_cli
+from mos_tests import settings
 
 logger = logging.getLogger(__name__)
 
+CLOUD_INIT_FINISH_MARK = 'Cloud-init .* finished'
+
 
 class InstanceError(Exception):
     def __init__(self, instance):
@@ -100,6 +110,8 @@ class OpenStackActions(object):
         self.heat = HeatClient(endpoint=endpoint_url, token=token)
 
         self.env = env
+        # {server id: cloud-init finish mark follower}
+        self._cloud_init_followers = {}
 
     def _get_cirros_image(self):
         for image in self.glance.images.list():
@@ -152,7 +164,30 @@ class OpenStackActions(object):
              waiting_for='instances to become at ACTIVE status')
 
     def wait_servers_ssh_ready(self, servers, timeout=10 * 60):
-        wait(lambda: all(self.is_server_ssh_ready(x) for x in servers),
+        """Wait for SSH banner from all servers
+
+        Proxies of each server are got once, pending servers are checked
+        concurrently, see `is_server_ssh_ready`.
+        """
+        pending = list(servers)
+        targets = {}
+
+        def is_ready(server):
+            if server.id not in targets:
+                targets[server.id] = self.get_instance_proxies(
+                    self.env, server, proxy_cls=NetNsForwardProxy)
+            return self.is_server_ssh_ready(server, targets[server.id])
+
+        def predicate():
+            pool = Pool(min(10, len(pending)))
+            try:
+                ready = pool.map(is_ready, pending)
+            finally:
+                pool.close()
+            pending[:] = [x for x, y in zip(pending, ready) if not y]
+            return not pending
+
+        wait(predicate,
              timeout_seconds=timeout,
              waiting_for='instances to be ssh ready')
 
@@ -162,9 +197,7 @@ class OpenStackActions(object):
              waiting_for='instances to be deleted')
 
     def wait_marker_in_servers_log(self, servers, marker, timeout=10 * 60):
-        wait(lambda: all(marker in x.get_console_output() for x in servers),
-             timeout_seconds=timeout,
-             waiting_for='marker appears in all servers log')
+        console_log.wait_marker(self.nova, servers, marker, timeout=timeout)
 
     def create_server(self, name, image_id=None, flavor=1, userdata=None,
                       files=None, key_name=None, timeout=600,
@@ -188,14 +221,34 @@ class OpenStackActions(object):
             self.wait_servers_ssh_ready([srv], timeout=timeout)
         return self.get_instance_detail(srv.id)
 
-    def is_server_ssh_ready(self, server):
-        """Check ssh connect to server"""
+    def is_server_ssh_ready(self, server, target=None, timeout=10):
+        """Check that SSH server on instance sends banner
+
+        Key exchange and authentication are not attempted. Instance with
+        fixed ip is reached through shared forwarder in namespace regardless
+        of `NETNS_PROXY_MODE`, so all checks in namespace go through single
+        channel instead of new SSH session and `nc` for each check.
 
-        ssh_client = self.ssh_to_instance(self.env,
-                                          server,
-                                          username='fake',
-                                          password='fake')
-        return bool(ssh_client.check_connection())
+        :param target: result of `get_instance_proxies` for server
+        """
+        if target is None:
+            target = self.get_instance_proxies(self.env, server,
+                                               proxy_cls=NetNsForwardProxy)
+        vm_ip, proxies = target
+        for proxy in proxies or [None]:
+            try:
+                if proxy is None:
+                    conn = closing(socket.create_connection(
+                        (vm_ip, 22), timeout=timeout))
+                else:
+                    conn = proxy
+                with conn as sock:
+                    if read_ssh_banner(sock, timeout=timeout) is not None:
+                        return True
+            except Exception as e:
+                logger.debug('Instance {0} SSH is unavailable through {1}: '
+                             '{2}'.format(server.id, proxy or vm_ip, e))
+        return False
 
     def is_server_deleted(self, server_id):
         try:
@@ -743,54 +796,47 @@ class OpenStackActions(object):
                 logger.info('the net {} is not deletable'
                             .format(net))
 
-    def execute_through_host(self, ssh, vm_host, cmd, creds=()):
-        logger.debug("Making intermediate transport")
-        intermediate_transport = ssh._ssh.get_transport()
+    def execute_through_host(self, ssh, vm_host, cmd, creds=(),
+                             timeout=60 * 60):
+        """Execute command on VM through direct-tcpip channel from host
 
+        :param ssh: connected SSHClient to intermediate host
+        :param vm_host: VM ip address, reachable from intermediate host
+        :param cmd: command to execute
+        :param creds: tuple (username, password) for VM
+        :param timeout: max command execution time in seconds
+        :returns: dict with `exit_code`, whole `stdout` and `stderr`
+        """
         logger.debug("Opening channel to VM")
-        intermediate_channel = intermediate_transport.open_channel(
+        intermediate_channel = ssh._ssh.get_transport().open_channel(
             'direct-tcpip', (vm_host, 22), (ssh.host, 0))
-        logger.debug("Opening paramiko transport")
-        transport = paramiko.Transport(intermediate_channel)
-        logger.debug("Starting client")
-        transport.start_client()
-        logger.info("Passing authentication to VM: {}".format(creds))
-        if not creds:
-            creds = ('cirros', 'cubswin:)')
-        transport.auth_password(creds[0], creds[1])
-
-        logger.debug("Opening session")
-        channel = transport.open_session()
-        logger.info("Executing command: {}".format(cmd))
-        channel.exec_command(cmd)
-
-        result = {
-            'stdout': [],
-            'stderr': [],
-            'exit_code': 0
+        with ExitStack() as stack:
+            transport = stack.enter_context(
+                paramiko.Transport(intermediate_channel))
+            stack.callback(intermediate_channel.close)
+            transport.start_client()
+            if not creds:
+                creds = ('cirros', 'cubswin:)')
+            logger.info("Passing authentication to VM: {}".format(creds))
+            transport.auth_password(creds[0], creds[1])
+
+            channel = stack.enter_context(transport.open_session())
+            logger.info("Executing command: {}".format(cmd))
+            channel.exec_command(cmd)
+            result = read_channel_result(channel, cmd, timeout=timeout)
+        return {
+            'stdout': b''.join(result['stdout']),
+            'stderr': b''.join(result['stderr']),
+            'exit_code': result['exit_code'],
         }
 
-        logger.debug("Receiving exit_code")
-        result['exit_code'] = channel.recv_exit_status()
-        logger.debug("Receiving stdout")
-        result['stdout'] = channel.recv(1024)
-        logger.debug("Receiving stderr")
-        result['stderr'] = channel.recv_stderr(1024)
-
-        logger.debug("Closing channel")
-        channel.close()
-
-        return result
+    def get_instance_proxies(self, env, vm, proxy_node=None, vm_ip=None,
+                             proxy_cls=None):
+        """Returns tuple (instance ip, list of proxies to reach it)
 
-    def ssh_to_instance(self,
-                        env,
-                        vm,
-                        vm_keypair=None,
-                        username='cirros',
-                        password=None,
-                        proxy_node=None,
-                        vm_ip=None):
-        """Returns direct ssh client to instance via proxy"""
+        :param proxy_cls: class of proxies to instance with fixed ip, by
+            default it is chosen by `NETNS_PROXY_MODE` setting
+        """
         # Update vm data
         vm.get()
         instance_ips = {ip['addr']: {'type': ip['OS-EXT-IPS:type'],
@@ -827,12 +873,31 @@ class OpenStackActions(object):
             else:
                 proxy_nodes = [proxy_node]
 
+            if proxy_cls is None:
+                if settings.NETNS_PROXY_MODE == 'forwarder':
+                    proxy_cls = NetNsForwardProxy
+                else:
+                    proxy_cls = NetNsProxy
             for node in proxy_nodes:
                 for pkey in env.admin_ssh_keys:
                     ip = env.find_node_by_fqdn(node).data['ip']
-                    proxy = NetNsProxy(ip=ip, pkey=pkey, ns=dhcp_namespace,
-                                       proxy_to_ip=vm_ip)
+                    proxy = proxy_cls(ip=ip, pkey=pkey, ns=dhcp_namespace,
+                                      proxy_to_ip=vm_ip)
                     proxies.append(proxy)
+        return vm_ip, proxies
+
+    def ssh_to_instance(self,
+                        env,
+                        vm,
+                        vm_keypair=None,
+                        username='cirros',
+                        password=None,
+                        proxy_node=None,
+                        vm_ip=None):
+        """Returns direct ssh client to instance via proxy"""
+        vm_ip, proxies = self.get_instance_proxies(env, vm,
+                                                   proxy_node=proxy_node,
+                                                   vm_ip=vm_ip)
         instance_keys = []
         if vm_keypair is not None:
             instance_keys.append(paramiko.RSAKey.from_private_key(six.StringIO(
@@ -1075,10 +1140,8 @@ class OpenStackActions(object):
              sleep_seconds=10,
              waiting_for=('volumes [{names}] '
                           'to became available').format(names=names))
-        for volume in volumes:
-            self.cinder.volumes.delete(volume.id)
-            # Too fast deletion requests make deletion too long
-            time.sleep(2)
+        # Too fast deletion requests make deletion too long
+        cinder_bulk.BulkDriver(self.cinder.volumes, rate=0.5).delete(volumes)
 
         self.wait_volumes_deleted(volumes)
 
@@ -1092,15 +1155,20 @@ class OpenStackActions(object):
             waiting_for='volumes [{names}] to be deleted'.format(names=names))
 
     def is_server_cloud_init_finished(self, vm):
-        finish_mark = 'Cloud-init .* finished'
-        vm.get()
-        if re.findall(finish_mark, vm.get_console_output()):
-            return True
-        else:
-            return False
+        """Check cloud-init finish mark in console log
+
+        Follower of server log is kept between calls, so repeated checks
+        request only tail of log.
+        """
+        follower = self._cloud_init_followers.get(vm.id)
+        if follower is None:
+            follower = console_log.ConsoleFollower(self.nova, [vm],
+                                                   CLOUD_INIT_FINISH_MARK)
+            self._cloud_init_followers[vm.id] = follower
+        return vm.id in follower.found or follower.poll_one(vm)
 
     def wait_servers_cloud_init_finished(self, vms, timeout=5 * 60):
         """Wait till vm will be booted and ready"""
-        wait(lambda: all(self.is_server_cloud_init_finished(x) for x in vms),
-             timeout_seconds=timeout,
-             waiting_for='cloud init finish')
+        follower = console_log.ConsoleFollower(self.nova, vms,
+                                               CLOUD_INIT_FINISH_MARK)
+        follower.wait(timeout=timeout, waiting_for='cloud init finish')
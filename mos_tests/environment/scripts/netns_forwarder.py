@@ -0,0 +1,180 @@
+#!/usr/bin/python
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+# Multiplexing TCP forwarder. It should be started inside net namespace
+# (`ip netns exec <ns> python -u netns_forwarder.py`) and talks with client
+# through stdin/stdout with frames: header (connection id, operation,
+# payload length) followed by payload. Only standard library is used, because
+# script is executed on cloud nodes. All sockets are non-blocking, data for
+# each connection is buffered until its socket is writable, so slow
+# connection doesn't stall others.
+
+import errno
+import os
+import select
+import socket
+import struct
+import sys
+
+HEADER = struct.Struct('!IBI')
+OPEN, DATA, CLOSE, OPENED, ERROR = range(1, 6)
+BUFFER_SIZE = 64 * 1024
+
+
+class Forwarder(object):
+
+    def __init__(self):
+        self.stdin = sys.stdin.fileno()
+        self.stdout = sys.stdout.fileno()
+        self.sockets = {}
+        self.connecting = {}
+        self.ids = {}
+        # {socket: data to send}
+        self.pending = {}
+        # Sockets to close after pending data is sent
+        self.closing = set()
+        self.buffer = b''
+
+    def send_frame(self, conn_id, op, payload=b''):
+        data = HEADER.pack(conn_id, op, len(payload)) + payload
+        while data:
+            written = os.write(self.stdout, data)
+            data = data[written:]
+
+    def drop(self, conn_id, notify=True):
+        sock = self.sockets.pop(conn_id, None)
+        if sock is None:
+            return
+        self.connecting.pop(sock, None)
+        self.ids.pop(sock, None)
+        self.pending.pop(sock, None)
+        self.closing.discard(sock)
+        sock.close()
+        if notify:
+            self.send_frame(conn_id, CLOSE)
+
+    def open(self, conn_id, address):
+        host, port = address.decode('ascii').rsplit(':', 1)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(0)
+        code = sock.connect_ex((host, int(port)))
+        if code not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            sock.close()
+            self.send_frame(conn_id, ERROR, os.strerror(code).encode('ascii'))
+            return
+        self.sockets[conn_id] = sock
+        self.ids[sock] = conn_id
+        self.connecting[sock] = conn_id
+        self.pending[sock] = bytearray()
+
+    def finish_connect(self, sock):
+        conn_id = self.connecting.pop(sock)
+        code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if code != 0:
+            self.drop(conn_id, notify=False)
+            self.send_frame(conn_id, ERROR, os.strerror(code).encode('ascii'))
+            return
+        self.send_frame(conn_id, OPENED)
+        self.flush(sock)
+
+    def flush(self, sock):
+        """Send as much pending data as socket accepts now"""
+        conn_id = self.ids[sock]
+        data = self.pending[sock]
+        if data and sock not in self.connecting:
+            try:
+                sent = sock.send(data)
+            except socket.error as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                self.drop(conn_id)
+                return
+            del data[:sent]
+        if not data and sock in self.closing:
+            self.drop(conn_id, notify=False)
+
+    def handle_frame(self, conn_id, op, payload):
+        if op == OPEN:
+            self.open(conn_id, payload)
+        elif op == DATA:
+            sock = self.sockets.get(conn_id)
+            if sock is None:
+                return
+            self.pending[sock].extend(payload)
+            self.flush(sock)
+        elif op == CLOSE:
+            sock = self.sockets.get(conn_id)
+            if sock is None:
+                return
+            self.closing.add(sock)
+            self.flush(sock)
+
+    def read_client(self):
+        chunk = os.read(self.stdin, BUFFER_SIZE)
+        if not chunk:
+            return False
+        self.buffer += chunk
+        while len(self.buffer) >= HEADER.size:
+            conn_id, op, length = HEADER.unpack(self.buffer[:HEADER.size])
+            end = HEADER.size + length
+            if len(self.buffer) < end:
+                break
+            payload = self.buffer[HEADER.size:end]
+            self.buffer = self.buffer[end:]
+            self.handle_frame(conn_id, op, payload)
+        return True
+
+    def read_socket(self, sock):
+        conn_id = self.ids.get(sock)
+        if conn_id is None:
+            return
+        try:
+            data = sock.recv(BUFFER_SIZE)
+        except socket.error as e:
+            if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return
+            data = b''
+        if data:
+            self.send_frame(conn_id, DATA, data)
+        else:
+            self.drop(conn_id)
+
+    def run(self):
+        while True:
+            established = [x for x in self.ids if x not in self.connecting]
+            writers = list(self.connecting) + [x for x in established
+                                               if self.pending[x]]
+            readable, writable, _ = select.select(
+                [self.stdin] + established, writers, [])
+            for sock in writable:
+                if sock not in self.ids:
+                    continue
+                if sock in self.connecting:
+                    self.finish_connect(sock)
+                else:
+                    self.flush(sock)
+            for item in readable:
+                if item == self.stdin:
+                    if not self.read_client():
+                        return
+                else:
+                    self.read_socket(item)
+
+
+if __name__ == '__main__':
+    try:
+        Forwarder().run()
+    except KeyboardInterrupt:
+        sys.exit(1)
@@ -12,6 +12,8 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import atexit
+from collections import defaultdict
 from contextlib import contextmanager
 import functools
 import itertools
@@ -19,16 +21,28 @@ import logging
 import os
 import posixpath
 import select
+import socket
 import stat
+import struct
+import threading
 import time
+import uuid
 
 from contextlib2 import ExitStack
+from contextlib2 import suppress
 import paramiko
 import six
 
 
 logger = logging.getLogger(__name__)
 
+FORWARDER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'scripts', 'netns_forwarder.py')
+
+# Should be in sync with scripts/netns_forwarder.py
+FRAME_HEADER = struct.Struct('!IBI')
+OPEN, DATA, CLOSE, OPENED, ERROR = range(1, 6)
+
 
 def retry(count=10, delay=1):
     """Retry until no exceptions decorator"""
@@ -93,6 +107,72 @@ class CommandResult(dict):
         return self._list_to_string('stderr')
 
 
+def read_channel_result(chan, command, timeout=60 * 60):
+    """Read channel stdout and stderr until command finished
+
+    :param chan: paramiko channel with executed command
+    :param command: executed command (for result and error message)
+    :param timeout: max command execution time in seconds
+    :rtype: CommandResult
+    """
+    stdout_buf = b''
+    stderr_buf = b''
+
+    start = time.time()
+    while not chan.closed or chan.recv_ready() or chan.recv_stderr_ready():
+        select.select([chan], [], [chan], 60)
+
+        if chan.recv_ready():
+            stdout_buf += chan.recv(64 * 1024)
+        if chan.recv_stderr_ready():
+            stderr_buf += chan.recv_stderr(64 * 1024)
+
+        if time.time() > start + timeout:
+            chan.close()
+            raise Exception('Executing `{cmd}` is too long '
+                            '(more than {timeout} seconds)'.format(
+                                cmd=command, timeout=timeout))
+
+    result = CommandResult({
+        'stdout': stdout_buf.splitlines(True),
+        'stderr': stderr_buf.splitlines(True),
+        'exit_code': chan.recv_exit_status()
+    })
+    result.command = command
+    return result
+
+
+def read_ssh_banner(sock, timeout=10):
+    """Read SSH protocol banner from connected socket-like object
+
+    SSH server sends banner line (`SSH-2.0-...`) right after connection is
+    accepted, so server readiness can be checked without key exchange and
+    authentication.
+
+    :param sock: socket, paramiko channel or ForwardedSocket
+    :return: banner string or None if connection is closed without it
+    """
+    end = time.time() + timeout
+    buf = b''
+    while True:
+        lines = buf.split(b'\n')
+        for line in lines[:-1]:
+            if line.startswith(b'SSH-'):
+                return line.strip().decode('utf-8', 'replace')
+        # Lines before banner are allowed, but not endless
+        if len(buf) > 8 * 1024:
+            return None
+        remaining = end - time.time()
+        if remaining <= 0:
+            raise socket.timeout('SSH banner is not received in {0} '
+                                 'seconds'.format(timeout))
+        sock.settimeout(remaining)
+        data = sock.recv(1024)
+        if not data:
+            return None
+        buf += data
+
+
 class CleanableCM(object):
     """Cleanable context manager (based on ExitStack)"""
 
@@ -165,6 +245,269 @@ class NetNsProxy(CleanableCM):
         return '<NetNsProxy {0.ip}>'.format(self)
 
 
+class ForwardedSocket(object):
+    """Socket-like object for one connection, made through NetNsForwarder"""
+
+    def __init__(self, forwarder, conn_id, address):
+        self.forwarder = forwarder
+        self.conn_id = conn_id
+        self.address = address
+        self.closed = False
+        self.error = None
+        self._opened = threading.Event()
+        self._cond = threading.Condition()
+        self._buffer = bytearray()
+        self._timeout = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return '<ForwardedSocket {0.address} via {0.forwarder}>'.format(self)
+
+    def settimeout(self, timeout):
+        self._timeout = timeout
+
+    def gettimeout(self):
+        return self._timeout
+
+    def getpeername(self):
+        return self.address
+
+    def wait_opened(self, timeout):
+        self._opened.wait(timeout)
+        if self.error is not None:
+            raise socket.error('Forwarding to {0} failed: {1}'.format(
+                self.address, self.error))
+        if not self._opened.is_set():
+            raise socket.timeout('Forwarding to {0} is not opened in {1} '
+                                 'seconds'.format(self.address, timeout))
+
+    def feed(self, data):
+        with self._cond:
+            self._buffer.extend(data)
+            self._cond.notify_all()
+
+    def set_opened(self, error=None):
+        self.error = error
+        if error is not None:
+            self.set_closed()
+        self._opened.set()
+
+    def set_closed(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def send(self, data):
+        if self.closed:
+            raise socket.error('Socket is closed')
+        self.forwarder.send_frame(self.conn_id, DATA, bytes(data))
+        return len(data)
+
+    sendall = send
+
+    def recv(self, size):
+        with self._cond:
+            if self._timeout is not None:
+                end = time.time() + self._timeout
+            while not self._buffer and not self.closed:
+                if self._timeout is None:
+                    self._cond.wait()
+                    continue
+                remaining = end - time.time()
+                if remaining <= 0:
+                    raise socket.timeout()
+                self._cond.wait(remaining)
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            return data
+
+    def close(self):
+        if self.closed:
+            return
+        self.set_closed()
+        self.forwarder.release(self)
+
+
+class NetNsForwarder(object):
+    """Persistent forwarding agent in net namespace on proxy node
+
+    Agent is started once and multiplexes all connections to instances
+    from this namespace through single SSH channel, so no process is spawned
+    on proxy node for each connection.
+    """
+
+    remote_script = '/tmp/mos_netns_forwarder.py'
+
+    def __init__(self, ip, ns, port=22, username='root', password=None,
+                 pkey=None, open_timeout=30):
+        self.ip = ip
+        self.ns = ns
+        self.port = port
+        self.username = username
+        self.password = password
+        self.pkey = pkey
+        self.open_timeout = open_timeout
+        self._ssh = None
+        self._chan = None
+        self._reader = None
+        self._send_lock = threading.Lock()
+        self._sockets = {}
+        self._ids = itertools.count(1)
+
+    def __repr__(self):
+        return '<NetNsForwarder {0.ip} {0.ns}>'.format(self)
+
+    @property
+    def is_alive(self):
+        return (self._chan is not None and not self._chan.closed and
+                self._reader.is_alive())
+
+    def start(self):
+        logger.debug('Starting {0}'.format(self))
+        self._ssh = paramiko.SSHClient()
+        self._ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self._ssh.connect(self.ip,
+                          port=self.port,
+                          username=self.username,
+                          password=self.password,
+                          pkey=self.pkey)
+        self._ssh.get_transport().set_keepalive(10)
+        # Script is uploaded to unique path and renamed, so other processes
+        # never start partially written script
+        tmp_path = '{0}.{1}'.format(self.remote_script, uuid.uuid4().hex)
+        with self._ssh.open_sftp() as sftp:
+            sftp.put(FORWARDER_SCRIPT, tmp_path)
+            sftp.posix_rename(tmp_path, self.remote_script)
+        self._chan = self._ssh.get_transport().open_session()
+        self._chan.exec_command('ip netns exec {ns} python -u {path}'.format(
+            ns=self.ns, path=self.remote_script))
+        self._reader = threading.Thread(target=self._read_loop,
+                                        name=repr(self))
+        self._reader.daemon = True
+        self._reader.start()
+
+    def _recv_exactly(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self._chan.recv(size - len(data))
+            if not chunk:
+                raise EOFError('Forwarder channel closed')
+            data += chunk
+        return data
+
+    def _read_loop(self):
+        try:
+            while True:
+                conn_id, op, length = FRAME_HEADER.unpack(
+                    self._recv_exactly(FRAME_HEADER.size))
+                payload = self._recv_exactly(length)
+                sock = self._sockets.get(conn_id)
+                if sock is None:
+                    continue
+                if op == DATA:
+                    sock.feed(payload)
+                elif op == OPENED:
+                    sock.set_opened()
+                elif op == ERROR:
+                    self._sockets.pop(conn_id, None)
+                    sock.set_opened(error=payload.decode('utf-8'))
+                elif op == CLOSE:
+                    self._sockets.pop(conn_id, None)
+                    sock.set_closed()
+        except Exception as e:
+            logger.debug('{0} stopped: {1}'.format(self, e))
+        finally:
+            for sock in list(self._sockets.values()):
+                sock.set_opened(error='forwarder stopped')
+            self._sockets.clear()
+
+    def send_frame(self, conn_id, op, payload=b''):
+        with self._send_lock:
+            self._chan.sendall(
+                FRAME_HEADER.pack(conn_id, op, len(payload)) + payload)
+
+    def open_connection(self, ip, port=22):
+        """Returns socket-like object connected to ip:port in namespace"""
+        sock = ForwardedSocket(self, next(self._ids), (ip, port))
+        self._sockets[sock.conn_id] = sock
+        address = '{0}:{1}'.format(ip, port).encode('ascii')
+        self.send_frame(sock.conn_id, OPEN, address)
+        try:
+            sock.wait_opened(self.open_timeout)
+        except socket.timeout:
+            # Agent doesn't answer, so it can't be used anymore
+            self.close()
+            raise
+        return sock
+
+    def release(self, sock):
+        if self._sockets.pop(sock.conn_id, None) is not None:
+            with suppress(Exception):
+                self.send_frame(sock.conn_id, CLOSE)
+
+    def close(self):
+        logger.debug('Closing {0}'.format(self))
+        if self._chan is not None:
+            self._chan.close()
+        if self._ssh is not None:
+            self._ssh.close()
+
+
+_forwarders = {}
+# {(ip, ns): lock}, so slow start of one forwarder doesn't block others
+_forwarders_locks = defaultdict(threading.Lock)
+_forwarders_lock = threading.Lock()
+
+
+def get_netns_forwarder(ip, ns, **kwargs):
+    """Returns running NetNsForwarder for node ip and namespace
+
+    Forwarder is started on first call and reused later.
+    """
+    key = (ip, ns)
+    with _forwarders_lock:
+        lock = _forwarders_locks[key]
+    with lock:
+        forwarder = _forwarders.get(key)
+        if forwarder is None or not forwarder.is_alive:
+            forwarder = NetNsForwarder(ip, ns, **kwargs)
+            forwarder.start()
+            with _forwarders_lock:
+                _forwarders[key] = forwarder
+        return forwarder
+
+
+@atexit.register
+def close_netns_forwarders():
+    with _forwarders_lock:
+        for forwarder in _forwarders.values():
+            forwarder.close()
+        _forwarders.clear()
+
+
+class NetNsForwardProxy(NetNsProxy):
+    """Make proxy channel through shared forwarder in net namespace on proxy
+    node"""
+
+    def _enter(self):
+        forwarder = get_netns_forwarder(self.ip,
+                                        self.ns,
+                                        port=self.port,
+                                        username=self.username,
+                                        password=self.password,
+                                        pkey=self.pkey)
+        sock = forwarder.open_connection(self.proxy_to_ip, self.proxy_to_port)
+        return self.stack.enter_context(sock)
+
+    def __repr__(self):
+        return '<NetNsForwardProxy {0.ip}>'.format(self)
+
+
 class SSHClient(CleanableCM):
 
     def __repr__(self):
@@ -330,31 +673,8 @@ class SSHClient(CleanableCM):
         chan, stdin, stdout, stderr = self.execute_async(
             command, merge_stderr=merge_stderr)
 
-        stdout_buf = ''
-        stderr_buf = ''
-
-        start = time.time()
-        while not chan.closed or chan.recv_ready() or chan.recv_stderr_ready():
-            select.select([chan], [], [chan], 60)
-
-            if chan.recv_ready():
-                stdout_buf += chan.recv(1024)
-            if chan.recv_stderr_ready():
-                stderr_buf += chan.recv_stderr(1024)
-
-            if time.time() > start + self.execution_timeout:
-                chan.close()
-                raise Exception('Executing `{cmd}` is too long '
-                                '(more than {timeout} seconds)'.format(
-                                    cmd=command,
-                                    timeout=self.execution_timeout))
-
-        result = CommandResult({
-            'stdout': stdout_buf.splitlines(True),
-            'stderr': stderr_buf.splitlines(True),
-            'exit_code': chan.recv_exit_status()
-        })
-        result.command = command
+        result = read_channel_result(chan, command,
+                                     timeout=self.execution_timeout)
         stdin.close()
         stdout.close()
         stderr.close()
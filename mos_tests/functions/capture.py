@@ -0,0 +1,303 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from array import array
+from contextlib import contextmanager
+import logging
+import socket
+import struct
+import threading
+
+from contextlib2 import ExitStack
+import six
+
+
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+PROTO_ICMP = 1
+PROTO_TCP = 6
+PROTO_UDP = 17
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = (12, 14, 101)
+LINKTYPE_LINUX_SLL = 113
+
+ETH_P_IP = 0x0800
+ETH_P_8021Q = 0x8100
+
+PCAP_MAGIC = {
+    b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+    b'\xd4\xc3\xb2\xa1': ('<', 1e-6),
+    b'\xa1\xb2\x3c\x4d': ('>', 1e-9),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e-9),
+}
+
+
+def ip_to_int(ip):
+    return struct.unpack('!L', socket.inet_aton(ip))[0]
+
+
+def int_to_ip(value):
+    return socket.inet_ntoa(struct.pack('!L', value))
+
+
+class PacketIndex(object):
+    """Compact index of captured IPv4 packets
+
+    Packets are stored as columns in typed arrays: timestamp, source and
+    destination addresses, ip protocol and ICMP type (-1 for non ICMP).
+    """
+
+    def __init__(self):
+        self.times = array('d')
+        self.src = array('L')
+        self.dst = array('L')
+        self.proto = array('B')
+        self.icmp_type = array('h')
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, timestamp, src, dst, proto, icmp_type=-1):
+        with self.lock:
+            self.times.append(timestamp)
+            self.src.append(src)
+            self.dst.append(dst)
+            self.proto.append(proto)
+            self.icmp_type.append(icmp_type)
+
+    def select(self, proto=None, icmp_type=None, src=None, dst=None):
+        """Returns list of timestamps of packets matched to filter"""
+        src = ip_to_int(src) if src is not None else None
+        dst = ip_to_int(dst) if dst is not None else None
+        with self.lock:
+            return [self.times[i] for i in range(len(self.times))
+                    if (proto is None or self.proto[i] == proto) and
+                    (icmp_type is None or self.icmp_type[i] == icmp_type) and
+                    (src is None or self.src[i] == src) and
+                    (dst is None or self.dst[i] == dst)]
+
+    def first(self, **kwargs):
+        """Returns timestamp of first matched packet or None"""
+        times = self.select(**kwargs)
+        return times[0] if times else None
+
+    def last(self, **kwargs):
+        """Returns timestamp of last matched packet or None"""
+        times = self.select(**kwargs)
+        return times[-1] if times else None
+
+
+class PcapParser(object):
+    """Incremental pcap stream parser, which fills PacketIndex"""
+
+    def __init__(self, index=None):
+        self.index = index if index is not None else PacketIndex()
+        self.buffer = b''
+        self.record_header = None
+        self.ts_scale = None
+        self.linktype = None
+
+    def feed(self, data):
+        self.buffer += data
+        if self.record_header is None:
+            if len(self.buffer) < 24:
+                return
+            endian, self.ts_scale = PCAP_MAGIC[self.buffer[:4]]
+            self.linktype = struct.unpack(endian + 'L',
+                                          self.buffer[20:24])[0]
+            self.record_header = struct.Struct(endian + 'LLLL')
+            self.buffer = self.buffer[24:]
+        size = self.record_header.size
+        offset = 0
+        while len(self.buffer) - offset >= size:
+            ts_sec, ts_frac, incl_len, _ = self.record_header.unpack_from(
+                self.buffer, offset)
+            if len(self.buffer) - offset - size < incl_len:
+                break
+            packet = self.buffer[offset + size:offset + size + incl_len]
+            offset += size + incl_len
+            self.parse_packet(ts_sec + ts_frac * self.ts_scale, packet)
+        self.buffer = self.buffer[offset:]
+
+    def _ip_offset(self, packet):
+        if self.linktype == LINKTYPE_ETHERNET:
+            offset = 14
+            ethertype = struct.unpack_from('!H', packet, 12)[0]
+            while ethertype == ETH_P_8021Q:
+                ethertype = struct.unpack_from('!H', packet, offset + 2)[0]
+                offset += 4
+        elif self.linktype == LINKTYPE_LINUX_SLL:
+            offset = 16
+            ethertype = struct.unpack_from('!H', packet, 14)[0]
+        elif self.linktype in LINKTYPE_RAW:
+            return 0
+        else:
+            return None
+        return offset if ethertype == ETH_P_IP else None
+
+    def parse_packet(self, timestamp, packet):
+        try:
+            offset = self._ip_offset(packet)
+            if offset is None or six.indexbytes(packet, offset) >> 4 != 4:
+                return
+            ihl = (six.indexbytes(packet, offset) & 0x0f) * 4
+            proto = six.indexbytes(packet, offset + 9)
+            src, dst = struct.unpack_from('!LL', packet, offset + 12)
+            icmp_type = -1
+            if proto == PROTO_ICMP:
+                icmp_type = six.indexbytes(packet, offset + ihl)
+        except (IndexError, struct.error):
+            # Packet is truncated by snaplen
+            return
+        self.index.add(timestamp, src, dst, proto, icmp_type)
+
+
+class RemoteCapture(object):
+    """Capture packets on remote node with `tcpdump -w -` and parse pcap
+    stream in-process
+
+    :param remote: SSHClient (not opened)
+    :param args: tcpdump arguments (interface, filter)
+    :param prefix: command prefix, for example `ip netns exec <ns>`
+    """
+
+    def __init__(self, remote, args='', prefix=''):
+        self.remote = remote
+        self.command = (
+            "sh -c 'echo $$; exec {prefix} tcpdump -U -n -w - {args} "
+            "2>/dev/null'".format(prefix=prefix, args=args))
+        self.parser = PcapParser()
+        self.pid = None
+        self._opened = False
+        self._chan = None
+        self._thread = None
+        self._started = threading.Event()
+
+    @property
+    def index(self):
+        return self.parser.index
+
+    def _read(self):
+        buf = b''
+        while b'\n' not in buf:
+            chunk = self._chan.recv(4096)
+            if not chunk:
+                self._started.set()
+                return
+            buf += chunk
+        pid, buf = buf.split(b'\n', 1)
+        self.pid = int(pid)
+        self._started.set()
+        self.parser.feed(buf)
+        while True:
+            chunk = self._chan.recv(64 * 1024)
+            if not chunk:
+                break
+            self.parser.feed(chunk)
+
+    def start(self, timeout=30):
+        """Start tcpdump and wait until it is started
+
+        Partially started capture should be closed with `stop`.
+        """
+        self.remote.__enter__()
+        self._opened = True
+        self._chan, _, _, _ = self.remote.execute_async(self.command)
+        self._thread = threading.Thread(target=self._read,
+                                        name=repr(self.remote))
+        self._thread.daemon = True
+        self._thread.start()
+        if not self._started.wait(timeout):
+            raise Exception('Capture on {0} is not started in {1} '
+                            'seconds'.format(self.remote.host, timeout))
+        if self.pid is None:
+            raise Exception('Capture on {0} is finished before '
+                            'start'.format(self.remote.host))
+
+    def stop(self):
+        if not self._opened:
+            return
+        try:
+            if self.pid is not None:
+                self.remote.execute('kill {0}'.format(self.pid),
+                                    verbose=False)
+            if self._thread is not None:
+                self._thread.join(10)
+        finally:
+            if self._chan is not None:
+                self._chan.close()
+            self.remote.__exit__(None, None, None)
+
+
+class MultiCapture(object):
+    """Captures on several nodes
+
+    :param captures: dict {name: RemoteCapture}
+    """
+
+    def __init__(self, captures):
+        self.captures = captures
+
+    def __getitem__(self, name):
+        return self.captures[name].index
+
+    def last(self, **kwargs):
+        """Returns dict {name: last matched packet timestamp}"""
+        return {name: capture.index.last(**kwargs)
+                for name, capture in self.captures.items()}
+
+    def first(self, **kwargs):
+        """Returns dict {name: first matched packet timestamp}"""
+        return {name: capture.index.first(**kwargs)
+                for name, capture in self.captures.items()}
+
+    def last_echo_reply(self, **kwargs):
+        return self.last(proto=PROTO_ICMP, icmp_type=ICMP_ECHO_REPLY,
+                         **kwargs)
+
+    def gap(self, from_name, to_name, **kwargs):
+        """Time between last matched packet on `from_name` and first matched
+        packet on `to_name` after it
+
+        :return: seconds or None, if there is no such packets
+        """
+        last = self[from_name].last(**kwargs)
+        if last is None:
+            return None
+        after = [x for x in self[to_name].select(**kwargs) if x >= last]
+        if not after:
+            return None
+        return after[0] - last
+
+
+@contextmanager
+def capture(remotes, args='', prefix=''):
+    """Capture packets on all remotes before enter and stop after
+
+    :param remotes: dict {name: SSHClient}
+    :param args: tcpdump arguments
+    :param prefix: tcpdump command prefix
+    """
+    captures = {name: RemoteCapture(remote, args=args, prefix=prefix)
+                for name, remote in remotes.items()}
+    with ExitStack() as stack:
+        for name, item in captures.items():
+            logger.info('Start capture on {0}'.format(name))
+            stack.callback(item.stop)
+            item.start()
+        yield MultiCapture(captures)
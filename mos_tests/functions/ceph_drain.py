@@ -0,0 +1,145 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import logging
+from multiprocessing.dummy import Pool
+import time
+
+from mos_tests.functions import ceph_monitor
+
+
+logger = logging.getLogger(__name__)
+
+
+def format_progress(sample):
+    return ('Ceph data movement: degraded {0.degraded_ratio}, misplaced '
+            '{0.misplaced_ratio}, recovery {1:.1f} MB/s, PGs {0.pgs_by_state}'
+            .format(sample, sample.recovering_bytes_per_sec / 1024.0 ** 2))
+
+
+def remove_osds_command(osd_ids, hostname):
+    """Returns single shell command to stop and remove OSDs from cluster"""
+    commands = []
+    for osd_id in osd_ids:
+        commands.extend([
+            'stop ceph-osd id={0}'.format(osd_id),
+            'ceph osd crush remove osd.{0}'.format(osd_id),
+            'ceph auth del osd.{0}'.format(osd_id),
+            'ceph osd rm osd.{0}'.format(osd_id),
+        ])
+    commands.append('ceph osd crush remove {0}'.format(hostname))
+    return ' && '.join(commands)
+
+
+class OsdDrainer(object):
+    """Drain data from OSDs of several nodes and remove them
+
+    OSDs of up to `max_parallel` nodes are marked out at once. Next nodes are
+    marked out only when degraded + misplaced ratio is below
+    `max_degraded_ratio`. After all data is moved, OSDs are removed on all
+    nodes simultaneously, one command per node.
+
+    :param monitor: started CephMonitor
+    :param max_parallel: max count of nodes to mark out at once
+    :param max_degraded_ratio: degraded + misplaced objects ratio limit to
+        start draining of next nodes
+    :param timeout: timeout for each data movement wait in seconds
+    :param progress_interval: interval of progress logging in seconds
+    """
+
+    def __init__(self, monitor, max_parallel=2, max_degraded_ratio=0.3,
+                 timeout=30 * 60, progress_interval=60):
+        self.monitor = monitor
+        self.max_parallel = max_parallel
+        self.max_degraded_ratio = max_degraded_ratio
+        self.timeout = timeout
+        self.progress_interval = progress_interval
+        self._expected_in = None
+        self._in_osds = set()
+        self._marked_at = 0
+
+    def _wait(self, predicate, waiting_for):
+        """Wait for predicate on sample, which reflects marked out OSDs"""
+        last_logged = [0]
+
+        def check(sample):
+            if sample.time - last_logged[0] >= self.progress_interval:
+                last_logged[0] = sample.time
+                logger.info(format_progress(sample))
+            # PG states are updated after osdmap with some delay
+            return (sample.num_in_osds <= self._expected_in and
+                    sample.time >= self._marked_at + self.monitor.interval and
+                    predicate(sample))
+
+        return self.monitor.wait_for(check, timeout_seconds=self.timeout,
+                                     waiting_for=waiting_for)
+
+    def _below_threshold(self, sample):
+        return (sample.degraded_ratio + sample.misplaced_ratio <=
+                self.max_degraded_ratio)
+
+    def get_osds(self, remotes):
+        """Returns dict {remote: (hostname, [osd ids])}"""
+        report = json.loads(remotes[0].check_call(
+            'ceph report', verbose=False).stdout_string)
+        self._in_osds = {x['osd'] for x in report['osdmap']['osds']
+                         if x['in']}
+        result = {}
+        for remote in remotes:
+            hostname = remote.check_call(
+                'hostname -f', verbose=False).stdout_string.strip()
+            osd_ids = [x['id'] for x in report['osd_metadata']
+                       if x['hostname'] == hostname]
+            result[remote] = (hostname, osd_ids)
+        return result
+
+    def drain(self, remotes):
+        """Drain and remove all OSDs from nodes
+
+        :param remotes: list of opened SSHClient to ceph-osd nodes
+        """
+        osds = self.get_osds(remotes)
+        self._expected_in = self.monitor.latest.num_in_osds
+        for i in range(0, len(remotes), self.max_parallel):
+            if i > 0:
+                self._wait(self._below_threshold,
+                           waiting_for='ceph degraded ratio to decrease')
+            for remote in remotes[i:i + self.max_parallel]:
+                hostname, osd_ids = osds[remote]
+                if not osd_ids:
+                    continue
+                logger.info('Mark out OSDs {0} on {1}'.format(osd_ids,
+                                                              hostname))
+                remote.check_call('ceph osd out {0}'.format(
+                    ' '.join(str(x) for x in osd_ids)), verbose=False)
+                self._expected_in -= len(self._in_osds & set(osd_ids))
+                self._marked_at = time.time()
+
+        self._wait(ceph_monitor.is_clean,
+                   waiting_for='Ceph data migration to be done')
+        logger.info('Data migration stats: {0}'.format(
+            self.monitor.recovery_stats()))
+
+        def remove(remote):
+            hostname, osd_ids = osds[remote]
+            logger.info('Remove OSDs {0} on {1}'.format(osd_ids, hostname))
+            remote.check_call(remove_osds_command(osd_ids, hostname),
+                              verbose=False)
+
+        pool = Pool(len(remotes))
+        try:
+            pool.map(remove, remotes)
+        finally:
+            pool.close()
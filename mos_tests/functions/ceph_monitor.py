@@ -0,0 +1,212 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from collections import deque
+from collections import namedtuple
+from contextlib import contextmanager
+import json
+import logging
+import threading
+import time
+
+from waiting import TimeoutExpired
+
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_CLEAN = 'active+clean'
+
+CephSample = namedtuple('CephSample', [
+    'time', 'health', 'num_osds', 'num_up_osds', 'num_in_osds', 'num_pgs',
+    'pgs_by_state', 'degraded_ratio', 'misplaced_ratio',
+    'recovering_bytes_per_sec', 'recovering_objects_per_sec'])
+
+PgTransition = namedtuple('PgTransition', ['time', 'before', 'after'])
+
+
+def parse_status(data, timestamp=None):
+    """Make CephSample from `ceph status -f json` output (dict)
+
+    Both nested (hammer, jewel) and flat osdmap formats are supported.
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    health = data.get('health', {})
+    osdmap = data.get('osdmap', {})
+    osdmap = osdmap.get('osdmap', osdmap)
+    pgmap = data.get('pgmap', {})
+    pgs_by_state = {x['state_name']: x['count']
+                    for x in pgmap.get('pgs_by_state', [])}
+    return CephSample(
+        time=timestamp,
+        health=health.get('overall_status', health.get('status')),
+        num_osds=osdmap.get('num_osds', 0),
+        num_up_osds=osdmap.get('num_up_osds', 0),
+        num_in_osds=osdmap.get('num_in_osds', 0),
+        num_pgs=pgmap.get('num_pgs', sum(pgs_by_state.values())),
+        pgs_by_state=pgs_by_state,
+        degraded_ratio=pgmap.get('degraded_ratio', 0),
+        misplaced_ratio=pgmap.get('misplaced_ratio', 0),
+        recovering_bytes_per_sec=pgmap.get('recovering_bytes_per_sec', 0),
+        recovering_objects_per_sec=pgmap.get('recovering_objects_per_sec',
+                                             0))
+
+
+def is_clean(sample):
+    """All PGs are active+clean"""
+    return (sample.num_pgs > 0 and
+            sample.pgs_by_state.get(ACTIVE_CLEAN) == sample.num_pgs)
+
+
+def num_down_osds(sample):
+    return sample.num_osds - sample.num_up_osds
+
+
+class CephMonitor(object):
+    """Polls Ceph status on monitor node through single SSH session
+
+    Samples are collected in background thread, PG states changes are
+    recorded as transitions. `clean` event is set while all PGs are
+    active+clean.
+
+    :param remote: SSHClient to node with ceph monitor (not opened)
+    :param interval: polling interval in seconds
+    :param keep: max count of stored samples
+    """
+
+    def __init__(self, remote, interval=10, keep=10000):
+        self.remote = remote
+        self.interval = interval
+        self.samples = deque(maxlen=keep)
+        self.transitions = []
+        self.clean = threading.Event()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __repr__(self):
+        return '<CephMonitor {0}>'.format(self.remote.host)
+
+    @property
+    def latest(self):
+        return self.samples[-1] if self.samples else None
+
+    def poll(self):
+        """Get and store one sample"""
+        output = self.remote.check_call('ceph status -f json',
+                                        verbose=False).stdout_string
+        sample = parse_status(json.loads(output))
+        with self._cond:
+            previous = self.latest
+            if previous is not None and (previous.pgs_by_state !=
+                                         sample.pgs_by_state):
+                self.transitions.append(PgTransition(
+                    time=sample.time,
+                    before=previous.pgs_by_state,
+                    after=sample.pgs_by_state))
+                logger.debug('Ceph PGs: {0}'.format(sample.pgs_by_state))
+            self.samples.append(sample)
+            if is_clean(sample):
+                self.clean.set()
+            else:
+                self.clean.clear()
+            self._cond.notify_all()
+        return sample
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning('Ceph status polling failed: {0}'.format(e))
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self.remote.__enter__()
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name=repr(self))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        try:
+            if self._thread is not None:
+                self._thread.join()
+        finally:
+            self.remote.__exit__(None, None, None)
+
+    def wait_for(self, predicate, timeout_seconds, waiting_for='ceph state'):
+        """Wait until `predicate(sample)` is True for the latest sample
+
+        Already existing latest sample is checked first, so predicate should
+        not match state before expected change.
+
+        :return: matched CephSample
+        """
+        deadline = time.time() + timeout_seconds
+        with self._cond:
+            while True:
+                sample = self.latest
+                if sample is not None and predicate(sample):
+                    return sample
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise TimeoutExpired(timeout_seconds, waiting_for)
+                self._cond.wait(remaining)
+
+    def wait_clean(self, timeout_seconds=30 * 60):
+        """Wait until all PGs are active+clean"""
+        start = time.time()
+        sample = self.wait_for(is_clean, timeout_seconds,
+                               waiting_for='ceph PGs to be active+clean')
+        logger.info('Ceph PGs are active+clean after {0:.0f}s, recovery '
+                    'stats: {1}'.format(time.time() - start,
+                                        self.recovery_stats(since=start)))
+        return sample
+
+    def recovery_stats(self, since=0):
+        """Returns dict with recovery statistics for samples after `since`"""
+        samples = [x for x in self.samples if x.time >= since]
+        rates = [x.recovering_bytes_per_sec for x in samples
+                 if x.recovering_bytes_per_sec]
+        not_clean = [x for x in samples if not is_clean(x)]
+        return {
+            'samples': len(samples),
+            'transitions': len([x for x in self.transitions
+                                if x.time >= since]),
+            'max_degraded_ratio': max([x.degraded_ratio for x in samples] or
+                                      [0]),
+            'max_misplaced_ratio': max([x.misplaced_ratio for x in samples] or
+                                       [0]),
+            'mean_recovery_bytes_per_sec': (
+                sum(rates) / float(len(rates)) if rates else 0),
+            'max_recovery_bytes_per_sec': max(rates or [0]),
+            'not_clean_seconds': (not_clean[-1].time - not_clean[0].time
+                                  if not_clean else 0),
+        }
+
+
+@contextmanager
+def monitor(remote, **kwargs):
+    """Monitor ceph in background inside context
+
+    :param remote: SSHClient to ceph monitor node (not opened)
+    """
+    ceph_monitor = CephMonitor(remote, **kwargs)
+    ceph_monitor.start()
+    try:
+        yield ceph_monitor
+    finally:
+        ceph_monitor.stop()
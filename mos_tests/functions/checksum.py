@@ -0,0 +1,128 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Streaming checksums calculation for files and Glance images
+
+All digests are calculated in one pass over data with large buffers.
+hashlib releases GIL on big chunks, so several verifications can be run in
+threads simultaneously (see `verify_images`).
+"""
+
+import hashlib
+import io
+import logging
+from multiprocessing.dummy import Pool
+import time
+
+
+logger = logging.getLogger(__name__)
+
+BUFFER_SIZE = 4 * 1024 * 1024
+
+
+class MultiHash(object):
+    """Several hashlib digests updated together"""
+
+    def __init__(self, algorithms=('md5',)):
+        self.hashes = {name: hashlib.new(name) for name in algorithms}
+        self.size = 0
+
+    def update(self, data):
+        for value in self.hashes.values():
+            value.update(data)
+        self.size += len(data)
+
+    def hexdigests(self):
+        return {name: value.hexdigest()
+                for name, value in self.hashes.items()}
+
+
+def file_digests(path, algorithms=('md5',), buffer_size=BUFFER_SIZE):
+    """Returns dict {algorithm: hex digest} for local file"""
+    result = MultiHash(algorithms)
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+    with io.open(path, 'rb') as f:
+        while True:
+            size = f.readinto(buf)
+            if not size:
+                break
+            result.update(view[:size])
+    return result.hexdigests()
+
+
+def image_digests(glance, image, algorithms=('md5',),
+                  buffer_size=BUFFER_SIZE):
+    """Download Glance image data and returns dict {algorithm: hex digest}
+
+    :param glance: glance v2 client
+    :param image: glance image
+    """
+    result = MultiHash(algorithms)
+    start = time.time()
+    response, _ = glance.http_client.get(image.file, log=False, stream=True)
+    try:
+        for chunk in response.iter_content(buffer_size):
+            result.update(chunk)
+    finally:
+        response.close()
+    duration = time.time() - start
+    logger.debug('Image {0} data read: {1} bytes, {2:.1f}s'.format(
+        image.id, result.size, duration))
+    return result.hexdigests()
+
+
+def get_image_md5(glance, image):
+    return image_digests(glance, image)['md5']
+
+
+def verify_image(glance, image, md5, download=True):
+    """Check Glance image MD5
+
+    Checksum stored in Glance is compared first. Image data is downloaded
+    (to check that it is readable and not corrupted in backend) only if
+    `download` is True.
+
+    :return: True if checksums are equal
+    """
+    image = glance.images.get(image.id)
+    if image.checksum and image.checksum != md5:
+        logger.info('Image {0.id} stored checksum {0.checksum} differs from '
+                    'expected {1}'.format(image, md5))
+        return False
+    if not download and image.checksum:
+        return True
+    actual = get_image_md5(glance, image)
+    if actual != md5:
+        logger.info('Image {0.id} data MD5 {1} differs from expected '
+                    '{2}'.format(image, actual, md5))
+    return actual == md5
+
+
+def verify_images(glance, images, download=True, processes=4):
+    """Verify several images simultaneously
+
+    :param images: list of tuples (image, expected md5)
+    :return: list of results in same order as images
+    """
+    if not images:
+        return []
+    pool = Pool(min(processes, len(images)))
+    try:
+        return pool.map(
+            lambda item: verify_image(glance, item[0], item[1],
+                                      download=download),
+            images)
+    finally:
+        pool.close()
@@ -0,0 +1,168 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Bulk operations with Cinder resources (volumes, snapshots, backups)
+
+API calls are made from thread pool with concurrency and rate limits.
+Statuses of all resources are got with single `list` call per poll.
+Time from request to reaching of target state is recorded for each
+resource, so results can be used as Cinder scale benchmark.
+"""
+
+import logging
+from multiprocessing.dummy import Pool
+import threading
+import time
+
+from mos_tests.functions.common import wait
+from mos_tests.functions.stats import latency_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter(object):
+    """Allows not more than `rate` calls per second (None - unlimited)"""
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.next_time = 0
+
+    def acquire(self):
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.time()
+            delay = max(self.next_time - now, 0)
+            self.next_time = max(self.next_time, now) + 1.0 / self.rate
+        if delay:
+            time.sleep(delay)
+
+
+class BulkDriver(object):
+    """Create and delete Cinder resources concurrently
+
+    :param manager: cinderclient manager (`cinder.volumes`,
+        `cinder.volume_snapshots`, `cinder.backups`)
+    :param concurrency: max count of simultaneous API calls
+    :param rate: max API calls per second (None - unlimited)
+    """
+
+    def __init__(self, manager, concurrency=10, rate=None):
+        self.manager = manager
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        # {resource id: request time}
+        self.requested = {}
+        # {operation: {resource id: seconds from request to done}}
+        self.latencies = {}
+
+    def _call(self, func, *args, **kwargs):
+        self.limiter.acquire()
+        return func(*args, **kwargs)
+
+    def _map(self, func, items):
+        if not items:
+            return []
+        pool = Pool(min(self.concurrency, len(items)))
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+
+    def create(self, params_list):
+        """Create resources
+
+        :param params_list: list of dicts with `manager.create` kwargs
+        :return: list of created resources in same order
+        """
+        def create(params):
+            start = time.time()
+            resource = self._call(self.manager.create, **params)
+            self.requested[resource.id] = start
+            return resource
+
+        return self._map(create, params_list)
+
+    def delete(self, resources):
+        """Request deletion of resources"""
+        def delete(resource):
+            self.requested[resource.id] = time.time()
+            self._call(self.manager.delete, resource)
+
+        self._map(delete, resources)
+
+    def _record(self, operation, resource_id, done_at):
+        latencies = self.latencies.setdefault(operation, {})
+        if resource_id not in latencies:
+            latencies[resource_id] = done_at - self.requested[resource_id]
+
+    def wait_status(self, resources, status='available', timeout=20 * 60):
+        """Wait for all resources to reach `status`
+
+        `error` status of any resource raises AssertionError.
+        """
+        pending = {x.id for x in resources}
+
+        def predicate():
+            now = time.time()
+            for resource in self.manager.list():
+                if resource.id not in pending:
+                    continue
+                assert resource.status != 'error', (
+                    '{0} {1} is in error status'.format(
+                        type(resource).__name__, resource.id))
+                if resource.status == status:
+                    self._record(status, resource.id, now)
+                    pending.discard(resource.id)
+            return not pending
+
+        wait(predicate, timeout_seconds=timeout, sleep_seconds=(1, 10, 2),
+             waiting_for='{0} resources to become {1}'.format(
+                 len(resources), status))
+
+    def wait_deleted(self, resources, timeout=20 * 60):
+        """Wait for all resources to disappear from list
+
+        `error_deleting` status of any resource raises AssertionError.
+        """
+        pending = {x.id for x in resources}
+
+        def predicate():
+            now = time.time()
+            existing = set()
+            for resource in self.manager.list():
+                existing.add(resource.id)
+                assert not (resource.id in pending and
+                            resource.status == 'error_deleting'), (
+                    '{0} {1} is in error_deleting status'.format(
+                        type(resource).__name__, resource.id))
+            for resource_id in pending - existing:
+                self._record('deleted', resource_id, now)
+            pending.intersection_update(existing)
+            return not pending
+
+        wait(predicate, timeout_seconds=timeout, sleep_seconds=(1, 10, 2),
+             waiting_for='{0} resources to be deleted'.format(
+                 len(resources)))
+
+    def stats(self):
+        """Returns dict {operation: latency stats}"""
+        return {operation: latency_stats(list(values.values()))
+                for operation, values in self.latencies.items()}
+
+    def log_stats(self):
+        for operation, stats in sorted(self.stats().items()):
+            logger.info('{0} latency: {1}'.format(operation, stats))
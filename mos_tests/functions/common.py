@@ -24,7 +24,10 @@ import urllib2
 import uuid
 from waiting import TimeoutExpired
 from waiting import wait as base_wait
-import yaml
+
+from mos_tests.functions import heat_templates
+from mos_tests.functions import heat_waiter
+from mos_tests.functions import prober
 
 
 logger = logging.getLogger(__name__)
@@ -62,17 +65,22 @@ def check_stack_status(stack_name, heat, status, timeout=60):
         :return True if stack status is equals to expected status
         False otherwise
     """
-    if is_stack_exists(stack_name, heat):
-        start_time = time()
-        stack_status = [s.stack_status for s in heat.stacks.list()
-                        if s.stack_name == stack_name][0]
-        while 'IN_PROGRESS' in stack_status \
-                and time() < start_time + 60 * timeout:
-            sleep(1)
-            stack_status = [s.stack_status for s in heat.stacks.list()
-                            if s.stack_name == stack_name][0]
-        return stack_status == status
-    return False
+    if not is_stack_exists(stack_name, heat):
+        return False
+    stack = heat.stacks.get(stack_name)
+    waiter = heat_waiter.StackWaiter(heat, stack.id)
+    waiter.skip_existing()
+    stack_status = waiter.stack_status()
+    action, state = heat_waiter.split_status(stack_status)
+    if state == heat_waiter.IN_PROGRESS:
+        try:
+            stack_status = waiter.wait(action, timeout_seconds=60 * timeout)
+        except heat_waiter.StackFailed as e:
+            logger.info(e)
+            stack_status = e.status
+        except TimeoutExpired:
+            return False
+    return stack_status == status
 
 
 def create_stack(heat_client, stack_name, template, parameters={}, timeout=20,
@@ -96,28 +104,29 @@ def create_stack(heat_client, stack_name, template, parameters={}, timeout=20,
         timeout_mins=timeout)
     uid = stack['stack']['id']
 
-    def is_stack_created():
-        stack = heat_client.stacks.get(uid)
-        if stack.stack_status == 'CREATE_FAILED':
-            raise Exception(stack.stack_status_reason)
-        elif stack.stack_status == 'CREATE_COMPLETE':
-            return True
-
-    wait(is_stack_created, timeout_seconds=timeout * 60, sleep_seconds=10,
-         waiting_for='stack {} status to be '
-                     'CREATE_COMPLETE'.format(stack_name))
+    waiter = heat_waiter.StackWaiter(heat_client, uid)
+    status = waiter.wait('CREATE', timeout_seconds=timeout * 60)
+    waiter.log_durations()
+    if status != 'CREATE_COMPLETE':
+        raise Exception(heat_client.stacks.get(uid).stack_status_reason)
     return uid
 
 
-def delete_stack(heat_client, uid):
+def delete_stack(heat_client, uid, timeout=20):
     """Delete stack and check STATUS == DELETE_COMPLETE
         :param heat_client: Heat API client connection point
         :param uid:         UID of stack
+        :param timeout: Timeout for check operation
     """
-    if uid in [s.id for s in heat_client.stacks.list()]:
-        heat_client.stacks.delete(uid)
-        while uid in [s.id for s in heat_client.stacks.list()]:
-            sleep(1)
+    waiter = heat_waiter.StackWaiter(heat_client, uid)
+    if waiter.stack_status() == 'DELETE_COMPLETE':
+        return
+    waiter.skip_existing()
+    heat_client.stacks.delete(uid)
+    status = waiter.wait('DELETE', timeout_seconds=60 * timeout)
+    if status != 'DELETE_COMPLETE':
+        raise Exception(
+            "ERROR: Stack {} is not deleted: {}".format(uid, status))
 
 
 def check_stack_status_complete(heat_client, uid, action, timeout=10):
@@ -129,17 +138,19 @@ def check_stack_status_complete(heat_client, uid, action, timeout=10):
         :param timeout: Timeout for check operation
         :return uid: UID of created stack
     """
-    stack = heat_client.stacks.get(stack_id=uid).to_dict()
-    end_time = time() + 60 * timeout
-    while stack['stack_status'] == '{}_IN_PROGRESS'.format(action):
-        stack = heat_client.stacks.get(stack_id=uid).to_dict()
-        if time() > end_time:
-            break
-        else:
-            sleep(1)
-    if stack['stack_status'] != '{}_COMPLETE'.format(action):
+    waiter = heat_waiter.StackWaiter(heat_client, uid)
+    waiter.skip_existing()
+    stack_status = waiter.stack_status()
+    if stack_status == '{}_IN_PROGRESS'.format(action):
+        try:
+            stack_status = waiter.wait(action, timeout_seconds=60 * timeout)
+        except TimeoutExpired:
+            pass
+    if stack_status != '{}_COMPLETE'.format(action):
         raise Exception("ERROR: Stack {} is not in '{}_COMPLETE' "
-                        "state:\n".format(stack, action))
+                        "state:\n".format(
+                            heat_client.stacks.get(stack_id=uid).to_dict(),
+                            action))
 
 
 def read_template(templates_dir, template_name):
@@ -150,10 +161,8 @@ def read_template(templates_dir, template_name):
         :return: template file content
     """
 
-    template_path = os.path.join(templates_dir, template_name)
     try:
-        with open(template_path) as template:
-            return template.read()
+        return heat_templates.read_template(templates_dir, template_name)
     except IOError as e:
         raise IOError('Can\'t read template: {}'.format(e))
 
@@ -192,32 +201,6 @@ def get_specific_resource_id(heat_client, uid, resource_name):
     return stack_resources['physical_resource_id']
 
 
-def update_template_file(template_file, type_of_changes, **kwargs):
-    """Update template file specific fields.
-        :param template_file: path to template file.
-        :param type_of_changes:
-        if changes in format - 'format'
-        if changes in flavor size - 'flavor'
-        :param kwargs: the key-value dictionary of parameters.
-        currently following keys are supported
-        disk_format: new disk_format value (optional parameter)
-        container_format: new container_format value (optional parameter)
-        flavor: new flavor size
-        :return -
-    """
-    with open(template_file, 'r') as stream:
-        data = yaml.load(stream)
-    if type_of_changes == 'format':
-        data['resources']['cirros_image']['properties']['disk_format'] \
-            = kwargs['disk_format']
-        data['resources']['cirros_image']['properties']['container_format'] \
-            = kwargs['container_format']
-    elif type_of_changes == 'flavor':
-        data['resources']['vm']['properties']['flavor'] = kwargs['flavor']
-    with open(template_file, 'w') as yaml_file:
-        yaml_file.write(yaml.dump(data, default_flow_style=False))
-
-
 def download_image(image_link_file, where_to_put='/tmp/'):
     """This function will download image from internet and write it
         if image is not already present on node.
@@ -535,10 +518,11 @@ def delete_image(glance_client, image_id):
 
 # execution of system commands
 def ping_command(ip_address, c=4, i=4, timeout=3, should_be_available=True):
-    """This function executes the ping program and check its results
+    """This function pings ip address with in-process prober and check
+    its results
         :param ip_address: The IP address to ping
-        :param c: value of the [-c count] parameter of the ping command
-        :param i: value of the [-i interval] parameter of the ping command
+        :param c: count of probes in each attempt
+        :param i: interval between probes in seconds
         :param timeout: timeout in minutes that we are waiting for successful
         result of the ping operation
         :param should_be_available: this parameter described should we check
@@ -548,11 +532,13 @@ def ping_command(ip_address, c=4, i=4, timeout=3, should_be_available=True):
     end_time = time() + 60 * timeout
     ping_result = False
     while time() < end_time:
-        the_result = os.system("ping -c {} -i {} {}".
-                               format(c, i, ip_address))
+        timeline = prober.probe([ip_address], count=c, interval=i)[ip_address]
+        logger.debug('Ping {0}: {1}'.format(ip_address, timeline))
         # TODO(mlaptev): Make sure that all packages has been received
-        ping_result = \
-            the_result == 0 if should_be_available else the_result != 0
+        if should_be_available:
+            ping_result = timeline.received > 0
+        else:
+            ping_result = timeline.received == 0
         if ping_result:
             break
     return ping_result
@@ -0,0 +1,108 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Follower of servers console logs
+
+Full console log is requested on first poll of each server, and then only
+the last `lines` lines are requested (`length` argument of Nova API),
+instead of full log, which can be hundreds of KB. Last seen line of each
+server is remembered: if it isn't found in the new tail, more lines were
+written between polls than were requested, so requested length is doubled
+for this server to not miss the marker.
+Servers with found marker are not polled anymore.
+"""
+
+import logging
+from multiprocessing.dummy import Pool
+import re
+
+from mos_tests.functions.common import wait
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConsoleFollower(object):
+    """Wait for pattern in console log of several servers
+
+    :param nova: nova client
+    :param servers: list of servers
+    :param pattern: regex (string or compiled) to search in log
+    :param lines: initial count of last log lines to request after first
+        poll
+    :param concurrency: max count of simultaneous API calls
+    """
+
+    def __init__(self, nova, servers, pattern, lines=100, concurrency=10):
+        self.nova = nova
+        self.servers = list(servers)
+        self.pattern = re.compile(pattern)
+        self.concurrency = concurrency
+        # {server id: count of lines to request}
+        self.lengths = {x.id: lines for x in self.servers}
+        # {server id: last seen line}
+        self.last_lines = {}
+        self.found = set()
+
+    def _tail(self, server, full=False):
+        length = None if full else self.lengths[server.id]
+        return self.nova.servers.get_console_output(server,
+                                                    length=length) or ''
+
+    def poll_one(self, server):
+        """Returns True if pattern is found in server log"""
+        last_line = self.last_lines.get(server.id)
+        log_lines = self._tail(server, full=last_line is None).splitlines()
+        if (last_line is not None and
+                len(log_lines) >= self.lengths[server.id] and
+                last_line not in log_lines):
+            # Log is grown more than tail between polls
+            self.lengths[server.id] *= 2
+            logger.debug('Request {0} lines of server {1} log'.format(
+                self.lengths[server.id], server.id))
+            log_lines = self._tail(server).splitlines()
+        if log_lines:
+            self.last_lines[server.id] = log_lines[-1]
+        if self.pattern.search('\n'.join(log_lines)):
+            self.found.add(server.id)
+            return True
+        return False
+
+    def poll(self):
+        """Poll servers without found pattern
+
+        :return: True if pattern is found in logs of all servers
+        """
+        pending = [x for x in self.servers if x.id not in self.found]
+        if pending:
+            pool = Pool(min(self.concurrency, len(pending)))
+            try:
+                pool.map(self.poll_one, pending)
+            finally:
+                pool.close()
+        return len(self.found) == len(self.servers)
+
+    def wait(self, timeout=10 * 60, waiting_for=None):
+        if waiting_for is None:
+            waiting_for = '{0} to appear in servers log'.format(
+                self.pattern.pattern)
+        wait(self.poll, timeout_seconds=timeout, sleep_seconds=(1, 10, 2),
+             waiting_for=waiting_for)
+
+
+def wait_marker(nova, servers, marker, timeout=10 * 60, **kwargs):
+    """Wait for fixed string `marker` in console log of all servers"""
+    follower = ConsoleFollower(nova, servers, re.escape(marker), **kwargs)
+    follower.wait(timeout=timeout,
+                  waiting_for='marker appears in all servers log')
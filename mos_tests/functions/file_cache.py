@@ -12,17 +12,43 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+"""Shared cache for downloaded files (images, packages)
+
+Files are stored in `settings.TEST_IMAGE_PATH` by their SHA-256 digest in
+`objects` subdirectory and linked with name from URL. Index (`index.json`)
+maps URLs to digests, sizes and usage times. All changes are made under
+file locks and with atomic renames, so cache can be used by several
+processes (xdist workers) simultaneously.
+
+Each process keeps shared lock on every file it has got until exit, so
+files, which are used by running processes, are never evicted.
+"""
+
 from contextlib import contextmanager
 import email.utils
+import fcntl
+import hashlib
+import json
 import logging
 import os
+import shutil
+import tempfile
+import threading
+import time
 
+from contextlib2 import ExitStack
 import requests
 
 from mos_tests import settings
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 1024 * 1024
+
+# {path: opened file with shared lock}
+_used_files = {}
+_used_files_lock = threading.Lock()
+
 
 @contextmanager
 def get_file(url, name=None):
@@ -30,38 +56,286 @@ def get_file(url, name=None):
         yield f
 
 
-def get_file_path(url, name=None):
-    if not os.path.exists(settings.TEST_IMAGE_PATH):
+@contextmanager
+def _locked(path):
+    """Exclusive inter-process lock on `path`"""
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextmanager
+def _try_locked(path):
+    """Non-blocking exclusive lock on `path`, yields True if it is taken"""
+    with open(path, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            yield False
+            return
         try:
-            os.makedirs(settings.TEST_IMAGE_PATH)
-        except Exception as e:
-            logger.warning("Can't make dir for files: {}".format(e))
-            return None
-
-    file_path = os.path.join(settings.TEST_IMAGE_PATH,
-                             get_file_name(url))
-    headers = {}
-    if os.path.exists(file_path):
-        file_date = os.path.getmtime(file_path)
-        headers['If-Modified-Since'] = email.utils.formatdate(file_date,
-                                                              usegmt=True)
-
-    response = requests.get(url, stream=True, headers=headers)
-
-    if response.status_code == 304:
-        logger.info("Image file is up to date")
-    elif response.status_code == 200:
-        logger.info("Start downloading image")
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(65536):
-                f.write(chunk)
-        logger.info("Image downloaded")
-    else:
-        logger.warning("Can't get fresh image. HTTP status code is "
-                       "{0.status_code}".format(response))
-
-    response.close()
-    return file_path
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _hold_shared(path):
+    """Shared inter-process lock on `path` until process exit"""
+    with _used_files_lock:
+        if path in _used_files:
+            return
+        f = open(path, 'a')
+        fcntl.flock(f, fcntl.LOCK_SH)
+        _used_files[path] = f
+
+
+def _file_digest(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _atomic_write(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    prefix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(data)
+    os.rename(tmp_path, path)
+
+
+class FileCache(object):
+    """Content addressed files cache with LRU size limit
+
+    :param path: cache directory
+    :param max_size: max size of cached objects in bytes (0 - unlimited)
+    :param trust_hours: don't check URL for changes during this time after
+        last check
+    """
+
+    def __init__(self, path, max_size=0, trust_hours=0):
+        self.path = path
+        self.objects_path = os.path.join(path, 'objects')
+        self.index_path = os.path.join(path, 'index.json')
+        self.lock_path = os.path.join(path, '.lock')
+        self.max_size = max_size
+        self.trust_hours = trust_hours
+
+    def _read_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path) as f:
+            try:
+                return json.load(f)
+            except ValueError:
+                logger.warning('Cache index is broken, it will be reset')
+                return {}
+
+    def _update_entry(self, url, **values):
+        with _locked(self.lock_path):
+            index = self._read_index()
+            entry = index.setdefault(url, {})
+            entry.update(values)
+            entry['used_at'] = time.time()
+            _atomic_write(self.index_path, json.dumps(index, indent=2))
+            return entry
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_path, digest)
+
+    def _link(self, digest, file_path):
+        """Atomically replace `file_path` with link to object"""
+        tmp_path = file_path + '.link'
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        try:
+            os.link(self._object_path(digest), tmp_path)
+        except OSError:
+            shutil.copy(self._object_path(digest), tmp_path)
+        os.rename(tmp_path, file_path)
+
+    def _is_valid(self, entry, file_path):
+        """Check file size and, once for not verified entry, its digest
+
+        Digest of downloaded file is calculated while streaming, so fresh
+        entries are verified.
+        """
+        digest = entry.get('sha256')
+        if digest is None or not os.path.exists(file_path):
+            return False
+        if os.path.getsize(file_path) != entry.get('size'):
+            return False
+        if entry.get('verified'):
+            return True
+        if _file_digest(file_path) != digest:
+            logger.warning('Cached file {0} is corrupted'.format(file_path))
+            return False
+        entry['verified'] = True
+        return True
+
+    def _download(self, response):
+        """Save response content to objects and return (digest, size)"""
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_path,
+                                        prefix='.download')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+            digest = sha256.hexdigest()
+            os.rename(tmp_path, self._object_path(digest))
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return digest, size
+
+    def prepare(self):
+        for path in (self.path, self.objects_path):
+            if not os.path.exists(path):
+                os.makedirs(path)
+
+    def get(self, url, name=None):
+        """Returns path to actual file for url"""
+        file_path = os.path.join(self.path, name or get_file_name(url))
+        with _locked(file_path + '.lock'):
+            _hold_shared(file_path + '.use')
+            entry = self._read_index().get(url, {})
+            valid = self._is_valid(entry, file_path)
+            checked_at = entry.get('checked_at', 0)
+            if valid and time.time() - checked_at < self.trust_hours * 3600:
+                logger.info('Image file is trusted (checked at {0})'.format(
+                    time.ctime(checked_at)))
+                self._update_entry(url, verified=True)
+                return file_path
+
+            headers = {}
+            if valid:
+                headers['If-Modified-Since'] = email.utils.formatdate(
+                    os.path.getmtime(file_path), usegmt=True)
+                if entry.get('etag'):
+                    headers['If-None-Match'] = entry['etag']
+
+            response = requests.get(url, stream=True, headers=headers)
+            try:
+                if response.status_code == 304:
+                    logger.info("Image file is up to date")
+                    self._update_entry(url, checked_at=time.time(),
+                                       verified=True)
+                elif response.status_code == 200:
+                    logger.info("Start downloading image")
+                    start = time.time()
+                    digest, size = self._download(response)
+                    self._link(digest, file_path)
+                    self._update_entry(url,
+                                       sha256=digest,
+                                       size=size,
+                                       name=os.path.basename(file_path),
+                                       etag=response.headers.get('ETag'),
+                                       checked_at=time.time(),
+                                       verified=True)
+                    logger.info("Image downloaded ({0} bytes, {1:.0f}s, "
+                                "sha256 {2})".format(size, time.time() - start,
+                                                     digest))
+                else:
+                    logger.warning("Can't get fresh image. HTTP status code "
+                                   "is {0.status_code}".format(response))
+            finally:
+                response.close()
+
+        self.evict()
+        return file_path
+
+    def digest(self, url):
+        """Returns SHA-256 digest of cached file content or None"""
+        return self._read_index().get(url, {}).get('sha256')
+
+    def verify(self, url):
+        """Check cached file content against digest from index"""
+        entry = self._read_index().get(url)
+        if entry is None or 'sha256' not in entry:
+            return False
+        return (_file_digest(os.path.join(self.path, entry['name'])) ==
+                entry['sha256'])
+
+    def _evict_object(self, index, digest):
+        """Remove object and its links, if they are not being got or used
+        by any process
+
+        :return: True if object is removed
+        """
+        entries = [(url, entry) for url, entry in index.items()
+                   if entry.get('sha256') == digest]
+        with ExitStack() as stack:
+            for url, entry in entries:
+                file_path = os.path.join(self.path, entry['name'])
+                for lock_path in (file_path + '.lock', file_path + '.use'):
+                    if not stack.enter_context(_try_locked(lock_path)):
+                        logger.debug('{0} is used, skip it'.format(
+                            file_path))
+                        return False
+            logger.info('Remove {0} from cache'.format(digest))
+            for url, entry in entries:
+                file_path = os.path.join(self.path, entry['name'])
+                if os.path.exists(file_path):
+                    os.unlink(file_path)
+                del index[url]
+            os.unlink(self._object_path(digest))
+        return True
+
+    def evict(self):
+        """Remove least recently used objects to fit to max_size
+
+        Objects, which are being got or were got by running processes, are
+        skipped.
+        """
+        if not self.max_size:
+            return
+        with _locked(self.lock_path):
+            index = self._read_index()
+            used = {}
+            for url, entry in index.items():
+                digest = entry.get('sha256')
+                if digest is None:
+                    continue
+                used[digest] = max(used.get(digest, 0),
+                                   entry.get('used_at', 0))
+            sizes = {}
+            for digest in used:
+                path = self._object_path(digest)
+                if os.path.exists(path):
+                    sizes[digest] = os.path.getsize(path)
+            total = sum(sizes.values())
+            # Most recently used object is always kept
+            for digest in sorted(sizes, key=used.get)[:-1]:
+                if total <= self.max_size:
+                    break
+                if self._evict_object(index, digest):
+                    total -= sizes[digest]
+            _atomic_write(self.index_path, json.dumps(index, indent=2))
+
+
+def get_cache():
+    return FileCache(
+        settings.TEST_IMAGE_PATH,
+        max_size=int(settings.TEST_IMAGE_CACHE_SIZE_GB * 1024 ** 3),
+        trust_hours=settings.TEST_IMAGE_TRUST_HOURS)
+
+
+def get_file_path(url, name=None):
+    cache = get_cache()
+    try:
+        cache.prepare()
+    except Exception as e:
+        logger.warning("Can't make dir for files: {}".format(e))
+        return None
+    return cache.get(url, name)
 
 
 def get_file_name(url):
@@ -0,0 +1,227 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Concurrent creation, update and deletion of many independent Heat stacks
+
+Each worker makes stack action and waits for it with `StackWaiter`, so
+`concurrency` is the max count of stacks in progress at once. Results
+contain time of each stack action, which is used for Heat engine
+throughput measurements.
+"""
+
+from collections import namedtuple
+import logging
+from multiprocessing.dummy import Pool
+import threading
+import time
+
+from heatclient import exc as heat_exc
+from waiting import TimeoutExpired
+
+from mos_tests.functions import heat_waiter
+from mos_tests.functions.stats import latency_stats
+
+
+logger = logging.getLogger(__name__)
+
+StackResult = namedtuple('StackResult', [
+    'name', 'id', 'status', 'reason', 'duration', 'resources'])
+
+
+class StackFactory(object):
+    """Create and delete stacks concurrently
+
+    :param heat: heat client
+    :param concurrency: max count of stacks in progress at once
+    :param timeout: timeout of each stack action in minutes
+    """
+
+    def __init__(self, heat, concurrency=10, timeout=20):
+        self.heat = heat
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        # list of ids of created stacks
+        self.stack_ids = []
+        # {action: [StackResult]}
+        self.results = {}
+        # {action: [(started, finished)]}, one period for each run
+        self.periods = {}
+
+    def _map(self, func, items):
+        if not items:
+            return []
+        pool = Pool(min(self.concurrency, len(items)))
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+
+    def _run(self, action, func, items):
+        started = time.time()
+        results = self._map(func, items)
+        self.periods.setdefault(action, []).append((started, time.time()))
+        self.results.setdefault(action, []).extend(results)
+        return results
+
+    def reset_stats(self):
+        """Forget results and periods of previous actions"""
+        self.results = {}
+        self.periods = {}
+
+    def _wait(self, waiter, stack_name, action, start):
+        """Wait for stack action and returns StackResult
+
+        Stack failure doesn't raise, it is reported in result.
+        """
+        reason = None
+        try:
+            status = waiter.wait(action, timeout_seconds=self.timeout * 60,
+                                 fail_fast=action != 'DELETE')
+        except heat_waiter.StackFailed as e:
+            status, reason = e.status, str(e)
+        except TimeoutExpired as e:
+            status, reason = '{0}_TIMEOUT'.format(action), str(e)
+        if reason is None and status != '{0}_COMPLETE'.format(action):
+            reason = self.heat.stacks.get(waiter.stack_id).stack_status_reason
+        result = StackResult(name=stack_name, id=waiter.stack_id,
+                             status=status, reason=reason,
+                             duration=time.time() - start,
+                             resources=waiter.durations)
+        logger.debug('Stack {0.name} is {0.status} after '
+                     '{0.duration:.0f}s'.format(result))
+        return result
+
+    def create_one(self, stack_name, template, parameters=None, files=None):
+        """Create stack and wait for its completion
+
+        :return: StackResult
+        """
+        start = time.time()
+        stack = self.heat.stacks.create(stack_name=stack_name,
+                                        template=template,
+                                        files=files or {},
+                                        parameters=parameters or {},
+                                        timeout_mins=self.timeout)
+        uid = stack['stack']['id']
+        with self.lock:
+            self.stack_ids.append(uid)
+        waiter = heat_waiter.StackWaiter(self.heat, uid)
+        return self._wait(waiter, stack_name, 'CREATE', start)
+
+    def create(self, specs):
+        """Create stacks
+
+        :param specs: list of dicts with `create_one` kwargs
+        :return: list of StackResult in same order as specs
+        """
+        return self._run('CREATE', lambda spec: self.create_one(**spec),
+                         specs)
+
+    def update_one(self, result, template, parameters=None, files=None):
+        """Update stack and wait for its completion
+
+        :param result: StackResult of stack creation
+        :return: StackResult
+        """
+        waiter = heat_waiter.StackWaiter(self.heat, result.id)
+        waiter.skip_existing()
+        start = time.time()
+        self.heat.stacks.update(result.id, template=template,
+                                files=files or {},
+                                parameters=parameters or {},
+                                timeout_mins=self.timeout)
+        return self._wait(waiter, result.name, 'UPDATE', start)
+
+    def update(self, results, template, parameters=None, files=None):
+        """Update created stacks with same template
+
+        :param results: list of StackResult of created stacks
+        :return: list of StackResult in same order
+        """
+        return self._run(
+            'UPDATE',
+            lambda result: self.update_one(result, template, parameters,
+                                           files),
+            results)
+
+    def delete_one(self, uid):
+        """Delete stack and wait for its deletion
+
+        :return: StackResult or None if stack is already deleted
+        """
+        try:
+            stack = self.heat.stacks.get(uid)
+        except heat_exc.HTTPNotFound:
+            return None
+        if stack.stack_status == 'DELETE_COMPLETE':
+            return None
+        waiter = heat_waiter.StackWaiter(self.heat, uid)
+        waiter.skip_existing()
+        start = time.time()
+        self.heat.stacks.delete(uid)
+        return self._wait(waiter, stack.stack_name, 'DELETE', start)
+
+    def delete_all(self):
+        """Delete all created stacks
+
+        :return: list of StackResult for deleted stacks
+        """
+        with self.lock:
+            stack_ids, self.stack_ids = self.stack_ids, []
+        results = self._run('DELETE', self.delete_one, stack_ids)
+        self.results['DELETE'] = [x for x in self.results['DELETE']
+                                  if x is not None]
+        return [x for x in results if x is not None]
+
+    def stats(self):
+        """Returns dict {action: throughput and latency stats}"""
+        stats = {}
+        for action, results in self.results.items():
+            completed = [x for x in results
+                         if x.status == '{0}_COMPLETE'.format(action)]
+            total = sum(finished - started
+                        for started, finished in self.periods[action])
+            stats[action] = {
+                'stacks': len(results),
+                'completed': len(completed),
+                'failed': len(results) - len(completed),
+                'failure_rate': (float(len(results) - len(completed)) /
+                                 len(results) if results else 0),
+                'total_seconds': total,
+                'stacks_per_minute': (len(completed) * 60.0 / total
+                                      if total else 0),
+                'latency': latency_stats([x.duration for x in completed]),
+            }
+        return stats
+
+    def resources_stats(self, action='CREATE'):
+        """Returns dict {resource: latency stats} for stacks resources
+
+        Stacks themselves are skipped. Resources of nested stacks are
+        aggregated by resource name, members of resource groups (which
+        are named by index) are aggregated together.
+        """
+        durations = {}
+        for result in self.results.get(action, []):
+            for (resource_action, key), value in result.resources.items():
+                stack_name, _, name = key.rpartition('/')
+                if (resource_action != action or
+                        name in (result.name, stack_name)):
+                    continue
+                if name.isdigit():
+                    name = 'group member'
+                durations.setdefault(name, []).append(value)
+        return {name: latency_stats(values)
+                for name, values in durations.items()}
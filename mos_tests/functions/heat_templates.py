@@ -0,0 +1,112 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Heat templates cache
+
+Each template file is read and parsed only once per session. Parsing is
+made with libyaml based loader, if PyYAML is built with it. Templates are
+returned as copies of parsed data, so they can be changed in memory (see
+`get_template` overrides) without rewriting of template files. Heat API
+accepts parsed template (dict) as well as template text.
+"""
+
+import copy
+import os
+import threading
+
+import yaml
+
+
+BaseLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+class TemplateLoader(BaseLoader):
+    """Safe loader, which keeps dates (heat_template_version) as strings
+
+    It is the same as Heat does, so parsed template can be serialized to JSON.
+    """
+
+
+TemplateLoader.add_constructor(
+    u'tag:yaml.org,2002:timestamp',
+    lambda loader, node: loader.construct_scalar(node))
+
+
+def parse(content):
+    """Parse template text"""
+    return yaml.load(content, Loader=TemplateLoader)
+
+
+def set_value(data, path, value):
+    """Set value in nested dicts
+
+    :param path: dot separated keys, like 'resources.vm.properties.flavor'
+    """
+    keys = path.split('.')
+    for key in keys[:-1]:
+        data = data[key]
+    data[keys[-1]] = value
+
+
+class TemplateCache(object):
+    """Stores content and parsed data of template files"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # {path: content}
+        self.contents = {}
+        # {path: parsed template}
+        self.templates = {}
+
+    def read(self, path):
+        """Returns template file content"""
+        with self.lock:
+            if path not in self.contents:
+                with open(path) as f:
+                    self.contents[path] = f.read()
+            return self.contents[path]
+
+    def load(self, path):
+        """Returns copy of parsed template"""
+        content = self.read(path)
+        with self.lock:
+            if path not in self.templates:
+                self.templates[path] = parse(content)
+            return copy.deepcopy(self.templates[path])
+
+    def clear(self):
+        with self.lock:
+            self.contents.clear()
+            self.templates.clear()
+
+
+cache = TemplateCache()
+
+
+def read_template(templates_dir, template_name):
+    """Returns cached template file content"""
+    return cache.read(os.path.join(templates_dir, template_name))
+
+
+def get_template(templates_dir, template_name, overrides=None):
+    """Returns parsed template with overridden values
+
+    :param overrides: dict {dot separated path: value}, for ex.:
+        {'resources.vm.properties.flavor': 'm1.small'}
+    :return: template dict, which can be passed to heat as `template`
+    """
+    template = cache.load(os.path.join(templates_dir, template_name))
+    for path, value in (overrides or {}).items():
+        set_value(template, path, value)
+    return template
@@ -0,0 +1,238 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Heat stack waiter based on stack events
+
+Only new events are requested on each poll (`marker` is id of last seen
+event), so the cost of poll doesn't depend on count of stacks in cloud and
+count of stack events. Wait is finished as soon as terminal event of root
+stack is received. Failed event of any (nested) resource is raised
+immediately as `StackFailed`.
+
+Time from IN_PROGRESS to COMPLETE event is recorded for each resource, so
+waiter also gives latency profile of stack resources.
+"""
+
+import calendar
+import logging
+import time
+
+from heatclient import exc as heat_exc
+from waiting import TimeoutExpired
+
+
+logger = logging.getLogger(__name__)
+
+IN_PROGRESS = 'IN_PROGRESS'
+COMPLETE = 'COMPLETE'
+FAILED = 'FAILED'
+
+
+class StackFailed(Exception):
+    """Stack or one of its resources is failed
+
+    :param status: status of root stack (may be expected, if nested resource
+        failed before root stack)
+    :param resource: name of failed resource
+    :param reason: failure reason from event
+    """
+
+    def __init__(self, stack_id, status, resource, reason):
+        self.stack_id = stack_id
+        self.status = status
+        self.resource = resource
+        self.reason = reason
+        super(StackFailed, self).__init__(
+            'Stack {0} is {1}: resource {2} failed: {3}'.format(
+                stack_id, status, resource, reason))
+
+
+def parse_time(value):
+    """Returns unix timestamp for heat event time"""
+    return calendar.timegm(time.strptime(value[:19], '%Y-%m-%dT%H:%M:%S'))
+
+
+def split_status(status):
+    """Returns tuple (action, state) for status like CREATE_IN_PROGRESS"""
+    for state in (IN_PROGRESS, COMPLETE, FAILED):
+        if status.endswith('_' + state):
+            return status[:-len(state) - 1], state
+    return status, None
+
+
+def event_stack_name(event):
+    """Returns name of stack, event belongs to (from event links)"""
+    for link in getattr(event, 'links', []):
+        if link.get('rel') == 'stack':
+            return link['href'].rstrip('/').split('/')[-2]
+
+
+class StackWaiter(object):
+    """Follows events of stack and its nested stacks
+
+    :param heat: heat client
+    :param stack_id: id of root stack
+    :param nested_depth: depth of nested stacks to follow
+    :param page_size: max count of events per one request
+    :param max_interval: max polling interval (if there are no new events)
+    :param status_interval: interval of stack status check, it is a fallback
+        for case when terminal event of stack was not received
+    """
+
+    def __init__(self, heat, stack_id, nested_depth=3, page_size=100,
+                 max_interval=5, status_interval=60):
+        self.heat = heat
+        self.stack_id = stack_id
+        self.nested_depth = nested_depth
+        self.page_size = page_size
+        self.max_interval = max_interval
+        self.status_interval = status_interval
+        self.marker = None
+        self.events = []
+        # {resource: start time} for resources in progress
+        self.started = {}
+        # {(action, resource): seconds from IN_PROGRESS to COMPLETE}
+        self.durations = {}
+        self.root_name = None
+
+    def __repr__(self):
+        return '<StackWaiter {0}>'.format(self.stack_id)
+
+    def _list(self, **kwargs):
+        return self.heat.events.list(self.stack_id,
+                                     nested_depth=self.nested_depth,
+                                     **kwargs)
+
+    def skip_existing(self):
+        """Set marker to last existing event
+
+        Should be called before stack update or delete request, otherwise
+        terminal events of previous actions will be taken as result.
+        """
+        events = self._list(sort_dir='desc', limit=1)
+        if events:
+            self.marker = events[0].id
+
+    def fetch(self):
+        """Get new events since marker
+
+        :return: list of new events
+        """
+        new_events = []
+        while True:
+            events = self._list(sort_dir='asc', limit=self.page_size,
+                                marker=self.marker)
+            if not events:
+                break
+            new_events.extend(events)
+            self.marker = events[-1].id
+            if len(events) < self.page_size:
+                break
+        self.events.extend(new_events)
+        return new_events
+
+    def _resource_key(self, event):
+        if event.physical_resource_id == self.stack_id:
+            return event.resource_name
+        stack_name = event_stack_name(event)
+        if stack_name is None or stack_name == self.root_name:
+            return event.resource_name
+        return '{0}/{1}'.format(stack_name, event.resource_name)
+
+    def process(self, event, action=None, fail_fast=True):
+        """Handle one event
+
+        :return: status of root stack, if event is terminal for it
+        """
+        event_action, state = split_status(event.resource_status)
+        is_root = event.physical_resource_id == self.stack_id
+        if is_root:
+            self.root_name = event.resource_name
+        key = self._resource_key(event)
+        timestamp = parse_time(event.event_time)
+        if state == IN_PROGRESS:
+            self.started[key] = timestamp
+        elif state == COMPLETE and key in self.started:
+            self.durations[(event_action, key)] = (
+                timestamp - self.started.pop(key))
+        if action is not None and event_action != action:
+            return None
+        if is_root and state in (COMPLETE, FAILED):
+            return event.resource_status
+        if state == FAILED and fail_fast:
+            raise StackFailed(self.stack_id,
+                              status='{0}_{1}'.format(event_action, FAILED),
+                              resource=key,
+                              reason=event.resource_status_reason)
+
+    def stack_status(self):
+        """Returns current status of stack (DELETE_COMPLETE if not found)"""
+        try:
+            return self.heat.stacks.get(self.stack_id).stack_status
+        except heat_exc.HTTPNotFound:
+            return 'DELETE_COMPLETE'
+
+    def wait(self, action, timeout_seconds, fail_fast=True):
+        """Wait for terminal status of stack `action`
+
+        :param action: CREATE, UPDATE, DELETE, etc.
+        :param fail_fast: raise StackFailed on failed event of any resource
+        :return: final status of stack, like CREATE_COMPLETE
+        """
+        start = time.time()
+        deadline = start + timeout_seconds
+        last_status_check = start
+        interval = 1
+        while True:
+            try:
+                new_events = self.fetch()
+            except heat_exc.HTTPNotFound:
+                if action == 'DELETE':
+                    return 'DELETE_COMPLETE'
+                raise
+            for event in new_events:
+                status = self.process(event, action=action,
+                                      fail_fast=fail_fast)
+                if status is not None:
+                    logger.debug('Stack {0} is {1} after {2:.0f}s'.format(
+                        self.stack_id, status, time.time() - start))
+                    return status
+            now = time.time()
+            if now - last_status_check >= self.status_interval:
+                last_status_check = now
+                status = self.stack_status()
+                if split_status(status) in ((action, COMPLETE),
+                                            (action, FAILED)):
+                    return status
+            if now >= deadline:
+                raise TimeoutExpired(
+                    timeout_seconds,
+                    'stack {0} {1} to be finished'.format(self.stack_id,
+                                                          action))
+            if new_events:
+                interval = 1
+            else:
+                interval = min(interval * 2, self.max_interval)
+            time.sleep(min(interval, max(deadline - now, 0)))
+
+    def slowest(self, count=10):
+        """Returns list of (seconds, action, resource) for slowest resources"""
+        return sorted(((duration, action, resource)
+                       for (action, resource), duration
+                       in self.durations.items()), reverse=True)[:count]
+
+    def log_durations(self, count=10):
+        for duration, action, resource in self.slowest(count):
+            logger.info('Stack {0}: {1} {2} took {3:.0f}s'.format(
+                self.stack_id, resource, action, duration))
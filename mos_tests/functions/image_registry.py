@@ -0,0 +1,149 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Session wide registry of shared Glance images
+
+Each distinct image (file content + image properties) is uploaded to Glance
+only once per session. Uploaded images are tagged with `SHARED_TAG` and
+marked with `KEY_PROPERTY`, so they are found again after clients
+reinitialization or snapshot revert (if image survived it). All images
+uploaded by registry are deleted on session end.
+
+Images are marked with `OWNER_PROPERTY` of the process, which uploaded
+them, and only own images are reused. So images of one xdist worker are
+never deleted by another one while they are used.
+
+Shared images should not be changed or deleted by tests.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import uuid
+
+from glanceclient import exc as glance_exc
+
+from mos_tests.functions import file_cache
+from mos_tests.functions import image_upload
+
+logger = logging.getLogger(__name__)
+
+SHARED_TAG = 'mos-tests-shared'
+KEY_PROPERTY = 'mos_tests_key'
+OWNER_PROPERTY = 'mos_tests_owner'
+# Unique for each process
+OWNER = uuid.uuid4().hex
+
+
+def image_key(digest, **params):
+    """Returns key for image with file `digest` and params"""
+    data = json.dumps([digest, params], sort_keys=True)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class ImageRegistry(object):
+    """Uploads shared images to Glance and deletes them on cleanup"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # {image id: glance client}
+        self.uploaded = {}
+
+    def find(self, glance, key):
+        """Returns active shared image of this process with `key` or
+        None"""
+        for image in glance.images.list(filters={'tag': [SHARED_TAG]}):
+            if (image.get(KEY_PROPERTY) != key or
+                    image.get(OWNER_PROPERTY) != OWNER):
+                continue
+            if image['status'] == 'active':
+                return image
+            logger.info('Shared image {0.id} is in {0.status} status, '
+                        'skip it'.format(image))
+        return None
+
+    def get_image(self, glance, url, name, disk_format='qcow2',
+                  container_format='bare', unpack=None, **properties):
+        """Returns shared image for file from `url`, uploads it if needed
+
+        :param glance: glance v2 client
+        :param url: image file url (file is got through files cache)
+        :param name: image name
+        :param unpack: function to get image data from file object (for
+            example, extract it from archive) or None
+        :param properties: additional image properties
+        """
+        path = file_cache.get_file_path(url)
+        digest = file_cache.get_cache().digest(url)
+        key = image_key(digest,
+                        disk_format=disk_format,
+                        container_format=container_format,
+                        unpack=getattr(unpack, '__name__', None),
+                        properties=properties)
+        with self.lock:
+            image = self.find(glance, key)
+            if image is not None:
+                logger.info('Reuse shared image {0.name} ({0.id})'.format(
+                    image))
+                return image
+
+            logger.info('Creating shared image {0}'.format(name))
+            properties[KEY_PROPERTY] = key
+            properties[OWNER_PROPERTY] = OWNER
+            image = glance.images.create(name=name,
+                                         disk_format=disk_format,
+                                         container_format=container_format,
+                                         tags=[SHARED_TAG],
+                                         **properties)
+            self.uploaded[image.id] = glance
+            try:
+                if unpack is None:
+                    image_upload.upload(glance, image.id, path)
+                else:
+                    with open(path, 'rb') as f:
+                        glance.images.upload(image.id, unpack(f))
+            except Exception:
+                self.delete(image.id)
+                raise
+            logger.info('Shared image {0} created ({1})'.format(name,
+                                                                image.id))
+            return glance.images.get(image.id)
+
+    def delete(self, image_id):
+        glance = self.uploaded.pop(image_id)
+        try:
+            glance.images.delete(image_id)
+        except glance_exc.HTTPNotFound:
+            logger.debug('Shared image {0} is already deleted'.format(
+                image_id))
+
+    def cleanup(self):
+        """Delete all images uploaded by registry"""
+        with self.lock:
+            for image_id in list(self.uploaded):
+                logger.info('Delete shared image {0}'.format(image_id))
+                try:
+                    self.delete(image_id)
+                except Exception as e:
+                    logger.warning("Can't delete shared image {0}: "
+                                   "{1}".format(image_id, e))
+
+
+registry = ImageRegistry()
+
+
+def get_image(glance, url, name, **kwargs):
+    """Returns shared image from session registry"""
+    return registry.get_image(glance, url, name, **kwargs)
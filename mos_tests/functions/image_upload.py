@@ -0,0 +1,126 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from collections import namedtuple
+import hashlib
+import logging
+import mmap
+import os
+import time
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 4 * 1024 * 1024
+
+UploadStats = namedtuple('UploadStats', ['image_id', 'size', 'duration',
+                                         'digests'])
+
+
+def mb_per_second(stats):
+    """Returns upload throughput in MB/s"""
+    if not stats.duration:
+        return None
+    return stats.size / 1024.0 / 1024 / stats.duration
+
+
+class UploadStream(object):
+    """File-like reader over memory mapped file, which calculates digests of
+    data during reading
+
+    `read` follows file object contract (not more than `size` bytes are
+    returned), iteration yields chunks of `chunk_size`.
+
+    :param path: file path
+    :param chunk_size: size of chunks for iteration (and for upload)
+    :param algorithms: hashlib algorithms names
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE,
+                 algorithms=('md5', 'sha256')):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.hashes = {name: hashlib.new(name) for name in algorithms}
+        self.size = os.path.getsize(path)
+        self.offset = 0
+        self._file = open(path, 'rb')
+        self._map = None
+        if self.size:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            end = self.size
+        else:
+            end = min(self.offset + size, self.size)
+        if self.offset >= end:
+            return b''
+        chunk = self._map[self.offset:end]
+        self.offset = end
+        for value in self.hashes.values():
+            value.update(chunk)
+        return chunk
+
+    def __iter__(self):
+        return iter(lambda: self.read(self.chunk_size), b'')
+
+    @property
+    def digests(self):
+        return {name: value.hexdigest()
+                for name, value in self.hashes.items()}
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+def upload(glance, image_id, path, chunk_size=CHUNK_SIZE, verify=True):
+    """Upload file to glance image in single pass
+
+    Stream is passed to glanceclient as iterator, because for file-like
+    objects it reads data with its own fixed chunk size.
+
+    :param chunk_size: size of data chunks to send
+    :param verify: compare MD5 of sent data with image checksum calculated
+        by Glance
+    :rtype: UploadStats
+    """
+    with UploadStream(path, chunk_size=chunk_size) as stream:
+        start = time.time()
+        glance.images.upload(image_id, iter(stream), image_size=stream.size)
+        stats = UploadStats(image_id=image_id,
+                            size=stream.offset,
+                            duration=time.time() - start,
+                            digests=stream.digests)
+    logger.info('Image {0.image_id} uploaded: {0.size} bytes, '
+                '{0.duration:.1f}s, {1:.1f} MB/s'.format(
+                    stats, mb_per_second(stats) or 0))
+    if verify:
+        image = glance.images.get(image_id)
+        assert image.checksum == stats.digests['md5'], (
+            'Image {0} checksum is {1}, but uploaded data MD5 is {2}'.format(
+                image_id, image.checksum, stats.digests['md5']))
+    return stats
@@ -0,0 +1,201 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from array import array
+from collections import namedtuple
+import logging
+from multiprocessing.dummy import Pool
+
+from mos_tests.functions.stats import percentile
+from mos_tests.functions.stats import trimmed_mean
+
+
+logger = logging.getLogger(__name__)
+
+TCP_PORT = 5002
+UDP_PORT = 5003
+
+IperfSample = namedtuple('IperfSample', ['start', 'end', 'bandwidth'])
+
+
+class IperfError(Exception):
+    """iperf execution is failed or there are no results"""
+
+
+class BandwidthTooLow(Exception):
+    """Bandwidth is lower than expected
+
+    It is not AssertionError, so checks, which expect exceeded limit, don't
+    pass on broken traffic.
+    """
+
+
+def parse_csv_line(line):
+    """Parse `iperf -y C` output line
+
+    :return: IperfSample or None, if line is not a report
+    """
+    fields = line.strip().split(',')
+    if len(fields) < 9 or '-' not in fields[6]:
+        return None
+    start, end = fields[6].split('-')
+    return IperfSample(start=float(start), end=float(end),
+                       bandwidth=int(fields[8]))
+
+
+def steady_state_start(values, window=3, tolerance=0.1):
+    """Returns index of first sample of steady state
+
+    Steady state starts from first `window` samples, each of them differs
+    from their mean less than `tolerance` (relative). If there is no such
+    samples - 0 is returned.
+    """
+    for i in range(len(values) - window + 1):
+        chunk = values[i:i + window]
+        mean = sum(chunk) / float(window)
+        if mean > 0 and all(abs(x - mean) <= tolerance * mean
+                            for x in chunk):
+            return i
+    return 0
+
+
+class IperfResult(object):
+    """Per-interval iperf samples with bandwidth statistics"""
+
+    def __init__(self, server_ip, udp=False):
+        self.server_ip = server_ip
+        self.udp = udp
+        self.starts = array('d')
+        self.bandwidths = array('d')
+        self.summary = None
+
+    def __repr__(self):
+        return '<IperfResult {0} {1}>'.format(self.server_ip, self.stats())
+
+    def add(self, sample):
+        self.starts.append(sample.start)
+        self.bandwidths.append(sample.bandwidth)
+
+    @property
+    def steady_bandwidths(self):
+        return self.bandwidths[steady_state_start(self.bandwidths):]
+
+    def stats(self):
+        values = self.steady_bandwidths
+        if not values:
+            return {}
+        return {
+            'samples': len(self.bandwidths),
+            'steady_samples': len(values),
+            'trimmed_mean': trimmed_mean(values),
+            'median': percentile(values, 50),
+            'p10': percentile(values, 10),
+            'p90': percentile(values, 90),
+            'min': min(values),
+            'max': max(values),
+        }
+
+    def check_bandwidth(self, limit, low=0.75, high=1.05):
+        """Assert steady state bandwidth matches to `limit`
+
+        Trimmed mean should be between `low` * limit and `high` * limit, and
+        90 percentile should not exceed `high` * limit.
+
+        :raises IperfError: if there are no results
+        :raises BandwidthTooLow: if bandwidth is lower than `low` * limit
+        :raises AssertionError: if bandwidth exceeds `high` * limit
+        """
+        stats = self.stats()
+        if not stats:
+            raise IperfError('There is no iperf results for {0}'.format(
+                self.server_ip))
+        logger.info('iperf to {0}: {1}'.format(self.server_ip, stats))
+        if stats['trimmed_mean'] < low * limit:
+            raise BandwidthTooLow(
+                'Bandwidth is too low: {0[trimmed_mean]:.0f}, limit is '
+                '{1}'.format(stats, limit))
+        assert stats['trimmed_mean'] <= high * limit, (
+            'Bandwidth is too high: {0[trimmed_mean]:.0f}, limit is '
+            '{1}'.format(stats, limit))
+        assert stats['p90'] <= high * limit, (
+            'Bandwidth 90 percentile is too high: {0[p90]:.0f}, limit is '
+            '{1}'.format(stats, limit))
+
+
+def run_iperf(remote, server_ip, time=80, interval=2, udp=False,
+              bandwidth='10M', port=None):
+    """Run iperf client on remote and collect per-interval samples as they
+    are printed
+
+    For UDP only server report is used, because client report shows sent
+    traffic.
+
+    :rtype: IperfResult
+    """
+    interval = min(interval, time)
+    if port is None:
+        port = UDP_PORT if udp else TCP_PORT
+    if udp:
+        cmd = ('iperf -u -c {ip} -p {port} -x CDMS -y C -t {time} '
+               '-i {interval} --bandwidth {bandwidth}')
+    else:
+        cmd = 'iperf -c {ip} -p {port} -y C -t {time} -i {interval}'
+    cmd = cmd.format(ip=server_ip, port=port, time=time, interval=interval,
+                     bandwidth=bandwidth)
+
+    result = IperfResult(server_ip, udp=udp)
+    samples = []
+    chan, stdin, stdout, stderr = remote.execute_async(cmd)
+    try:
+        for line in stdout:
+            sample = parse_csv_line(line)
+            if sample is None:
+                continue
+            logger.debug('iperf to {0}: {1}'.format(server_ip, sample))
+            samples.append(sample)
+        exit_code = chan.recv_exit_status()
+        errors = stderr.read()
+    finally:
+        chan.close()
+    if exit_code != 0 or errors:
+        raise IperfError('Error during iperf execution (exit code {0}): '
+                         '{1}'.format(exit_code, errors))
+    if samples:
+        # Last line is summary (or server report for UDP)
+        result.summary = samples[-1]
+    if udp:
+        samples = samples[-1:]
+    elif len(samples) > 1:
+        samples = samples[:-1]
+    for sample in samples:
+        result.add(sample)
+    return result
+
+
+def run_iperf_pairs(pairs, **kwargs):
+    """Run iperf measurements for all pairs simultaneously
+
+    :param pairs: list of tuples (remote, server_ip), remotes should be
+        opened
+    :param kwargs: `run_iperf` arguments
+    :return: list of IperfResult in same order as pairs
+    """
+    if not pairs:
+        return []
+    pool = Pool(len(pairs))
+    try:
+        return pool.map(lambda pair: run_iperf(pair[0], pair[1], **kwargs),
+                        pairs)
+    finally:
+        pool.close()
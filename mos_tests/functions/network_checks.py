@@ -25,15 +25,22 @@ from mos_tests import settings
 
 logger = logging.getLogger(__name__)
 
-
-class MultipleAssertionErrors(AssertionError):
-    def __init__(self, exceptions):
-        self.exceptions = exceptions
-
-    def __str__(self):
-        msg = u'Multiple assertion errors raised:\n'
-        msg += '\n'.join([str(x) for x in self.exceptions])
-        return msg
+PROBE_PATH = '/tmp/mos_ping_probe.sh'
+
+# Pings all ips from arguments simultaneously and prints `<ip> <0|1>` lines.
+# Only busybox compatible shell features are used (cirros images)
+PROBE_SCRIPT = '''#!/bin/sh
+count=$1
+shift
+for ip in "$@"; do
+    (if ping -c "$count" -W 1 "$ip" >/dev/null 2>&1; then
+        echo "$ip 1"
+    else
+        echo "$ip 0"
+    fi) &
+done
+wait
+'''
 
 
 def run_on_vm(env,
@@ -120,29 +127,122 @@ def check_ping_from_vm(env,
 
 def check_vm_connectivity(env, os_conn, vm_keypair=None, timeout=4 * 60):
     """Check that all vms can ping each other and public ip"""
-    ping_plan = {}
-    exc = []
+    check_vm_mesh_connectivity(env, os_conn, vm_keypair=vm_keypair,
+                               timeout=timeout)
+
+
+def upload_ping_probe(remote):
+    """Write ping probe script to instance (sftp is not required)"""
+    remote.check_call("cat > {path} << 'EOF'\n{script}EOF\n"
+                      "chmod +x {path}".format(path=PROBE_PATH,
+                                               script=PROBE_SCRIPT),
+                      verbose=False)
+
+
+def probe_ips(remote, ips, count=1):
+    """Ping ips concurrently with uploaded probe script
+
+    :param remote: SSHClient to instance with uploaded probe script
+    :param ips: list of ip addresses to ping
+    :param count: pings count for each ip
+    :return: dict {ip: bool}
+    """
+    results = {ip: False for ip in ips}
+    if not ips:
+        return results
+    cmd = 'sh {path} {count} {ips}'.format(path=PROBE_PATH,
+                                           count=count,
+                                           ips=' '.join(ips))
+    result = remote.execute(cmd, verbose=False)
+    for line in result['stdout']:
+        parts = line.split()
+        if len(parts) == 2 and parts[0] in results:
+            results[parts[0]] = parts[1] == '1'
+    return results
+
+
+def _mesh_ping_from_vm(env, os_conn, vm, ips, vm_keypair=None, timeout=None,
+                       vm_login='cirros', vm_password='cubswin:)'):
+    results = {ip: False for ip in ips}
+
+    with os_conn.ssh_to_instance(env,
+                                 vm,
+                                 vm_keypair=vm_keypair,
+                                 username=vm_login,
+                                 password=vm_password) as remote:
+        upload_ping_probe(remote)
+
+        def predicate():
+            # Only failed pairs are checked again
+            failed = [ip for ip, ok in results.items() if not ok]
+            results.update(probe_ips(remote, failed))
+            return all(results.values())
 
-    def check(args):
-        server, ips_to_ping = args
         try:
-            check_ping_from_vm(env, os_conn, server, vm_keypair, ips_to_ping,
-                               timeout=timeout)
-        except AssertionError as e:
-            return e
+            common.wait(predicate,
+                        timeout_seconds=timeout or 0,
+                        sleep_seconds=1,
+                        waiting_for='pings from {0} to be '
+                                    'successful'.format(vm.name))
+        except TimeoutExpired as e:
+            logger.error(e)
+    return results
+
 
-    servers = os_conn.get_servers()
+def format_connectivity_matrix(matrix):
+    """Returns text table for connectivity matrix
+
+    `+` means successful ping, `-` - failed. Rows are servers ids.
+    """
+    targets = sorted(set(ip for row in matrix.values() for ip in row))
+    lines = ['{0:>36} {1}'.format('', ' '.join(
+        '{0:>15}'.format(x) for x in targets))]
+    for server_id, row in sorted(matrix.items()):
+        cells = []
+        for ip in targets:
+            if ip not in row:
+                cells.append('')
+            else:
+                cells.append('+' if row[ip] else '-')
+        lines.append('{0:>36} {1}'.format(server_id, ' '.join(
+            '{0:>15}'.format(x) for x in cells)))
+    return '\n'.join(lines)
+
+
+def check_vm_mesh_connectivity(env, os_conn, vm_keypair=None, servers=None,
+                               timeout=4 * 60, vm_login='cirros',
+                               vm_password='cubswin:)'):
+    """Check that all vms can ping each other and public ip
+
+    Probe script is uploaded to each vm once and pings all targets from vm
+    simultaneously, only failed pairs are re-checked.
+
+    :return: connectivity matrix as dict {vm id: {ip: bool}}
+    """
+    servers = servers or os_conn.get_servers()
+    ping_plan = {}
     for server1 in servers:
         ips_to_ping = [settings.PUBLIC_TEST_IP]
         for server2 in servers:
             if server1 == server2:
                 continue
-            ips_to_ping += os_conn.get_nova_instance_ips(
-                server2).values()
+            ips_to_ping += os_conn.get_nova_instance_ips(server2).values()
         ping_plan[server1] = ips_to_ping
+
+    def check(args):
+        server, ips_to_ping = args
+        return server.id, _mesh_ping_from_vm(env, os_conn, server,
+                                             ips_to_ping,
+                                             vm_keypair=vm_keypair,
+                                             timeout=timeout,
+                                             vm_login=vm_login,
+                                             vm_password=vm_password)
+
     p = Pool(len(ping_plan))
-    for result in p.imap_unordered(check, ping_plan.items()):
-        if result is not None:
-            exc.append(result)
-    if len(exc) > 0:
-        raise MultipleAssertionErrors(exc)
+    matrix = dict(p.imap_unordered(check, ping_plan.items()))
+    p.close()
+
+    assert all(all(row.values()) for row in matrix.values()), (
+        'Connectivity errors:\n{0}'.format(
+            format_connectivity_matrix(matrix)))
+    return matrix
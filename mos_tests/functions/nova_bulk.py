@@ -0,0 +1,196 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Bulk boot of Nova servers with pipelined readiness stages
+
+Identical servers are booted with single request (`min_count`/`max_count`),
+different ones - with concurrent requests. Statuses of all servers are got
+with single `list` call per poll, and each server goes to next stages (SSH
+readiness, floating IP association) in thread pool as soon as it becomes
+ACTIVE, so waits of different servers overlap. Time from request to the end
+of each stage is recorded for each server.
+"""
+
+import logging
+from multiprocessing.dummy import Pool
+import threading
+import time
+
+from mos_tests.environment.ssh import NetNsForwardProxy
+from mos_tests.functions.common import wait
+from mos_tests.functions.stats import latency_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+class ServersBulk(object):
+    """Boot many servers and wait for them to be ready
+
+    :param os_conn: OpenStackActions
+    :param concurrency: max count of simultaneous API calls
+    """
+
+    def __init__(self, os_conn, concurrency=10):
+        self.os_conn = os_conn
+        self.concurrency = concurrency
+        self.lock = threading.Lock()
+        # {server id: request time}
+        self.requested = {}
+        # {server id: {stage: seconds from request to stage end}}
+        self.timings = {}
+        # {server id: floating ip}
+        self.floating_ips = {}
+
+    @property
+    def nova(self):
+        return self.os_conn.nova
+
+    def _map(self, func, items):
+        if not items:
+            return []
+        pool = Pool(min(self.concurrency, len(items)))
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+
+    def _record(self, server_id, stage, done_at=None):
+        if done_at is None:
+            done_at = time.time()
+        with self.lock:
+            self.timings.setdefault(server_id, {})[stage] = (
+                done_at - self.requested[server_id])
+
+    def _image_id(self, image_id):
+        if image_id is None:
+            image_id = self.os_conn._get_cirros_image().id
+        return image_id
+
+    def create_many(self, name, count, image_id=None, flavor=1, **kwargs):
+        """Boot `count` identical servers with single request
+
+        Nova names servers as `<name>-<index>`, so `name` should be unique.
+
+        :return: list of created servers
+        """
+        start = time.time()
+        self.nova.servers.create(name=name, image=self._image_id(image_id),
+                                 flavor=flavor, min_count=count,
+                                 max_count=count, **kwargs)
+        done = time.time()
+        servers = self.nova.servers.list(
+            search_opts={'name': '^{0}(-[0-9]+)?$'.format(name)})
+        assert len(servers) == count, (
+            'Expected {0} servers with name {1}, found {2}'.format(
+                count, name, len(servers)))
+        for server in servers:
+            self.requested[server.id] = start
+            self._record(server.id, 'create', done)
+        return sorted(servers, key=lambda x: x.name)
+
+    def create_each(self, params_list):
+        """Boot servers with concurrent requests
+
+        :param params_list: list of dicts with `nova.servers.create` kwargs,
+            `image` is cirros image by default, `flavor` is 1 by default
+        :return: list of created servers in same order
+        """
+        def create(params):
+            params = dict(params)
+            params['image'] = self._image_id(params.get('image'))
+            params.setdefault('flavor', 1)
+            start = time.time()
+            server = self.nova.servers.create(**params)
+            self.requested[server.id] = start
+            self._record(server.id, 'create')
+            return server
+
+        return self._map(create, params_list)
+
+    def wait_ready(self, servers, ssh=True, floating_ip=False,
+                   use_neutron=False, timeout=10 * 60):
+        """Wait for servers to be ACTIVE and pass next stages
+
+        SSH readiness check and floating IP association of each server are
+        started as soon as it becomes ACTIVE, stages of all servers run
+        concurrently. ERROR status of any server raises AssertionError. On
+        any error unfinished stages are stopped before return.
+
+        :return: list of servers details in same order
+        """
+        deadline = time.time() + timeout
+        pending = {x.id for x in servers}
+        pool = Pool(max(len(servers), 1))
+        finishes = []
+        stopped = threading.Event()
+
+        def finish(server):
+            if ssh:
+                target = self.os_conn.get_instance_proxies(
+                    self.os_conn.env, server, proxy_cls=NetNsForwardProxy)
+                wait(lambda: (stopped.is_set() or
+                              self.os_conn.is_server_ssh_ready(server,
+                                                               target)),
+                     timeout_seconds=max(deadline - time.time(), 1),
+                     waiting_for='instance {0} to be ssh ready'.format(
+                         server.id))
+                if stopped.is_set():
+                    return
+                self._record(server.id, 'ssh')
+            if floating_ip:
+                self.floating_ips[server.id] = self.os_conn.assign_floating_ip(
+                    server, use_neutron=use_neutron)
+                self._record(server.id, 'floating_ip')
+
+        def predicate():
+            now = time.time()
+            for server in self.nova.servers.list():
+                if server.id not in pending:
+                    continue
+                assert server.status != 'ERROR', (
+                    'Instance {0} is in ERROR status: {1}'.format(
+                        server.id, getattr(server, 'fault', None)))
+                if server.status == 'ACTIVE':
+                    self._record(server.id, 'active', now)
+                    pending.discard(server.id)
+                    finishes.append(pool.apply_async(finish, (server,)))
+            return not pending
+
+        try:
+            wait(predicate, timeout_seconds=timeout, sleep_seconds=(1, 10, 2),
+                 waiting_for='{0} instances to become at ACTIVE '
+                             'status'.format(len(servers)))
+            for result in finishes:
+                result.get()
+        finally:
+            # Thread pool terminate waits for running tasks, so they are
+            # stopped first
+            stopped.set()
+            pool.terminate()
+            pool.join()
+        return [self.nova.servers.get(x.id) for x in servers]
+
+    def stats(self):
+        """Returns dict {stage: latency stats}"""
+        stages = {}
+        for timings in self.timings.values():
+            for stage, value in timings.items():
+                stages.setdefault(stage, []).append(value)
+        return {stage: latency_stats(values)
+                for stage, values in stages.items()}
+
+    def log_stats(self):
+        for stage, stats in sorted(self.stats().items()):
+            logger.info('Instances {0} latency: {1}'.format(stage, stats))
@@ -0,0 +1,219 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from array import array
+import bisect
+from collections import namedtuple
+import logging
+import re
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# `icmp_seq=` for iputils ping, `seq=` for busybox ping
+SEQ_RE = re.compile(r'(?:icmp_)?seq=(\d+)')
+RTT_RE = re.compile(r'time=([\d.]+) ?ms')
+# Timestamp printed by `ping -D`
+TIMESTAMP_RE = re.compile(r'^\[(\d+\.\d+)\]')
+TRANSMITTED_RE = re.compile(r'(\d+) packets transmitted')
+LOSS_RE = re.compile(r'([\d.]+)% packet loss')
+
+Outage = namedtuple('Outage', ['start', 'end', 'duration', 'lost'])
+
+
+def parse_loss_percent(output):
+    """Returns packet loss percent from ping summary or None"""
+    match = LOSS_RE.search(output)
+    if match is None:
+        return None
+    return float(match.group(1))
+
+
+class PingTimeline(object):
+    """Timeline of ping replies
+
+    Each reply is stored with sequence number, receive time and rtt in
+    arrays, outages are calculated from gaps in sequence numbers.
+
+    :param interval: ping interval in seconds
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.seqs = array('l')
+        self.times = array('d')
+        self.rtts = array('d')
+        self.transmitted = None
+        self.group_start = None
+
+    def __repr__(self):
+        return ('<PingTimeline sent={0.sent} received={0.received} '
+                'loss={0.loss_percent:.1f}%>'.format(self))
+
+    def add_reply(self, seq, timestamp=None, rtt=None):
+        """Add reply, replies may come out of order, duplicates are ignored"""
+        if timestamp is None:
+            timestamp = time.time()
+        if rtt is None:
+            rtt = -1
+        if not self.seqs or seq > self.seqs[-1]:
+            if not self.seqs or seq != self.seqs[-1] + 1:
+                self.group_start = seq
+            self.seqs.append(seq)
+            self.times.append(timestamp)
+            self.rtts.append(rtt)
+            return
+        index = bisect.bisect_left(self.seqs, seq)
+        if self.seqs[index] == seq:
+            return
+        self.seqs.insert(index, seq)
+        self.times.insert(index, timestamp)
+        self.rtts.insert(index, rtt)
+        index = len(self.seqs) - 1
+        while index > 0 and self.seqs[index - 1] == self.seqs[index] - 1:
+            index -= 1
+        self.group_start = self.seqs[index]
+
+    def feed_line(self, line, timestamp=None):
+        """Parse ping output line
+
+        :return: sequence number of reply or None, if line is not a reply
+        """
+        transmitted = TRANSMITTED_RE.search(line)
+        if transmitted is not None:
+            self.transmitted = int(transmitted.group(1))
+            return None
+        seq = SEQ_RE.search(line)
+        if seq is None or 'time=' not in line:
+            return None
+        seq = int(seq.group(1))
+        ts = TIMESTAMP_RE.search(line)
+        if ts is not None:
+            timestamp = float(ts.group(1))
+        rtt = RTT_RE.search(line)
+        if rtt is not None:
+            rtt = float(rtt.group(1))
+        self.add_reply(seq, timestamp=timestamp, rtt=rtt)
+        return seq
+
+    def feed(self, lines):
+        """Parse all lines from iterable (file, list, generator)"""
+        for line in lines:
+            self.feed_line(line)
+        return self
+
+    def follow(self, lines):
+        """Parse lines from iterable and yields after each reply"""
+        for line in lines:
+            logger.debug('Ping result: {}'.format(line.strip()))
+            if self.feed_line(line) is not None:
+                yield self
+
+    @property
+    def first_seq(self):
+        return self.seqs[0] if self.seqs else None
+
+    @property
+    def last_seq(self):
+        return self.seqs[-1] if self.seqs else None
+
+    @property
+    def received(self):
+        return len(self.seqs)
+
+    @property
+    def sent(self):
+        if self.transmitted is not None:
+            return self.transmitted
+        if not self.seqs:
+            return 0
+        return self.last_seq - self.first_seq + 1
+
+    @property
+    def lost(self):
+        return max(self.sent - self.received, 0)
+
+    @property
+    def loss_percent(self):
+        if self.sent == 0:
+            return 0.0
+        return 100.0 * self.lost / self.sent
+
+    @property
+    def group_len(self):
+        """Count of last continuous replies"""
+        if not self.seqs:
+            return 0
+        return self.last_seq - self.group_start + 1
+
+    def outages(self, min_lost=1):
+        """Returns list of Outage for each gap in replies
+
+        Outage duration is time between last reply before gap and first
+        reply after it minus one ping interval.
+        """
+        result = []
+        seqs = self.seqs
+        times = self.times
+        for i in range(1, len(seqs)):
+            lost = seqs[i] - seqs[i - 1] - 1
+            if lost < min_lost:
+                continue
+            duration = max(times[i] - times[i - 1] - self.interval, 0)
+            result.append(Outage(start=times[i - 1], end=times[i],
+                                 duration=duration, lost=lost))
+        return result
+
+    @property
+    def downtime(self):
+        """Total outages duration in seconds"""
+        return sum(x.duration for x in self.outages())
+
+    @property
+    def longest_outage(self):
+        """Longest Outage or None"""
+        outages = self.outages()
+        if not outages:
+            return None
+        return max(outages, key=lambda x: x.duration)
+
+    def recovery_time(self, since, good_pings=10):
+        """Time from `since` to start of first `good_pings` continuous
+        replies received after it
+
+        :param since: timestamp (for example, failover start time)
+        :return: seconds or None, if connectivity is not recovered
+        """
+        group_start = None
+        for i in range(len(self.seqs)):
+            if self.times[i] < since:
+                continue
+            if group_start is None or self.seqs[i] != self.seqs[i - 1] + 1:
+                group_start = i
+            if i - group_start + 1 >= good_pings:
+                return max(self.times[group_start] - since, 0)
+        return None
+
+    def stats(self):
+        """Returns dict with calculated statistics"""
+        longest = self.longest_outage
+        return {
+            'sent': self.sent,
+            'received': self.received,
+            'loss_percent': self.loss_percent,
+            'outages': len(self.outages()),
+            'downtime': self.downtime,
+            'longest_outage': longest.duration if longest else 0,
+        }
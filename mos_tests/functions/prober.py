@@ -0,0 +1,268 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from contextlib import contextmanager
+import errno
+import itertools
+import logging
+import os
+import select
+import socket
+import struct
+import threading
+import time
+
+from mos_tests.functions.ping_stats import PingTimeline
+
+
+logger = logging.getLogger(__name__)
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP_HEADER = struct.Struct('!BBHHH')
+TIMESTAMP = struct.Struct('!d')
+
+_idents = itertools.count()
+
+
+def icmp_checksum(data):
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack('!{0}H'.format(len(data) // 2), data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def make_echo_request(ident, seq, timestamp):
+    payload = TIMESTAMP.pack(timestamp) + b'mos-tests-probe!'
+    header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = icmp_checksum(header + payload)
+    header = ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum, ident, seq)
+    return header + payload
+
+
+def open_icmp_socket():
+    """Returns tuple (socket, is_raw) or None if ICMP is not permitted
+
+    Raw socket requires root (or CAP_NET_RAW), datagram ICMP socket requires
+    `net.ipv4.ping_group_range` sysctl to include user group.
+    """
+    for sock_type, is_raw in ((socket.SOCK_RAW, True),
+                              (socket.SOCK_DGRAM, False)):
+        try:
+            sock = socket.socket(socket.AF_INET, sock_type,
+                                 socket.IPPROTO_ICMP)
+        except socket.error as e:
+            logger.debug("Can't open ICMP socket ({0}): {1}".format(
+                'raw' if is_raw else 'dgram', e))
+            continue
+        sock.setblocking(0)
+        return sock, is_raw
+    return None
+
+
+class Prober(object):
+    """Probe many targets concurrently from single select loop
+
+    ICMP echo is used where it is permitted, TCP connect to `port` otherwise
+    (both successful connect and refused connection mean target is
+    reachable). Results are collected to PingTimeline for each target.
+
+    :param targets: list of ip addresses
+    :param interval: probe interval in seconds
+    :param mode: 'icmp', 'tcp' or None to choose automatically
+    :param port: TCP port for 'tcp' mode
+    :param timeout: TCP connect timeout in seconds
+    """
+
+    def __init__(self, targets, interval=0.1, mode=None, port=22,
+                 timeout=1):
+        self.targets = list(targets)
+        self.interval = interval
+        self.port = port
+        self.timeout = timeout
+        self.timelines = {ip: PingTimeline(interval=interval)
+                          for ip in self.targets}
+        self.sent = {ip: 0 for ip in self.targets}
+        # Unique identifier to separate replies for different probers
+        self.ident = (os.getpid() + next(_idents)) & 0xffff
+        self._icmp = None
+        self._is_raw = False
+        self._tcp_pending = {}
+        # Last sent sequence number
+        self._seq = -1
+        self._stop = threading.Event()
+        self._thread = None
+
+        if mode in (None, 'icmp'):
+            icmp = open_icmp_socket()
+            if icmp is not None:
+                self._icmp, self._is_raw = icmp
+            elif mode == 'icmp':
+                raise socket.error('ICMP sockets are not permitted')
+        self.mode = 'icmp' if self._icmp is not None else 'tcp'
+        logger.debug('Probing {0} in {1} mode'.format(self.targets,
+                                                      self.mode))
+
+    def __repr__(self):
+        return '<Prober {0.mode} {0.targets}>'.format(self)
+
+    def _unwrap_seq(self, seq):
+        """Returns full sequence number for 16 bit ICMP sequence number"""
+        return self._seq - ((self._seq - seq) & 0xffff)
+
+    def _send_round(self, seq):
+        now = time.time()
+        self._seq = seq
+        for ip in self.targets:
+            self.sent[ip] += 1
+            self.timelines[ip].transmitted = self.sent[ip]
+            if self.mode == 'icmp':
+                packet = make_echo_request(self.ident, seq & 0xffff, now)
+                try:
+                    self._icmp.sendto(packet, (ip, 0))
+                except socket.error as e:
+                    logger.debug('Send to {0} failed: {1}'.format(ip, e))
+            else:
+                self._tcp_connect(ip, seq, now)
+
+    def _tcp_connect(self, ip, seq, now):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(0)
+        code = sock.connect_ex((ip, self.port))
+        if code in (0, errno.ECONNREFUSED):
+            self.timelines[ip].add_reply(seq, timestamp=now, rtt=0)
+            sock.close()
+        elif code in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+            self._tcp_pending[sock] = (ip, seq, now)
+        else:
+            sock.close()
+
+    def _handle_icmp(self):
+        """Read all received packets, until socket has no more data"""
+        while True:
+            try:
+                data, addr = self._icmp.recvfrom(2048)
+            except socket.error:
+                return
+            self._handle_icmp_packet(data, addr, time.time())
+
+    def _handle_icmp_packet(self, data, addr, now):
+        if self._is_raw:
+            data = data[(ord(data[0:1]) & 0x0f) * 4:]
+        if len(data) < ICMP_HEADER.size + TIMESTAMP.size:
+            return
+        icmp_type, _, _, ident, seq = ICMP_HEADER.unpack_from(data)
+        # Kernel changes identifier for datagram sockets
+        if icmp_type != ICMP_ECHO_REPLY or (self._is_raw and
+                                            ident != self.ident):
+            return
+        timeline = self.timelines.get(addr[0])
+        if timeline is None:
+            return
+        seq = self._unwrap_seq(seq)
+        if seq < 0:
+            return
+        sent_at = TIMESTAMP.unpack_from(data, ICMP_HEADER.size)[0]
+        timeline.add_reply(seq, timestamp=now, rtt=(now - sent_at) * 1000)
+
+    def _handle_tcp(self, sock):
+        ip, seq, sent_at = self._tcp_pending.pop(sock)
+        code = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        sock.close()
+        if code in (0, errno.ECONNREFUSED):
+            now = time.time()
+            self.timelines[ip].add_reply(seq, timestamp=now,
+                                         rtt=(now - sent_at) * 1000)
+
+    def _expire_tcp(self):
+        deadline = time.time() - self.timeout
+        for sock, (_, _, sent_at) in list(self._tcp_pending.items()):
+            if sent_at < deadline:
+                del self._tcp_pending[sock]
+                sock.close()
+
+    def run(self, duration=None, count=None):
+        """Probe targets until stop called, `duration` seconds elapsed or
+        `count` rounds sent"""
+        seq = 0
+        start = next_send = time.time()
+        while not self._stop.is_set():
+            now = time.time()
+            if duration is not None and now - start >= duration:
+                break
+            if now >= next_send:
+                if count is not None and seq >= count:
+                    break
+                self._send_round(seq)
+                seq += 1
+                next_send += self.interval
+                if count is not None and seq >= count:
+                    # Wait for last replies
+                    next_send = time.time() + self.timeout
+            readers = [self._icmp] if self._icmp is not None else []
+            writers = list(self._tcp_pending)
+            wait_time = max(min(next_send - time.time(), self.interval), 0)
+            readable, writable, _ = select.select(readers, writers, [],
+                                                  wait_time)
+            if readable:
+                self._handle_icmp()
+            for sock in writable:
+                self._handle_tcp(sock)
+            self._expire_tcp()
+        self.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=repr(self))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        for sock in self._tcp_pending:
+            sock.close()
+        self._tcp_pending.clear()
+        if self._icmp is not None:
+            self._icmp.close()
+            self._icmp = None
+
+
+def probe(targets, count=None, duration=None, **kwargs):
+    """Probe targets `count` rounds or `duration` seconds
+
+    :param kwargs: Prober arguments
+    :return: dict {ip: PingTimeline}
+    """
+    prober = Prober(targets, **kwargs)
+    prober.run(duration=duration, count=count)
+    return prober.timelines
+
+
+@contextmanager
+def background_probe(targets, **kwargs):
+    """Probe targets in background thread before enter and stop it after
+
+    Yields dict {ip: PingTimeline}, which is filled during probing.
+    """
+    prober = Prober(targets, **kwargs)
+    prober.start()
+    try:
+        yield prober.timelines
+    finally:
+        prober.stop()
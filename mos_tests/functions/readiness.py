@@ -0,0 +1,239 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Parallel readiness checks of TCP ports and HTTP endpoints
+
+All targets are checked simultaneously from single select loop with
+non-blocking sockets. Failed attempts are retried until target reaches
+expected state or its own deadline is passed. TCP target is accessible if
+connection is established, HTTP target - if any response data is received
+for `GET path` request.
+"""
+
+from collections import namedtuple
+from collections import OrderedDict
+import errno
+import logging
+import select
+import socket
+import time
+
+from waiting import TimeoutExpired
+
+
+logger = logging.getLogger(__name__)
+
+Target = namedtuple('Target', ['ip', 'port', 'path', 'timeout'])
+# path None - TCP check only, timeout None - prober timeout
+Target.__new__.__defaults__ = (None, None)
+
+Readiness = namedtuple('Readiness', [
+    'target', 'reached', 'accessible', 'seconds', 'attempts', 'error'])
+
+
+def format_target(target):
+    if target.path is None:
+        return '{0.ip}:{0.port}'.format(target)
+    return 'http://{0.ip}:{0.port}{0.path}'.format(target)
+
+
+class _Attempt(object):
+
+    def __init__(self, target, sock, started):
+        self.target = target
+        self.sock = sock
+        self.started = started
+        self.connected = False
+
+
+class ReadinessProber(object):
+    """Check many targets concurrently until they reach expected state
+
+    :param targets: list of Target
+    :param timeout: default timeout for each target in seconds
+    :param connect_timeout: timeout of single attempt in seconds
+    :param retry_interval: delay between attempts for target in seconds
+    :param negative: wait for targets to become inaccessible
+    """
+
+    def __init__(self, targets, timeout=300, connect_timeout=5,
+                 retry_interval=2, negative=False):
+        # Duplicates are probed once
+        self.targets = list(OrderedDict.fromkeys(targets))
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retry_interval = retry_interval
+        self.negative = negative
+        self.results = {}
+        self._attempts = {}
+        self._counts = {target: 0 for target in self.targets}
+        self._errors = {}
+        self._next_try = {}
+        self._deadlines = {}
+        self._start = None
+
+    def _begin(self, target, now):
+        self._counts[target] += 1
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(0)
+        attempt = _Attempt(target, sock, now)
+        code = sock.connect_ex((str(target.ip), target.port))
+        if code in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+            self._attempts[sock] = attempt
+        elif code == 0:
+            self._attempts[sock] = attempt
+            self._connected(attempt, now)
+        else:
+            sock.close()
+            self._finish(target, False, now, os_error=code)
+
+    def _connected(self, attempt, now):
+        if attempt.target.path is None:
+            self._close(attempt)
+            self._finish(attempt.target, True, now)
+            return
+        request = 'GET {0} HTTP/1.0\r\nHost: {1}\r\n\r\n'.format(
+            attempt.target.path, attempt.target.ip)
+        try:
+            attempt.sock.send(request.encode('ascii'))
+        except socket.error as e:
+            self._close(attempt)
+            self._finish(attempt.target, False, now, error=str(e))
+            return
+        attempt.connected = True
+
+    def _close(self, attempt):
+        self._attempts.pop(attempt.sock, None)
+        attempt.sock.close()
+
+    def _finish(self, target, accessible, now, os_error=None, error=None):
+        """Handle attempt result"""
+        if os_error is not None:
+            error = errno.errorcode.get(os_error, str(os_error))
+        if error is not None:
+            self._errors[target] = error
+        if accessible != self.negative:
+            self.results[target] = Readiness(
+                target=target, reached=True, accessible=accessible,
+                seconds=now - self._start, attempts=self._counts[target],
+                error=None)
+        else:
+            self._next_try[target] = now + self.retry_interval
+
+    def _handle_writable(self, attempt, now):
+        code = attempt.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if code:
+            self._close(attempt)
+            self._finish(attempt.target, False, now, os_error=code)
+        else:
+            self._connected(attempt, now)
+
+    def _handle_readable(self, attempt, now):
+        try:
+            data = attempt.sock.recv(4096)
+        except socket.error as e:
+            data, error = b'', str(e)
+        else:
+            error = None if data else 'connection closed without response'
+        self._close(attempt)
+        self._finish(attempt.target, bool(data), now, error=error)
+
+    def _expire(self, now):
+        for attempt in list(self._attempts.values()):
+            if now - attempt.started >= self.connect_timeout:
+                self._close(attempt)
+                self._finish(attempt.target, False, now, error='timeout')
+        for target in self.targets:
+            if target in self.results or now < self._deadlines[target]:
+                continue
+            for attempt in list(self._attempts.values()):
+                if attempt.target == target:
+                    self._close(attempt)
+            self.results[target] = Readiness(
+                target=target, reached=False, accessible=self.negative,
+                seconds=None, attempts=self._counts[target],
+                error=self._errors.get(target))
+
+    def run(self):
+        """Check targets until all are finished
+
+        :return: dict {Target: Readiness}
+        """
+        self._start = time.time()
+        for target in self.targets:
+            self._next_try[target] = self._start
+            self._deadlines[target] = self._start + (
+                self.timeout if target.timeout is None else target.timeout)
+        try:
+            while len(self.results) < len(self.targets):
+                now = time.time()
+                active = {x.target for x in self._attempts.values()}
+                for target in self.targets:
+                    if (target not in self.results and
+                            target not in active and
+                            self._next_try[target] <= now):
+                        self._begin(target, now)
+                readers = [sock for sock, attempt in self._attempts.items()
+                           if attempt.connected]
+                writers = [sock for sock, attempt in self._attempts.items()
+                           if not attempt.connected]
+                readable, writable, _ = select.select(readers, writers, [],
+                                                      0.2)
+                now = time.time()
+                for sock in writable:
+                    if sock in self._attempts:
+                        self._handle_writable(self._attempts[sock], now)
+                for sock in readable:
+                    if sock in self._attempts:
+                        self._handle_readable(self._attempts[sock], now)
+                self._expire(now)
+        finally:
+            for attempt in list(self._attempts.values()):
+                self._close(attempt)
+        return self.results
+
+
+def probe(targets, **kwargs):
+    """Check targets with ReadinessProber and log readiness matrix
+
+    :return: dict {Target: Readiness}
+    """
+    results = ReadinessProber(targets, **kwargs).run()
+    for target in targets:
+        result = results[target]
+        if result.reached:
+            logger.info('{0}: {1} after {2:.1f}s ({3} attempts)'.format(
+                format_target(target),
+                'accessible' if result.accessible else 'inaccessible',
+                result.seconds, result.attempts))
+        else:
+            logger.info('{0}: not reached expected state ({1} attempts, '
+                        'last error: {2})'.format(format_target(target),
+                                                  result.attempts,
+                                                  result.error))
+    return results
+
+
+def wait_ready(targets, timeout=300, negative=False, **kwargs):
+    """Wait for all targets to be accessible (or inaccessible if `negative`)
+
+    :raises TimeoutExpired: if some target didn't reach expected state
+    :return: dict {Target: Readiness}
+    """
+    results = probe(targets, timeout=timeout, negative=negative, **kwargs)
+    failed = [format_target(x) for x in targets if not results[x].reached]
+    if failed:
+        raise TimeoutExpired(timeout, '{0} to be {1}'.format(
+            ', '.join(failed), 'inaccessible' if negative else 'accessible'))
+    return results
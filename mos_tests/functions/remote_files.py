@@ -0,0 +1,128 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Test files generated directly on nodes
+
+Data is generated on node and written with single pipeline, MD5 is
+calculated in same pass (`tee` to `md5sum`). Random data with seed is
+produced with AES-CTR keystream by `openssl enc`, so it is reproducible and
+much faster than `/dev/urandom`. Pipeline fails if any command fails or
+file size differs from requested one.
+
+Big files should be 'sparse': they are created with `truncate` and take no
+disk space on node (MD5 is not calculated for them).
+
+Files are cached on node by (size, seed, entropy): existing file is reused
+without regeneration. Tests should not change these files.
+"""
+
+from collections import namedtuple
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+FILES_DIR = '/tmp'
+FILES_PREFIX = 'mos_test_file'
+
+# Each command reads exactly `size` bytes, so no command of pipeline is
+# killed by SIGPIPE
+SOURCES = {
+    'zero': 'head -c {size} /dev/zero',
+    'urandom': 'head -c {size} /dev/urandom',
+    'random': ('head -c {size} /dev/zero | openssl enc -aes-128-ctr -nosalt '
+               '-pass pass:{seed} 2>/dev/null'),
+}
+
+RemoteFile = namedtuple('RemoteFile', ['path', 'name', 'size', 'md5'])
+
+
+def make_command(path, size, seed=0, entropy='random'):
+    """Returns shell command, which creates file and prints its MD5
+
+    Existing file with same size and MD5 file near it is not recreated. File
+    lock is used to prevent simultaneous generation of same file.
+    """
+    size_ok = '[ "$(stat -c %s {path} 2>/dev/null)" = "{size}" ]'.format(
+        path=path, size=size)
+    if entropy == 'sparse':
+        script = '{size_ok} || truncate -s {size} {path}'.format(
+            size_ok=size_ok, path=path, size=size)
+    else:
+        source = SOURCES[entropy].format(seed=seed, size=size)
+        script = (
+            'set -o pipefail; '
+            'if {size_ok} && [ -s {path}.md5 ]; then cat {path}.md5; else '
+            'rm -f {path}.md5 && '
+            '{source} | tee {path} | md5sum | cut -d" " -f1 '
+            '> {path}.md5.tmp && {size_ok} && '
+            'mv {path}.md5.tmp {path}.md5 && cat {path}.md5; fi').format(
+                path=path, source=source, size_ok=size_ok)
+    return "flock {path}.lock bash -c '{script}'".format(path=path,
+                                                         script=script)
+
+
+class RemoteFileFactory(object):
+    """Creates test files on nodes and caches them"""
+
+    def __init__(self, directory=FILES_DIR):
+        self.directory = directory
+        self.lock = threading.Lock()
+        # {host: remote}
+        self.remotes = {}
+
+    def get(self, remote, size, seed=0, entropy='random'):
+        """Returns RemoteFile with `size` bytes on node
+
+        :param remote: opened SSHClient
+        :param seed: data seed (ignored for 'zero', 'urandom' and 'sparse'
+            entropy)
+        :param entropy: 'random' (reproducible), 'urandom', 'zero' or
+            'sparse' (md5 is None)
+        """
+        if entropy != 'random':
+            seed = 0
+        name = '{prefix}_{entropy}_{seed}_{size}'.format(
+            prefix=FILES_PREFIX, entropy=entropy, seed=seed, size=size)
+        path = '{0}/{1}'.format(self.directory, name)
+        with self.lock:
+            self.remotes.setdefault(remote.host, remote)
+        logger.info('Getting {0} bytes {1} file on {2}'.format(
+            size, entropy, remote.host))
+        md5 = remote.check_call(make_command(path, size, seed, entropy),
+                                verbose=False).stdout_string.strip() or None
+        return RemoteFile(path=path, name=name, size=size, md5=md5)
+
+    def cleanup(self):
+        """Remove all files from nodes"""
+        with self.lock:
+            remotes = list(self.remotes.values())
+            self.remotes.clear()
+        for remote in remotes:
+            try:
+                with remote:
+                    remote.execute('rm -f {0}/{1}_*'.format(self.directory,
+                                                            FILES_PREFIX))
+            except Exception as e:
+                logger.warning("Can't remove test files from {0}: {1}".format(
+                    remote.host, e))
+
+
+factory = RemoteFileFactory()
+
+
+def get_file(remote, size, **kwargs):
+    """Returns RemoteFile from session factory"""
+    return factory.get(remote, size, **kwargs)
@@ -0,0 +1,51 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Generic statistics helpers"""
+
+
+def percentile(values, p):
+    """Returns percentile `p` (0..100) with linear interpolation"""
+    values = sorted(values)
+    if not values:
+        return None
+    k = (len(values) - 1) * p / 100.0
+    f = int(k)
+    c = min(f + 1, len(values) - 1)
+    return values[f] + (values[c] - values[f]) * (k - f)
+
+
+def trimmed_mean(values, proportion=0.1):
+    """Mean of values without `proportion` of lowest and highest ones"""
+    values = sorted(values)
+    if not values:
+        return None
+    cut = int(len(values) * proportion)
+    if cut and len(values) > 2 * cut:
+        values = values[cut:-cut]
+    return sum(values) / float(len(values))
+
+
+def latency_stats(values):
+    """Returns dict with latency percentiles (seconds)"""
+    if not values:
+        return {}
+    return {
+        'count': len(values),
+        'min': min(values),
+        'p50': percentile(values, 50),
+        'p90': percentile(values, 90),
+        'p99': percentile(values, 99),
+        'max': max(values),
+    }
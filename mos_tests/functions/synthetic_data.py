@@ -0,0 +1,118 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import hashlib
+
+
+BLOCK_SIZE = 1024 * 1024
+# Odd stride makes rotation of every block different
+ROTATION_STRIDE = 7919
+
+
+def make_block(seed, size=BLOCK_SIZE):
+    """Returns `size` pseudo random (incompressible) bytes for `seed`"""
+    digests = []
+    total = 0
+    counter = 0
+    while total < size:
+        digest = hashlib.sha256(
+            '{0}:{1}'.format(seed, counter).encode('utf-8')).digest()
+        digests.append(digest)
+        total += len(digest)
+        counter += 1
+    return b''.join(digests)[:size]
+
+
+class SyntheticFile(object):
+    """Deterministic incompressible file-like data source
+
+    Data is produced from one pre-generated random block: each block sized
+    part of stream is this block rotated by different offset. Chunks are
+    `memoryview` slices of the block without copying, so single read returns
+    at most till the end of current block.
+
+    Same `size` and `seed` always give same data, so digest can be
+    calculated again without storing data.
+
+    :param size: data size in bytes (may be tens of GB)
+    :param seed: data seed
+    :param algorithms: hashlib algorithms for streaming digests
+    :param copy: return bytes instead of memoryview
+    """
+
+    _blocks = {}
+
+    def __init__(self, size, seed=0, block_size=BLOCK_SIZE,
+                 algorithms=('md5',), copy=False):
+        self.size = size
+        self.seed = seed
+        self.block_size = block_size
+        self.copy = copy
+        self.pos = 0
+        self.hashes = {name: hashlib.new(name) for name in algorithms}
+        key = (seed, block_size)
+        if key not in self._blocks:
+            block = make_block(seed, block_size)
+            # Doubled block allows to get any rotation with single slice
+            self._blocks[key] = memoryview(block + block)
+        self._view = self._blocks[key]
+
+    def __len__(self):
+        return self.size
+
+    def _rotation(self, index):
+        return (index * ROTATION_STRIDE + self.seed) % self.block_size
+
+    def read(self, size=None):
+        remaining = self.size - self.pos
+        if size is None or size < 0:
+            size = remaining
+        index, offset = divmod(self.pos, self.block_size)
+        size = min(size, remaining, self.block_size - offset)
+        if size <= 0:
+            return b''
+        start = self._rotation(index) + offset
+        chunk = self._view[start:start + size]
+        self.pos += size
+        for value in self.hashes.values():
+            value.update(chunk)
+        if self.copy:
+            return chunk.tobytes()
+        return chunk
+
+    def __iter__(self):
+        return iter(lambda: self.read(self.block_size), b'')
+
+    def write_to(self, f):
+        """Write all remaining data to file object `f`"""
+        for chunk in self:
+            f.write(chunk)
+
+    @property
+    def digests(self):
+        return {name: value.hexdigest()
+                for name, value in self.hashes.items()}
+
+    @property
+    def digest(self):
+        """MD5 hex digest of data read so far"""
+        return self.hashes['md5'].hexdigest()
+
+
+def calc_digest(size, seed=0, algorithm='md5'):
+    """Returns hex digest of synthetic data without storing it"""
+    data = SyntheticFile(size, seed=seed, algorithms=(algorithm,))
+    for _ in data:
+        pass
+    return data.digests[algorithm]
@@ -12,44 +12,20 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import hashlib
 import json
 import logging
-import random
 import time
-import xml.etree.ElementTree as ET
 
 import pytest
 
+from mos_tests.functions import ceph_monitor
+from mos_tests.functions import checksum
 from mos_tests.functions import common
+from mos_tests.functions.synthetic_data import SyntheticFile
 
 logger = logging.getLogger(__name__)
 
 
-class FakeFile(object):
-    """Semi-random file-like object with md5 generation"""
-    chars = [chr(x) for x in range(256)]
-
-    def __init__(self, size):
-        self.size = size
-        self.pos = 0
-        self.md5 = hashlib.md5()
-
-    def read(self, size=None):
-        if size is None:
-            size = self.size - self.pos
-        else:
-            size = min(self.size - self.pos, size)
-        self.pos += size
-        chunk = random.choice(self.chars) * size
-        self.md5.update(chunk)
-        return chunk
-
-    @property
-    def digest(self):
-        return self.md5.hexdigest()
-
-
 @pytest.fixture
 def ceph_nodes_osds(env):
     controller = env.get_nodes_by_role('controller')[0]
@@ -72,21 +48,8 @@ def replication_factor(env):
     return int(storage_data['osd_pool_size']['value'])
 
 
-def get_glance_image_md5(os_conn, image):
-    md5 = hashlib.md5()
-    response, _ = os_conn.glance.http_client.get(image.file,
-                                                 log=False,
-                                                 stream=True)
-    try:
-        for chunk in response.iter_content(65536):
-            md5.update(chunk)
-    finally:
-        response.close()
-    return md5.hexdigest()
-
-
 def get_ceph_status(remote):
-    output = remote.check_call('ceph status -f json-pretty',
+    output = remote.check_call('ceph status -f json',
                                verbose=False).stdout_string
     return json.loads(output)
 
@@ -101,51 +64,31 @@ def is_ceph_time_sync(remote):
     return ok
 
 
-def up_down_nodes(controller):
-    with controller.ssh() as remote:
-        output = remote.check_call(
-            'ceph status -f xml-pretty').stdout_string
-
-    root = ET.fromstring(output)
-    nodes = int(root.find('osdmap/osdmap/num_osds').text)
-    up_nodes = int(root.find('osdmap/osdmap/num_up_osds').text)
-    return {'up': up_nodes, 'down': nodes - up_nodes}
-
-
 def ceph_nodes_down(controller, devops_nodes, osd_count):
-    down_number = up_down_nodes(controller)['down']
-    for devops_node in devops_nodes:
-        devops_node.destroy()
-    common.wait(
-        lambda: up_down_nodes(
-            controller)['down'] == down_number + osd_count,
-        timeout_seconds=600,
-        waiting_for='ceph nodes becomes down',
-        sleep_seconds=30)
+    with ceph_monitor.monitor(controller.ssh()) as monitor:
+        expected = ceph_monitor.num_down_osds(monitor.latest) + osd_count
+        for devops_node in devops_nodes:
+            devops_node.destroy()
+        monitor.wait_for(
+            lambda x: ceph_monitor.num_down_osds(x) == expected,
+            timeout_seconds=600,
+            waiting_for='ceph nodes becomes down')
 
 
 def ceph_nodes_up(controller, devops_nodes, osd_count):
-    up_number = up_down_nodes(controller)['up']
-    for devops_node in devops_nodes:
-        devops_node.start()
-    common.wait(
-        lambda: up_down_nodes(
-            controller)['up'] == up_number + osd_count,
-        timeout_seconds=600,
-        waiting_for='ceph nodes becomes up',
-        sleep_seconds=30)
-
-
-def is_replication_finished(controller):
-    with controller.ssh() as remote:
-        output = remote.check_call(
-            'ceph status -f xml-pretty').stdout_string
-    states = ET.fromstring(output).findall(
-        'pgmap/pgs_by_state/pgs_by_state_element')
-    if len(states) == 1 and states[0].find(
-            'state_name').text == 'active+clean':
-        return True
-    return False
+    with ceph_monitor.monitor(controller.ssh()) as monitor:
+        expected = monitor.latest.num_up_osds + osd_count
+        for devops_node in devops_nodes:
+            devops_node.start()
+        monitor.wait_for(
+            lambda x: x.num_up_osds == expected,
+            timeout_seconds=600,
+            waiting_for='ceph nodes becomes up')
+
+
+def wait_replication(controller, timeout_seconds=1500):
+    with ceph_monitor.monitor(controller.ssh(), interval=30) as monitor:
+        monitor.wait_clean(timeout_seconds=timeout_seconds)
 
 
 @pytest.mark.testrail_id('1295484')
@@ -169,8 +112,8 @@ def test_sync_type_on_ceph(devops_env, env, os_conn, controller_remote):
 
     size = 6 * 1024**3  # 6GB
 
-    f1 = FakeFile(size=size)
-    f2 = FakeFile(size=size)
+    f1 = SyntheticFile(size=size, seed=1)
+    f2 = SyntheticFile(size=size, seed=2)
 
     image1 = os_conn.glance.images.create(name='image1',
                                           disk_format='raw',
@@ -217,8 +160,11 @@ def test_sync_type_on_ceph(devops_env, env, os_conn, controller_remote):
                 sleep_seconds=60,
                 waiting_for='ceph monitors to detect clock sync')
 
-    assert f1.digest == get_glance_image_md5(os_conn, image1)
-    assert f2.digest == get_glance_image_md5(os_conn, image2)
+    images = [(image1, f1.digest), (image2, f2.digest)]
+    results = checksum.verify_images(os_conn.glance, images)
+    for (image, digest), result in zip(images, results):
+        assert result, 'Image {0} data MD5 differs from {1}'.format(
+            image.id, digest)
 
 
 @pytest.mark.testrail_id('1295465')
@@ -257,7 +203,7 @@ def test_data_replication_with_factor_2(
     logger.info("Upload file 20Gb to glance")
     image = os_conn.glance.images.create(
         name=name, disk_format='qcow2', container_format='bare')
-    image_file = FakeFile(size=20 * 1024 ** 3)
+    image_file = SyntheticFile(size=20 * 1024 ** 3)
     os_conn.glance.images.upload(image.id, image_file)
 
     logger.info("Enable the ceph node")
@@ -265,17 +211,14 @@ def test_data_replication_with_factor_2(
                   ceph_nodes_osds[ceph_nodes[0]])
 
     # Wait for data replication
-    common.wait(lambda: is_replication_finished(controller),
-                timeout_seconds=1500,
-                waiting_for='replication',
-                sleep_seconds=60)
+    wait_replication(controller)
 
     logger.info("Shutdown another ceph node")
     ceph_nodes_down(controller, [devops_nodes[1]],
                     ceph_nodes_osds[ceph_nodes[1]])
 
     logger.info("Check MD5 sum of the image.")
-    assert image_file.digest == get_glance_image_md5(os_conn, image)
+    assert checksum.verify_image(os_conn.glance, image, image_file.digest)
 
 
 @pytest.mark.testrail_id('1295466')
@@ -318,7 +261,7 @@ def test_data_replication_with_factor_3(
     logger.info("Upload file 20Gb to glance")
     image = os_conn.glance.images.create(
         name=name, disk_format='qcow2', container_format='bare')
-    image_file = FakeFile(size=20 * 1024 ** 3)
+    image_file = SyntheticFile(size=20 * 1024 ** 3)
     os_conn.glance.images.upload(image.id, image_file)
 
     logger.info("Enable the ceph nodes 2 and 3")
@@ -327,10 +270,7 @@ def test_data_replication_with_factor_3(
         ceph_nodes_osds[ceph_nodes[1]] + ceph_nodes_osds[ceph_nodes[2]])
 
     # Wait for data replication
-    common.wait(lambda: is_replication_finished(controller),
-                timeout_seconds=1500,
-                waiting_for='replication',
-                sleep_seconds=60)
+    wait_replication(controller)
 
     logger.info("Shutdown ceph nodes 1 and 3")
     ceph_nodes_down(
@@ -338,7 +278,7 @@ def test_data_replication_with_factor_3(
         ceph_nodes_osds[ceph_nodes[0]] + ceph_nodes_osds[ceph_nodes[2]])
 
     logger.info("Check MD5 sum of the image.")
-    assert image_file.digest == get_glance_image_md5(os_conn, image)
+    assert checksum.verify_image(os_conn.glance, image, image_file.digest)
 
     logger.info("Enable the ceph node 3")
     ceph_nodes_up(controller, [devops_nodes[2]],
@@ -349,4 +289,4 @@ def test_data_replication_with_factor_3(
                     ceph_nodes_osds[ceph_nodes[1]])
 
     logger.info("Check MD5 sum of the image.")
-    assert image_file.digest == get_glance_image_md5(os_conn, image)
+    assert checksum.verify_image(os_conn.glance, image, image_file.digest)
@@ -22,6 +22,7 @@ from tempest.lib.cli import base
 
 from mos_tests.functions import common
 from mos_tests.functions import os_cli
+from mos_tests.functions import remote_files
 
 
 def wait_for_glance_alive(os_conn):
@@ -98,17 +99,13 @@ def image_file(request):
         yield f.name
 
 
-@pytest.yield_fixture
-def image_file_remote(request, controller_remote, suffix):
+@pytest.fixture
+def image_file_remote(request, controller_remote):
     size = getattr(request, 'param', 100)  # Size in MB
-    filename = '/tmp/{}'.format(suffix[:6])
-    with controller_remote.open(filename, 'w') as f:
-        f.seek(size * (1024 ** 2))
-        f.write(' ')
-        f.flush()
-    controller_remote.execute('ls -alph {}'.format(filename))
-    yield filename
-    controller_remote.execute('rm -f {}'.format(filename))
+    # Big files are sparse to not fill controller disk
+    entropy = 'sparse' if size >= 1024 else 'random'
+    return remote_files.get_file(controller_remote, size * 1024 ** 2,
+                                 entropy=entropy).path
 
 
 @pytest.fixture
@@ -13,12 +13,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import hashlib
 import tempfile
 
 import pytest
 from tempest.lib.cli import output_parser as parser
 
+from mos_tests.functions import checksum
 from mos_tests.functions.common import wait
 from mos_tests import settings
 
@@ -48,14 +48,6 @@ def check_image_active(glance, image):
             **image_data))
 
 
-def calc_md5(filename):
-    with open(filename, 'r') as f:
-        md5 = hashlib.md5()
-        for chunk in iter(lambda: f.read(1024), ''):
-            md5.update(chunk)
-    return md5.hexdigest()
-
-
 @pytest.mark.testrail_id('542892')
 @pytest.mark.parametrize('glance_remote', [1], indirect=['glance_remote'])
 def test_update_raw_data_in_image(glance_remote, image_file_remote, suffix):
@@ -254,8 +246,8 @@ def test_image_file_equal(glance, image_file, suffix):
     with tempfile.NamedTemporaryFile() as new_file:
         new_file.write(glance('image-download {id}'.format(**image)))
         new_file.flush()
-        original_md5 = calc_md5(image_file)
-        new_md5 = calc_md5(new_file.name)
+        original_md5 = checksum.file_digests(image_file)['md5']
+        new_md5 = checksum.file_digests(new_file.name)['md5']
 
     assert original_md5 == new_md5, 'MD5 sums of images are different'
 
@@ -0,0 +1,173 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Heat engine scale benchmark
+
+Stacks from heat templates are created, updated and deleted with ramp of
+concurrent stacks (and ResourceGroup sizes). Latency distributions and
+failure rates of each action are stored as JSON files to
+HEAT_BENCHMARK_RESULTS_DIR, one file per benchmark step. Files have same
+structure, so results of different runs can be compared.
+"""
+
+import json
+import logging
+import os
+import time
+
+import pytest
+
+from mos_tests.functions import heat_stacks
+from mos_tests.functions import heat_templates
+from mos_tests import settings
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'templates')
+
+
+@pytest.fixture
+def results_dir():
+    path = settings.HEAT_BENCHMARK_RESULTS_DIR
+    if not path:
+        pytest.skip('HEAT_BENCHMARK_RESULTS_DIR is not set')
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    return path
+
+
+@pytest.yield_fixture
+def factory(os_conn):
+    stack_factory = heat_stacks.StackFactory(os_conn.heat, concurrency=1)
+    yield stack_factory
+    stack_factory.delete_all()
+
+
+def run_benchmark(factory, results_dir, scenario, concurrency, create,
+                  update=None, **params):
+    """Create, update and delete stacks and save results
+
+    :param create: dict with template (and parameters) for stacks creation
+    :param update: dict with template (and parameters) for stacks update
+    :param params: benchmark step parameters to save in results
+    """
+    factory.concurrency = concurrency
+    factory.reset_stats()
+    count = concurrency * settings.HEAT_BENCHMARK_ROUNDS
+    prefix = 'heat_benchmark_{0}_{1}'.format(scenario, int(time.time()))
+    specs = [dict(create, stack_name='{0}_{1}'.format(prefix, i))
+             for i in range(count)]
+    created = factory.create(specs)
+    completed = [x for x in created if x.status == 'CREATE_COMPLETE']
+    if update is not None:
+        factory.update(completed, **update)
+    factory.delete_all()
+
+    data = {
+        'scenario': scenario,
+        'concurrency': concurrency,
+        'stacks': count,
+        'params': params,
+        'timestamp': time.time(),
+        'actions': factory.stats(),
+        'resources': factory.resources_stats(),
+        'failures': sorted(set(x.reason for results in factory.results.values()
+                               for x in results if x.reason)),
+    }
+    name = '{0}_c{1}{2}.json'.format(
+        prefix, concurrency,
+        ''.join('_{0}{1}'.format(k, v) for k, v in sorted(params.items())))
+    path = os.path.join(results_dir, name)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    logger.info('Heat benchmark {0}: {1}'.format(name, data['actions']))
+    return data
+
+
+@pytest.mark.undestructive
+def test_random_strings(factory, results_dir):
+    """Heat engine benchmark with stacks without OpenStack resources
+
+    Steps:
+        1. Create stacks from random_str.yaml with `concurrency` stacks in
+            progress at once
+        2. Update stacks with another string length (resources replacement)
+        3. Delete stacks
+        4. Save latency and failures stats
+        5. Repeat steps 1-4 for each HEAT_BENCHMARK_CONCURRENCY value
+    """
+    template = heat_templates.get_template(TEMPLATES_DIR, 'random_str.yaml')
+    update = heat_templates.get_template(
+        TEMPLATES_DIR, 'random_str.yaml',
+        overrides={'resources.random_str1.properties': {'length': 64},
+                   'resources.random_str2.properties': {'length': 64}})
+    for concurrency in settings.HEAT_BENCHMARK_CONCURRENCY:
+        run_benchmark(factory, results_dir, 'random_strings', concurrency,
+                      create={'template': template},
+                      update={'template': update})
+
+
+@pytest.mark.undestructive
+def test_resource_group(factory, results_dir):
+    """Heat engine benchmark with nested stacks of ResourceGroup
+
+    Steps:
+        1. Create stacks from resource_group_template.yaml with `group_size`
+            members and `concurrency` stacks in progress at once
+        2. Update stacks with doubled group size
+        3. Delete stacks
+        4. Save latency and failures stats
+        5. Repeat steps 1-4 for each HEAT_BENCHMARK_GROUP_SIZES and
+            HEAT_BENCHMARK_CONCURRENCY values
+    """
+    path = 'resources.random_group.properties.count'
+    for group_size in settings.HEAT_BENCHMARK_GROUP_SIZES:
+        template = heat_templates.get_template(
+            TEMPLATES_DIR, 'resource_group_template.yaml',
+            overrides={path: group_size})
+        update = heat_templates.get_template(
+            TEMPLATES_DIR, 'resource_group_template.yaml',
+            overrides={path: group_size * 2})
+        for concurrency in settings.HEAT_BENCHMARK_CONCURRENCY:
+            run_benchmark(factory, results_dir, 'resource_group',
+                          concurrency, create={'template': template},
+                          update={'template': update}, group_size=group_size)
+
+
+@pytest.mark.undestructive
+def test_servers(os_conn, factory, results_dir):
+    """Heat engine benchmark with Neutron port and Nova server stacks
+
+    Steps:
+        1. Create stacks from heat_create_neutron_stack_template.yaml with
+            `concurrency` stacks in progress at once
+        2. Update stacks with another flavor (server resize)
+        3. Delete stacks
+        4. Save latency and failures stats
+        5. Repeat steps 1-4 for each HEAT_BENCHMARK_CONCURRENCY value
+    """
+    network = os_conn.int_networks[0]['id']
+    image = os_conn.nova.images.find(name='TestVM')
+    template = heat_templates.get_template(
+        TEMPLATES_DIR, 'heat_create_neutron_stack_template.yaml')
+    parameters = {'network': network, 'ImageId': image.id,
+                  'InstanceType': 'm1.tiny'}
+    update_parameters = dict(parameters, InstanceType='m1.small')
+    for concurrency in settings.HEAT_BENCHMARK_CONCURRENCY:
+        run_benchmark(factory, results_dir, 'servers', concurrency,
+                      create={'template': template, 'parameters': parameters},
+                      update={'template': template,
+                              'parameters': update_parameters})
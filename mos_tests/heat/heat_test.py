@@ -23,6 +23,7 @@ import pytest
 from mos_tests.functions.base import OpenStackTestCase
 from mos_tests.functions import common as common_functions
 from mos_tests.functions import file_cache
+from mos_tests.functions import heat_templates
 from mos_tests import settings
 
 from keystoneclient.v3 import Client as KeystoneClientV3
@@ -681,31 +682,23 @@ class HeatIntegrationTests(OpenStackTestCase):
         """
         stack_name = 'image_stack'
         template_name = 'cirros_image_tmpl.yaml'
-        template_path = os.path.join(self.templates_dir, template_name)
-        try:
-            create_template = common_functions.read_template(
-                self.templates_dir, template_name)
-            sid = common_functions.create_stack(
-                self.heat, stack_name, create_template)
-            self.uid_list.append(sid)
-            first_resource_id = common_functions.get_resource_id(
-                self.heat, sid)
-            format_change = {'disk_format': 'ami', 'container_format': 'ami'}
-            common_functions.update_template_file(
-                template_path, 'format', **format_change)
-            update_template = common_functions.read_template(
-                self.templates_dir, template_name)
-            common_functions.update_stack(self.heat, sid, update_template)
-            second_resource_id = common_functions.get_resource_id(
-                self.heat, sid)
-            self.assertNotEqual(first_resource_id, second_resource_id,
-                                msg='Resource id should be changed'
-                                    ' after modifying stack')
-        finally:
-            back_format_change = {'disk_format': 'qcow2',
-                                  'container_format': 'bare'}
-            common_functions.update_template_file(
-                template_path, 'format', **back_format_change)
+        create_template = common_functions.read_template(
+            self.templates_dir, template_name)
+        sid = common_functions.create_stack(
+            self.heat, stack_name, create_template)
+        self.uid_list.append(sid)
+        first_resource_id = common_functions.get_resource_id(
+            self.heat, sid)
+        update_template = heat_templates.get_template(
+            self.templates_dir, template_name, overrides={
+                'resources.cirros_image.properties.disk_format': 'ami',
+                'resources.cirros_image.properties.container_format': 'ami'})
+        common_functions.update_stack(self.heat, sid, update_template)
+        second_resource_id = common_functions.get_resource_id(
+            self.heat, sid)
+        self.assertNotEqual(first_resource_id, second_resource_id,
+                            msg='Resource id should be changed'
+                                ' after modifying stack')
 
     @pytest.mark.testrail_id('631883')
     def test_heat_stack_update_in_place(self):
@@ -720,7 +713,6 @@ class HeatIntegrationTests(OpenStackTestCase):
         """
         stack_name = 'vm_stack'
         template_name = 'nova_server.yaml'
-        template_path = os.path.join(self.templates_dir, template_name)
         try:
             networks = self.neutron.list_networks()
             if len(networks['networks']) < 2:
@@ -733,11 +725,9 @@ class HeatIntegrationTests(OpenStackTestCase):
                                                 create_template, parameters)
             first_resource_id = common_functions.get_specific_resource_id(
                 self.heat, sid, 'vm')
-            flavor_change = {'flavor': 'm1.small'}
-            common_functions.update_template_file(template_path, 'flavor',
-                                                  **flavor_change)
-            update_template = common_functions.read_template(
-                self.templates_dir, template_name)
+            update_template = heat_templates.get_template(
+                self.templates_dir, template_name,
+                overrides={'resources.vm.properties.flavor': 'm1.small'})
             common_functions.update_stack(self.heat, sid, update_template,
                                           parameters)
             second_resource_id = common_functions.get_specific_resource_id(
@@ -747,9 +737,6 @@ class HeatIntegrationTests(OpenStackTestCase):
                 msg='Resource id should not be changed after modifying stack')
         finally:
             common_functions.delete_stack(self.heat, sid)
-            back_flavor_change = {'flavor': 'm1.tiny'}
-            common_functions.update_template_file(template_path, 'flavor',
-                                                  **back_flavor_change)
 
     @pytest.mark.testrail_id('631867')
     def test_heat_stack_show(self):
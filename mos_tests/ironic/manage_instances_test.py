@@ -12,18 +12,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import json
 import logging
-import tarfile
 
 import ipaddress
 import pytest
 
 from mos_tests.environment.os_actions import OpenStackActions
 from mos_tests.functions import common
-from mos_tests.functions import file_cache
 from mos_tests.ironic import actions
 from mos_tests.ironic import conftest
+from mos_tests.ironic import testutils
 from mos_tests import settings
 
 logger = logging.getLogger(__name__)
@@ -170,30 +168,9 @@ def env2_flavors(env2_ironic_drivers_params, env2):
         flavor.delete()
 
 
-@pytest.yield_fixture
+@pytest.fixture
 def env2_ubuntu_image(env2):
-    image_name = 'ironic_trusty'
-
-    logger.info('Creating ubuntu image')
-    image = env2.os_conn.glance.images.create(
-        name=image_name,
-        disk_format='raw',
-        container_format='bare',
-        hypervisor_type='baremetal',
-        visibility='public',
-        cpu_arch='x86_64',
-        fuel_disk_info=json.dumps(settings.IRONIC_GLANCE_DISK_INFO))
-
-    with file_cache.get_file(settings.IRONIC_IMAGE_URL) as src:
-        with tarfile.open(fileobj=src, mode='r|gz') as tar:
-            img = tar.extractfile(tar.firstmember)
-            env2.os_conn.glance.images.upload(image.id, img)
-
-    logger.info('Creating ubuntu image ... done')
-
-    yield image
-
-    env2.os_conn.glance.images.delete(image.id)
+    return testutils.get_ubuntu_image(env2.os_conn)
 
 
 @pytest.mark.check_env_('has_ironic_conductor')
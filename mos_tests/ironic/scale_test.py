@@ -12,13 +12,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import json
 import logging
 
 import pytest
 
 from mos_tests import conftest
 from mos_tests.environment import devops_client
+from mos_tests.functions import ceph_drain
+from mos_tests.functions import ceph_monitor
 from mos_tests.functions import common
 from mos_tests.ironic import testutils
 
@@ -39,37 +40,11 @@ def map_interfaces(devops_env, fuel_node):
     return pairs
 
 
-def remove_ceph_from_node(remote):
-    def is_pg_clean():
-        result = remote.check_call('ceph pg stat -f json-pretty',
-                                   verbose=False)
-        pg_stat = json.loads(result.stdout_string)
-        states = pg_stat['num_pg_by_state']
-        return len(states) == 1 and states[0]['name'] == 'active+clean'
-
-    hostname = remote.check_call('hostname -f', verbose=False).stdout_string
-    result = remote.check_call('ceph report', verbose=False)
-    ceph_data = json.loads(result.stdout_string)
-    osd_ids = [x['id'] for x in ceph_data['osd_metadata']
-               if x['hostname'] == hostname]
-    for osd_id in osd_ids:
-        remote.check_call('ceph osd out {0}'.format(osd_id), verbose=False)
-    common.wait(is_pg_clean,
-                timeout_seconds=5 * 60,
-                sleep_seconds=15,
-                waiting_for='Ceph data migration to be done')
-    for osd_id in osd_ids:
-        remote.check_call("stop ceph-osd id={}".format(osd_id),
-                          verbose=False)
-        remote.check_call("ceph osd crush remove osd.{}".format(osd_id),
-                          verbose=False)
-        remote.check_call("ceph auth del osd.{}".format(osd_id),
-                          verbose=False)
-        remote.check_call("ceph osd rm osd.{}".format(osd_id),
-                          verbose=False)
-
-    remote.check_call("ceph osd crush remove {}".format(hostname),
-                      verbose=False)
+def remove_ceph_from_node(env, node):
+    controller = env.get_nodes_by_role('controller')[0]
+    with ceph_monitor.monitor(controller.ssh()) as monitor:
+        with node.ssh() as remote:
+            ceph_drain.OsdDrainer(monitor).drain([remote])
 
 
 @pytest.yield_fixture(scope='class')
@@ -202,8 +177,7 @@ class TestScale(object):
         fuel_node = [x for x in env.get_all_nodes()
                      if x.data['name'] == self.node_name][0]
         if 'ceph-osd' in roles:
-            with fuel_node.ssh() as remote:
-                remove_ceph_from_node(remote)
+            remove_ceph_from_node(env, fuel_node)
 
         env.unassign([fuel_node.id])
 
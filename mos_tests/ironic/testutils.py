@@ -16,32 +16,31 @@ import json
 import logging
 import tarfile
 
-from mos_tests.functions import file_cache
+from mos_tests.functions import image_registry
 from mos_tests import settings
 
 logger = logging.getLogger(__name__)
 
 
-def ubuntu_image(os_conn):
-    image_name = 'ironic_trusty'
+def extract_first_member(src):
+    """Returns file object for first member of tar.gz stream `src`"""
+    tar = tarfile.open(fileobj=src, mode='r|gz')
+    return tar.extractfile(tar.firstmember)
+
 
-    logger.info('Creating ubuntu image')
-    image = os_conn.glance.images.create(
-        name=image_name,
+def get_ubuntu_image(os_conn):
+    return image_registry.get_image(
+        os_conn.glance,
+        settings.IRONIC_IMAGE_URL,
+        name='ironic_trusty',
         disk_format='raw',
         container_format='bare',
+        unpack=extract_first_member,
         hypervisor_type='baremetal',
         visibility='public',
         cpu_arch='x86_64',
         fuel_disk_info=json.dumps(settings.IRONIC_GLANCE_DISK_INFO))
 
-    with file_cache.get_file(settings.IRONIC_IMAGE_URL) as src:
-        with tarfile.open(fileobj=src, mode='r|gz') as tar:
-            img = tar.extractfile(tar.firstmember)
-            os_conn.glance.images.upload(image.id, img)
-
-    logger.info('Creating ubuntu image ... done')
 
-    yield image
-
-    os_conn.glance.images.delete(image.id)
+def ubuntu_image(os_conn):
+    yield get_ubuntu_image(os_conn)
@@ -15,8 +15,6 @@
 import psycopg2
 import random
 import requests
-import socket
-import telnetlib
 import uuid
 
 from muranoclient.glance import client as glare_client
@@ -24,6 +22,8 @@ from muranoclient.v1.client import Client as MuranoClient
 
 from mos_tests.functions.common import delete_stack
 from mos_tests.functions.common import wait
+from mos_tests.functions import readiness
+from mos_tests.murano import deployments
 
 
 flavor = 'm1.medium'
@@ -67,23 +67,28 @@ class MuranoActions(object):
             environment.id, path='/{0}'.format(service['?']['id']),
             session_id=session.id)
 
-    def wait_for_deploy(self, environment):
-        def is_murano_env_deployed():
-            status = self.murano.environments.get(environment.id).status
-            if status == 'deploy failure':
-                raise Exception('Environment deploy finished with errors')
-            return status == 'ready'
-        wait(is_murano_env_deployed, timeout_seconds=1800,
-             waiting_for='environment is ready')
+    def wait_for_deploy(self, environment, watcher=None):
+        """Wait for environment deployment and log its reports
+
+        :param watcher: DeploymentWatcher created before deploy request,
+            if None - last deployment of environment is watched
+        """
+        if watcher is None:
+            watcher = deployments.DeploymentWatcher(self.murano,
+                                                    environment.id)
+        watcher.wait(timeout_seconds=1800)
+        watcher.log_phases()
 
         environment = self.murano.environments.get(environment.id)
-        logs = self.get_log(environment)
+        logs = [x.text for x in watcher.reports]
         assert 'Deployment finished' in logs
         return environment
 
     def deploy_environment(self, environment, session):
+        watcher = deployments.DeploymentWatcher(self.murano, environment.id)
+        watcher.skip_existing()
         self.murano.sessions.deploy(environment.id, session.id)
-        return self.wait_for_deploy(environment)
+        return self.wait_for_deploy(environment, watcher)
 
     def get_action_id(self, environment, name, service):
         env_data = environment.to_dict()
@@ -93,11 +98,14 @@ class MuranoActions(object):
                 return action_id
 
     def run_action(self, environment, action_id):
+        watcher = deployments.DeploymentWatcher(self.murano, environment.id)
+        watcher.skip_existing()
         self.murano.actions.call(environment.id, action_id)
-        return self.wait_for_deploy(environment)
+        return self.wait_for_deploy(environment, watcher)
 
     def status_check(self, environment, configurations, kubernetes=False,
                      negative=False):
+        targets = []
         for configuration in configurations:
             if kubernetes:
                 service_name = configuration[0]
@@ -107,8 +115,8 @@ class MuranoActions(object):
                                                       service_name)
                 if ip:
                     for port in ports:
-                        assert self.check_port_access(ip, port, negative)
-                        assert self.check_k8s_deployment(ip, port, negative)
+                        targets.append(readiness.Target(ip, port))
+                        targets.append(readiness.Target(ip, port, '/'))
                 else:
                     raise Exception("Instance {} doesn't have floating IP"
                                     .format(inst_name))
@@ -117,38 +125,29 @@ class MuranoActions(object):
                 ports = configuration[1:]
                 ip = self.get_ip_by_instance_name(environment, inst_name)
                 if ip and ports:
-                    for port in ports:
-                        assert self.check_port_access(ip, port)
+                    targets.extend(readiness.Target(ip, port)
+                                   for port in ports)
                 else:
                     raise Exception("Instance {} doesn't have floating IP"
                                     .format(inst_name))
+        # All ports are checked at once, negative check is only for
+        # kubernetes as before
+        tcp_targets = [x for x in targets if x.path is None]
+        http_targets = [x for x in targets if x.path is not None]
+        readiness.wait_ready(tcp_targets, timeout=300,
+                             negative=negative and kubernetes)
+        if http_targets:
+            readiness.wait_ready(http_targets, timeout=300, negative=negative)
 
     def check_port_access(self, ip, port, negative=False):
-        def is_port_accessible():
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            result = sock.connect_ex((str(ip), port))
-            sock.close()
-            return result == 0
-
-        return wait(lambda: not negative == is_port_accessible(),
-                    timeout_seconds=300, waiting_for='port access check')
+        readiness.wait_ready([readiness.Target(ip, port)], timeout=300,
+                             negative=negative)
+        return True
 
     def check_k8s_deployment(self, ip, port, negative=False):
-        def is_link_accessible():
-            try:
-                tn = telnetlib.Telnet(ip, port)
-                tn.write('GET / HTTP/1.0\n\n')
-                buf = tn.read_all()
-                if len(buf) != 0:
-                    tn.sock.sendall(telnetlib.IAC + telnetlib.NOP)
-                    return True
-            except socket.error:
-                    return False
-            return False
-
-        return wait(lambda: not negative == is_link_accessible(),
-                    timeout_seconds=300,
-                    waiting_for='kubernetes access check')
+        readiness.wait_ready([readiness.Target(ip, port, '/')], timeout=300,
+                             negative=negative)
+        return True
 
     def get_k8s_ip_by_instance_name(self, environment, inst_name,
                                     service_name):
@@ -216,8 +215,8 @@ class MuranoActions(object):
         ip = environment.services[0]['instance']['floatingIpAddress']
 
         if ip:
-            for port in ports:
-                self.check_port_access(ip, port)
+            readiness.wait_ready([readiness.Target(ip, port)
+                                  for port in ports], timeout=300)
         else:
             raise Exception('Docker Instance does not have floating IP')
 
@@ -288,6 +287,31 @@ class MuranoActions(object):
         volume = self.get_volume_name(environment_id)
         return self.heat.resources.get(stack.id, volume)
 
+    def docker_host(self, keypair, image='ubuntu14.04-x64-docker'):
+        post_body = {
+            "instance": {
+                "name": self.rand_name("Docker"),
+                "assignFloatingIp": True,
+                "keyname": keypair.name,
+                "flavor": flavor,
+                "image": image,
+                "availabilityZone": availability_zone,
+                "?": {
+                    "type": "io.murano.resources.LinuxMuranoInstance",
+                    "id": str(uuid.uuid4())
+                },
+            },
+            "name": "DockerVM",
+            "?": {
+                "_{id}".format(id=uuid.uuid4().hex): {
+                    "name": "Docker VM Service"
+                },
+                "type": "io.murano.apps.docker.DockerStandaloneHost",
+                "id": str(uuid.uuid4())
+            }
+        }
+        return post_body
+
     def influxdb(self, host, name='Influx', db='db1;db2'):
         post_body = {
             "host": host,
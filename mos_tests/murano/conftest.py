@@ -19,6 +19,7 @@ import uuid
 from mos_tests.functions import common
 from mos_tests.functions import os_cli
 from mos_tests.murano import actions
+from mos_tests.murano import package_registry
 
 
 flavor = 'm1.medium'
@@ -72,55 +73,35 @@ def murano_cli(controller_remote):
 
 
 @pytest.fixture
-def kubernetespod(murano_cli):
+def kubernetespod(murano):
     fqn = 'io.murano.apps.docker.kubernetes.KubernetesPod'
-    packages = murano_cli(
-        'package-import',
-        params='{0} --exists-action s'.format(fqn),
-        flags='--murano-repo-url=http://storage.apps.openstack.org').listing()
-    package = [x for x in packages if x['FQN'] == fqn][0]
-    return package
+    return package_registry.get_package(murano.murano, fqn)
+
+
+@pytest.yield_fixture(scope='session', autouse=True)
+def shared_packages():
+    """Delete shared Murano packages on session end"""
+    yield package_registry.registry
+    package_registry.registry.cleanup()
 
 
 @pytest.fixture
-def package(murano_cli, os_conn, request):
+def package(murano, request):
     package_names = getattr(request, 'param', ('DockerGrafana',))
+    fqns = []
     for name in package_names:
         if 'Docker' in name:
             name = 'apps.docker.{}'.format(name)
         elif 'Apache' in name:
             name = 'apps.apache.{}'.format(name)
-        murano_cli('package-import',
-                   params='io.murano.{} --exists-action s'.format(name),
-                   flags='--murano-repo-url=http://storage.apps.openstack.'
-                         'org').listing()
+        fqns.append('io.murano.{}'.format(name))
+    package_registry.get_packages(murano.murano, fqns)
 
 
 @pytest.fixture
 def docker(murano, keypair, environment, session):
-    docker_data = {
-        "instance": {
-            "name": murano.rand_name("Docker"),
-            "assignFloatingIp": True,
-            "keyname": keypair.name,
-            "flavor": flavor,
-            "image": docker_image,
-            "availabilityZone": 'nova',
-            "?": {
-                "type": "io.murano.resources.LinuxMuranoInstance",
-                "id": str(uuid.uuid4())
-            },
-        },
-        "name": "DockerVM",
-        "?": {
-            "_{id}".format(id=uuid.uuid4().hex): {
-                "name": "Docker VM Service"
-            },
-            "type": "io.murano.apps.docker.DockerStandaloneHost",
-            "id": str(uuid.uuid4())
-        }
-    }
-    docker = murano.create_service(environment, session, docker_data)
+    docker = murano.create_service(environment, session,
+                                   murano.docker_host(keypair, docker_image))
     return docker
 
 
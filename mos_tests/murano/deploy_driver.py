@@ -0,0 +1,170 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Concurrent deployment of several Murano environments
+
+Environments are created and filled with services in parallel, then
+deployed with limited count of simultaneous deployments. Each environment
+is deployed in own thread and followed with DeploymentWatcher, so results
+contain deployment time, state and phases of each environment.
+"""
+
+from collections import namedtuple
+import logging
+from multiprocessing.dummy import Pool
+import threading
+import time
+
+from waiting import TimeoutExpired
+
+from mos_tests.functions.stats import latency_stats
+from mos_tests.murano import deployments
+
+
+logger = logging.getLogger(__name__)
+
+DeployResult = namedtuple('DeployResult', [
+    'environment', 'state', 'error', 'duration', 'phases'])
+
+
+class DeployDriver(object):
+    """Prepare and deploy Murano environments concurrently
+
+    :param murano: MuranoActions
+    :param concurrency: max count of simultaneous deployments
+    :param timeout: timeout of each deployment in seconds
+    """
+
+    def __init__(self, murano, concurrency=5, timeout=30 * 60):
+        self.murano = murano
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        # all created environments
+        self.environments = []
+        self.results = []
+        self.started = None
+        self.finished = None
+
+    @property
+    def client(self):
+        return self.murano.murano
+
+    def _map(self, func, items):
+        if not items:
+            return []
+        pool = Pool(min(self.concurrency, len(items)))
+        try:
+            return pool.map(func, items)
+        finally:
+            pool.close()
+
+    def prepare_one(self, build):
+        """Create environment with session and add services
+
+        :param build: callable(environment, session), which adds services
+            with MuranoActions.create_service and application builders
+        :return: tuple (environment, session)
+        """
+        environment = self.client.environments.create(
+            {'name': self.murano.rand_name('MuranoEnv')})
+        with self.lock:
+            self.environments.append(environment)
+        session = self.client.sessions.configure(environment.id)
+        build(environment, session)
+        return environment, session
+
+    def prepare(self, builds):
+        """Prepare environments for all builds
+
+        :return: list of tuples (environment, session)
+        """
+        return self._map(self.prepare_one, builds)
+
+    def deploy_one(self, environment, session):
+        """Deploy environment and wait for deployment finish
+
+        Deployment failure doesn't raise, it is reported in result.
+
+        :return: DeployResult
+        """
+        watcher = deployments.DeploymentWatcher(self.client, environment.id)
+        watcher.skip_existing()
+        start = time.time()
+        self.client.sessions.deploy(environment.id, session.id)
+        error = None
+        try:
+            watcher.wait(timeout_seconds=self.timeout)
+        except (deployments.DeploymentFailed, TimeoutExpired) as e:
+            error = str(e)
+        duration = time.time() - start
+        if watcher.deployment is None:
+            state = None
+        else:
+            state = watcher.deployment.state
+        result = DeployResult(
+            environment=self.client.environments.get(environment.id),
+            state=state, error=error, duration=duration,
+            phases=watcher.phases() if watcher.deployment else [])
+        logger.info('Environment {0} deployment is {1} after '
+                    '{2:.0f}s'.format(environment.id, state, duration))
+        return result
+
+    def deploy(self, prepared):
+        """Deploy prepared environments
+
+        :param prepared: list of tuples (environment, session)
+        :return: list of DeployResult in same order
+        """
+        if self.started is None:
+            self.started = time.time()
+        results = self._map(lambda item: self.deploy_one(*item), prepared)
+        self.finished = time.time()
+        self.results.extend(results)
+        return results
+
+    def run(self, builds):
+        """Prepare and deploy environment for each build
+
+        :return: list of DeployResult in same order as builds
+        """
+        return self.deploy(self.prepare(builds))
+
+    def stats(self):
+        """Returns dict with success rate and deployment latency"""
+        succeeded = [x for x in self.results if x.error is None]
+        total = (self.finished - self.started) if self.finished else 0
+        return {
+            'environments': len(self.results),
+            'succeeded': len(succeeded),
+            'failed': len(self.results) - len(succeeded),
+            'failure_rate': (float(len(self.results) - len(succeeded)) /
+                             len(self.results) if self.results else 0),
+            'total_seconds': total,
+            'latency': latency_stats([x.duration for x in succeeded]),
+        }
+
+    def cleanup(self):
+        """Delete all created environments and their stacks"""
+        def delete(environment):
+            try:
+                self.client.environments.delete(environment.id, abandon=True)
+                self.murano.delete_stacks(environment.id)
+            except Exception as e:
+                logger.warning("Can't delete environment {0}: {1}".format(
+                    environment.id, e))
+
+        with self.lock:
+            environments, self.environments = self.environments, []
+        self._map(delete, environments)
@@ -0,0 +1,152 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Murano deployment watcher
+
+Reports of deployment are logged as soon as they appear, first report with
+`error` level fails the wait immediately. Murano API has no filter for
+reports, so watcher remembers ids of already received reports and handles
+only new ones. Time between consecutive reports is kept as deployment
+phases durations.
+"""
+
+import calendar
+from collections import namedtuple
+import logging
+import time
+
+from mos_tests.functions.common import wait
+
+
+logger = logging.getLogger(__name__)
+
+Phase = namedtuple('Phase', ['text', 'start', 'duration'])
+
+
+class DeploymentFailed(Exception):
+    pass
+
+
+def parse_time(value):
+    """Returns unix timestamp for murano time (UTC without timezone)"""
+    return calendar.timegm(time.strptime(value[:19], '%Y-%m-%dT%H:%M:%S'))
+
+
+class DeploymentWatcher(object):
+    """Follows reports of environment deployment
+
+    :param murano: murano client
+    :param environment_id: environment id
+    """
+
+    def __init__(self, murano, environment_id):
+        self.murano = murano
+        self.environment_id = environment_id
+        # ids of deployments, which were before watched one
+        self.skipped = set()
+        self.deployment = None
+        self.reports = []
+        self.seen = set()
+
+    def skip_existing(self):
+        """Remember existing deployments to watch only next one
+
+        Should be called before deploy (or action call) request.
+        """
+        self.skipped = {x.id for x in
+                        self.murano.deployments.list(self.environment_id)}
+
+    def get_deployment(self):
+        """Returns watched deployment (newest not skipped one) or None"""
+        deployments = [x for x in
+                       self.murano.deployments.list(self.environment_id)
+                       if x.id not in self.skipped]
+        if self.deployment is not None:
+            deployments = [x for x in deployments
+                           if x.id == self.deployment.id]
+        if not deployments:
+            return None
+        self.deployment = max(deployments, key=lambda x: x.created)
+        return self.deployment
+
+    def fetch(self):
+        """Get and log new reports
+
+        :return: list of new reports
+        """
+        reports = self.murano.deployments.reports(self.environment_id,
+                                                  self.deployment.id)
+        new_reports = sorted((x for x in reports if x.id not in self.seen),
+                             key=lambda x: x.created)
+        for report in new_reports:
+            self.seen.add(report.id)
+            self.reports.append(report)
+            logger.info('Environment {0} deployment [{1.level}]: '
+                        '{1.text}'.format(self.environment_id, report))
+            if report.level == 'error':
+                raise DeploymentFailed(
+                    'Environment {0} deployment failed: {1}'.format(
+                        self.environment_id, report.text))
+        return new_reports
+
+    def poll(self):
+        """Returns True if deployment is finished"""
+        # Reports are got after state, so all reports of finished
+        # deployment are received
+        deployment = self.get_deployment()
+        if deployment is None:
+            return False
+        self.fetch()
+        return deployment.state != 'running'
+
+    def wait(self, timeout_seconds=1800):
+        """Wait for deployment to be finished successfully
+
+        :return: deployment
+        """
+        wait(self.poll, timeout_seconds=timeout_seconds,
+             sleep_seconds=(1, 15, 2),
+             waiting_for='environment {0} deployment to be '
+                         'finished'.format(self.environment_id))
+        if self.deployment.state != 'success':
+            raise DeploymentFailed(
+                'Environment {0} deployment state is {1}'.format(
+                    self.environment_id, self.deployment.state))
+        return self.deployment
+
+    def phases(self):
+        """Returns list of Phase (seconds from first report and duration)"""
+        if not self.reports:
+            return []
+        times = [parse_time(x.created) for x in self.reports]
+        end = times[-1]
+        finished = getattr(self.deployment, 'finished', None)
+        if finished:
+            end = max(end, parse_time(finished))
+        return [Phase(text=report.text, start=start - times[0],
+                      duration=next_start - start)
+                for report, start, next_start
+                in zip(self.reports, times, times[1:] + [end])]
+
+    def log_phases(self, count=10):
+        phases = self.phases()
+        if not phases:
+            return
+        logger.info('Environment {0} deployment took {1}s, longest '
+                    'phases:'.format(self.environment_id,
+                                     phases[-1].start + phases[-1].duration))
+        for phase in sorted(phases, key=lambda x: x.duration,
+                            reverse=True)[:count]:
+            logger.info('  {0.duration}s (at {0.start}s): '
+                        '{0.text}'.format(phase))
@@ -0,0 +1,222 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Session wide registry of Murano packages
+
+Package archives are got from Murano apps repository through files cache.
+Dependencies are read from package manifests and all archives of the next
+dependencies level are downloaded in parallel. Packages are imported with
+Murano API (dependencies first) only once per session.
+
+Imported packages are tagged with `SHARED_TAG` and archive digest tag, so
+package with same FQN and other content is reimported. Packages, which were
+in Murano before (not tagged), are reused as is, like murano CLI does with
+`--exists-action s`. All packages imported by registry are deleted on
+session end.
+"""
+
+from collections import OrderedDict
+import json
+import logging
+from multiprocessing.dummy import Pool
+import threading
+import zipfile
+
+from muranoclient.common import exceptions as murano_exc
+import yaml
+
+from mos_tests.functions import checksum
+from mos_tests.functions import file_cache
+from mos_tests import settings
+
+logger = logging.getLogger(__name__)
+
+SHARED_TAG = 'mos-tests-shared'
+DIGEST_TAG_PREFIX = 'sha256-'
+
+
+def package_url(fqn, repo_url=settings.MURANO_REPO_URL):
+    return '{0}/apps/{1}.zip'.format(repo_url, fqn)
+
+
+def bundle_url(name, repo_url=settings.MURANO_REPO_URL):
+    return '{0}/bundles/{1}.bundle'.format(repo_url, name)
+
+
+def read_requirements(path):
+    """Returns list of FQNs of packages required by package archive"""
+    with zipfile.ZipFile(path) as archive:
+        manifest = yaml.safe_load(archive.read('manifest.yaml'))
+    return list((manifest or {}).get('Require') or {})
+
+
+class PackageFile(object):
+    """Downloaded package archive"""
+
+    def __init__(self, fqn, url):
+        self.fqn = fqn
+        self.url = url
+        self.path = file_cache.get_file_path(url)
+        digest = file_cache.get_cache().digest(url)
+        if digest is None:
+            digest = checksum.file_digests(self.path, ('sha256',))['sha256']
+        self.digest = digest
+        self.requirements = read_requirements(self.path)
+
+    @property
+    def tag(self):
+        return DIGEST_TAG_PREFIX + self.digest
+
+
+class PackageRegistry(object):
+    """Imports shared packages to Murano and deletes them on cleanup
+
+    :param repo_url: Murano apps repository url
+    :param processes: count of parallel downloads
+    """
+
+    def __init__(self, repo_url=settings.MURANO_REPO_URL, processes=4):
+        self.repo_url = repo_url
+        self.processes = processes
+        self.lock = threading.Lock()
+        # {fqn: PackageFile}
+        self.files = {}
+        # {package id: murano client} in import order
+        self.imported = OrderedDict()
+
+    def fetch(self, fqns):
+        """Download archives of packages and all their dependencies
+
+        :return: list of FQNs in import order (dependencies first)
+        """
+        pending = list(fqns)
+        while pending:
+            new = sorted(set(x for x in pending if x not in self.files))
+            if not new:
+                break
+            pool = Pool(min(self.processes, len(new)))
+            try:
+                files = pool.map(
+                    lambda fqn: PackageFile(fqn,
+                                            package_url(fqn, self.repo_url)),
+                    new)
+            finally:
+                pool.close()
+            pending = []
+            for package_file in files:
+                self.files[package_file.fqn] = package_file
+                pending.extend(package_file.requirements)
+
+        order = []
+        visiting = set()
+
+        def visit(fqn):
+            if fqn in order or fqn in visiting:
+                return
+            visiting.add(fqn)
+            for requirement in self.files[fqn].requirements:
+                visit(requirement)
+            order.append(fqn)
+
+        for fqn in fqns:
+            visit(fqn)
+        return order
+
+    def find(self, murano, fqn):
+        """Returns package with `fqn` from Murano or None"""
+        for package in murano.packages.filter(fqn=fqn):
+            if package.fully_qualified_name == fqn:
+                return package
+        return None
+
+    def import_package(self, murano, fqn):
+        """Import package archive if there is no actual package in Murano"""
+        package_file = self.files[fqn]
+        package = self.find(murano, fqn)
+        if package is not None:
+            if SHARED_TAG not in package.tags or package_file.tag in (
+                    package.tags):
+                logger.info('Reuse Murano package {0}'.format(fqn))
+                return package
+            logger.info('Shared package {0} is outdated'.format(fqn))
+            self.imported.setdefault(package.id, murano)
+            self.delete(package.id)
+
+        logger.info('Import Murano package {0}'.format(fqn))
+        try:
+            with open(package_file.path, 'rb') as f:
+                package = murano.packages.create(
+                    {'tags': [SHARED_TAG, package_file.tag]}, {fqn: f})
+        except murano_exc.HTTPConflict:
+            # Imported simultaneously by another process
+            return self.find(murano, fqn)
+        self.imported[package.id] = murano
+        return package
+
+    def get_packages(self, murano, fqns):
+        """Returns dict {fqn: package} for packages and their dependencies
+
+        :param murano: murano client
+        :param fqns: list of packages fully qualified names
+        """
+        with self.lock:
+            return {fqn: self.import_package(murano, fqn)
+                    for fqn in self.fetch(fqns)}
+
+    def get_bundle(self, murano, name):
+        """Import all packages of bundle from repository
+
+        :return: dict {fqn: package}
+        """
+        path = file_cache.get_file_path(bundle_url(name, self.repo_url))
+        with open(path) as f:
+            bundle = json.load(f)
+        return self.get_packages(murano,
+                                 [x['Name'] for x in bundle['Packages']])
+
+    def delete(self, package_id):
+        murano = self.imported.pop(package_id)
+        try:
+            murano.packages.delete(package_id)
+        except murano_exc.HTTPNotFound:
+            logger.debug('Shared package {0} is already deleted'.format(
+                package_id))
+
+    def cleanup(self):
+        """Delete all packages imported by registry
+
+        Packages are deleted in reverse import order, so dependencies are
+        deleted last.
+        """
+        with self.lock:
+            for package_id in reversed(list(self.imported)):
+                logger.info('Delete shared package {0}'.format(package_id))
+                try:
+                    self.delete(package_id)
+                except Exception as e:
+                    logger.warning("Can't delete shared package {0}: "
+                                   "{1}".format(package_id, e))
+
+
+registry = PackageRegistry()
+
+
+def get_package(murano, fqn):
+    """Returns shared package from session registry"""
+    return registry.get_packages(murano, [fqn])[fqn]
+
+
+def get_packages(murano, fqns):
+    """Returns dict {fqn: shared package} from session registry"""
+    return registry.get_packages(murano, fqns)
@@ -0,0 +1,84 @@
+#    Copyright 2016 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+
+import pytest
+
+from mos_tests.murano import actions
+from mos_tests.murano.deploy_driver import DeployDriver
+from mos_tests.murano import package_registry
+from mos_tests import settings
+
+
+logger = logging.getLogger(__name__)
+
+pytestmark = pytest.mark.undestructive
+
+
+@pytest.yield_fixture(scope='module')
+def nginx_environments(os_conn):
+    """Deploy several environments with Docker Nginx concurrently
+
+    Environments are deployed once and shared by all tests of module.
+    """
+    murano = actions.MuranoActions(os_conn)
+    package_registry.get_package(murano.murano,
+                                 'io.murano.apps.docker.DockerNginx')
+    keypair = os_conn.create_key(key_name='murano-scale-key')
+
+    def build(environment, session):
+        host = murano.create_service(environment, session,
+                                     murano.docker_host(keypair))
+        murano.create_service(environment, session, murano.nginx(host))
+
+    driver = DeployDriver(murano,
+                          concurrency=settings.MURANO_DEPLOY_CONCURRENCY)
+    try:
+        driver.run([build] * settings.MURANO_SCALE_ENVIRONMENTS)
+        logger.info('Murano deployments stats: {0}'.format(driver.stats()))
+        yield murano, driver
+    finally:
+        driver.cleanup()
+        os_conn.delete_key(key_name=keypair.name)
+
+
+def test_concurrent_deploy(nginx_environments):
+    """Deploy several environments simultaneously
+
+    Scenario:
+        1. Create MURANO_SCALE_ENVIRONMENTS environments with Docker host and
+            Nginx in parallel
+        2. Deploy environments, not more than MURANO_DEPLOY_CONCURRENCY at
+            once
+        3. Check that all deployments are successful
+    """
+    murano, driver = nginx_environments
+    errors = [x.error for x in driver.results if x.error is not None]
+    assert not errors, 'Some deployments are failed: {0}'.format(errors)
+
+
+def test_concurrent_deploy_apps_accessible(nginx_environments):
+    """Check applications of simultaneously deployed environments
+
+    Scenario:
+        1. Take environments deployed in parallel
+        2. Check that at least one environment is deployed
+        3. Check that ports 22 and 80 are accessible on each Docker host
+    """
+    murano, driver = nginx_environments
+    deployed = [x for x in driver.results if x.error is None]
+    assert deployed, 'No environments are deployed'
+    for result in deployed:
+        murano.deployment_success_check(result.environment, ports=[22, 80])
@@ -32,10 +32,10 @@ from selenium.webdriver.common import by
 from selenium.webdriver.support import expected_conditions as EC  # noqa
 from selenium.webdriver.support import ui
 from six.moves import configparser
-from six.moves.urllib import request
 from xvfbwrapper import Xvfb
 
 from mos_tests.functions import common
+from mos_tests.functions import image_registry
 from mos_tests import settings
 
 
@@ -690,23 +690,15 @@ class TestDeployEnvInNetwork(base.ApplicationTestCase):
         self.os_conn.cleanup_network(networks_to_skip=net_names)
 
     @classmethod
-    @pytest.yield_fixture(scope='class')
-    def apache_image(cls):
-        image_properties = {
-            'murano_image_info': '{"type": "linux", "title": "testDeploy"}'
-        }
-        image = cls.glance.images.create(name="testDeploy",
-                                         disk_format='qcow2',
-                                         container_format='bare',
-                                         properties=image_properties)
-
-        image.update(data=request.urlopen(settings.MURANO_IMAGE_URL))
+    @pytest.fixture(scope='class')
+    def apache_image(cls, os_conn):
+        image = image_registry.get_image(
+            os_conn.glance,
+            settings.MURANO_IMAGE_URL,
+            name="testDeploy",
+            murano_image_info='{"type": "linux", "title": "testDeploy"}')
         cls.apache_image_id = image.id
 
-        yield
-
-        cls.glance.images.delete(image.id)
-
     @pytest.yield_fixture
     def apache_package(self, apache_image, murano):
         app_name = 'ApacheHTTPServer'
@@ -16,18 +16,20 @@ from collections import defaultdict
 from collections import namedtuple
 from contextlib import contextmanager
 import logging
-import re
 import signal
-import subprocess
 import threading
+import time
 
 from neutronclient.common.exceptions import InternalServerError
 import pytest
 from six.moves.queue import Empty
 from six.moves.queue import Queue
 
+from mos_tests.functions import capture
 from mos_tests.functions.common import wait
 from mos_tests.functions import network_checks
+from mos_tests.functions import ping_stats
+from mos_tests.functions import prober
 from mos_tests.neutron.python_tests.base import TestBase
 from mos_tests import settings
 
@@ -35,43 +37,23 @@ from mos_tests import settings
 logger = logging.getLogger(__name__)
 
 
-def get_ping_seq(line):
-    """Return ping seq"""
-    seq = re.search(r'seq=(\d+) ', line)
-    if seq is None:
-        return None
-    return int(seq.group(1))
-
-
-def ping_groups(stdout):
+def ping_groups(stdout, timeline=None):
     """Generate ping info for each line of stdout
 
     Format:
         * `sent` - count of sent packets
         * `received` - count of received packets
         * `group_len` - len of last continuous group of success pings
+
+    :param timeline: PingTimeline to fill with replies
     """
     PingInfo = namedtuple('PingInfo', ['sent', 'received', 'group_len'])
-    prev_seq = -1
-    group_start = 0
-    received = 0
-    start_seq = None
-    for line in stdout:
-        logger.debug('Ping result: {}'.format(line.strip()))
-        seq = get_ping_seq(line)
-        if seq is None:
-            continue
-        if start_seq is None:
-            start_seq = seq
-        received += 1
-        if seq != prev_seq + 1:
-            logger.debug('ping interrupted')
-            group_start = seq
-        sent = seq - start_seq
-        pi = PingInfo(sent=sent, received=received,
-                      group_len=seq - group_start)
-        yield pi
-        prev_seq = seq
+    if timeline is None:
+        timeline = ping_stats.PingTimeline()
+    for tl in timeline.follow(stdout):
+        yield PingInfo(sent=tl.last_seq - tl.first_seq,
+                       received=tl.received,
+                       group_len=tl.group_len - 1)
 
 
 class PingThread(threading.Thread):
@@ -123,42 +105,37 @@ class TestL3HA(TestBase):
     def background_ping_from_host(self, ip_to_ping, recover_pings=50):
         """Start ping from host to `ip_to_ping` before enter and stop it after
 
-        Return dict with ping stat
+        Return dict with ping stat, `timeline` key contains PingTimeline
+        with all replies
 
-        :param ip_to_ping: ip address to ping from `vm`
+        :param ip_to_ping: ip address to ping from host
+        :param recover_pings: count of continuous replies to determine that
+            connect is restored
         """
-
-        result = {}
-
         logger.info('Start ping on {0}'.format(ip_to_ping))
-        proc = subprocess.Popen(['ping', ip_to_ping], stdout=subprocess.PIPE)
-        try:
-            proc.stdout.readline()
-            output = []
-            for line_count in range(10):
-                output.append(proc.stdout.readline().strip())
+        with prober.background_probe([ip_to_ping], interval=1) as timelines:
+            timeline = timelines[ip_to_ping]
+            result = {'timeline': timeline}
+            wait(lambda: timeline.received >= 10,
+                 timeout_seconds=60,
+                 waiting_for='ping replies from {0}'.format(ip_to_ping))
 
             yield result
-            # terminate ping subprocess and fill analyzed result
+
             logger.info('Wait for ping restored')
-            for line_count in range(recover_pings):
-                output.append(proc.stdout.readline().strip())
-            proc.terminate()
-            output += proc.communicate()[0].split('\n')
-            groups = ping_groups(output)
-            for ping_info in groups:
-                result['received'] = ping_info.received
-                result['sent'] = ping_info.sent
-        finally:
-            if proc.returncode is None:
-                proc.kill()
+            wait(lambda: timeline.group_len >= recover_pings,
+                 timeout_seconds=recover_pings + 5 * 60,
+                 waiting_for='ping to {0} restored'.format(ip_to_ping))
+        result['received'] = timeline.received
+        result['sent'] = timeline.sent
 
     @contextmanager
     def background_ping(self, vm, vm_keypair, ip_to_ping, good_pings=50,
                         proxy_node=None):
         """Start ping from `vm` to `ip_to_ping` before enter and stop it after
 
-        Return dict with ping stat
+        Return dict with ping stat, `timeline` key contains PingTimeline
+        with all replies
 
         :param vm: instance to ping from
         :param vm_keypair: keypair to connect to `vm`
@@ -166,9 +143,11 @@ class TestL3HA(TestBase):
         :param good_pings: count of continuous pings to determine that connect
             is restored
         """
+        timeline = ping_stats.PingTimeline()
         result = {
             'received': 0,
             'sent': 0,
+            'timeline': timeline,
         }
 
         with self.os_conn.ssh_to_instance(self.env, vm, vm_keypair,
@@ -177,7 +156,7 @@ class TestL3HA(TestBase):
             logger.info('Start ping on {0}'.format(ip_to_ping))
             t.start()
 
-            groups = ping_groups(t.iter_output())
+            groups = ping_groups(t.iter_output(), timeline=timeline)
 
             # Wait for 20 not interrupted packets
             for ping_info in groups:
@@ -627,40 +606,9 @@ class TestL3HA(TestBase):
             9. Stop tcpdump
             10. Check that tcpdump results and active l3 agents statuses
             11. Check that ping lost less than 50 packets
+            12. Check that longest ping outage is less than 50 seconds and
+                ping is recovered after ban
         """
-        def start_tcpdump_in_background(node, router_id, active_qg_iface_id):
-            """Start tcpdump on l3ha-router provided port.
-
-            :param node: node on which start tcpdump
-            :param router_id: router id on which start tcpdump
-            :param active_qg_iface_id: interface id on which start tcpdump
-            """
-            logger.info('Start tcpdump on {0}'.format(node.data['fqdn']))
-            cmd_for_tcpdump = (
-                'ip netns exec qrouter-{router_id} '
-                'tcpdump -n -l -tttt -i {qg_port_id} icmp '
-                '<&- >/tmp/tcpdump.log 2>&1 &'.format(
-                    router_id=router_id, qg_port_id=active_qg_iface_id))
-
-            with node.ssh() as remote:
-                remote.check_call(cmd_for_tcpdump)
-
-        def get_last_package_datetime(node):
-            """Get last package time from tcpdump log on provided node
-
-            :param node: node on which we need to analyze log
-            :return: last time from log or None, if log is empty
-            """
-            with node.ssh() as remote:
-                res = remote.execute("grep 'ICMP echo reply' /tmp/tcpdump.log")
-                if res['exit_code'] != 0:
-                    return None
-                res = remote.execute(
-                    "grep 'ICMP echo reply' /tmp/tcpdump.log | "
-                    "tail -1 | cut -d ' ' -f 1,2")
-                last_checked = res['stdout'][0].strip()
-                return last_checked
-
         instance = self.os_conn.nova.servers.find(name="server02")
         instance_ip = (
             self.os_conn.get_nova_instance_ips(instance)['floating'])
@@ -678,38 +626,47 @@ class TestL3HA(TestBase):
             active_l3_qg_port_for_router_id[:11])
 
         # Start tcpdump on all controllers
-        for controller in controllers:
-            start_tcpdump_in_background(controller, router_id,
-                                        active_qg_iface_id)
-        # Ban l3 agent
-        with self.background_ping_from_host(
-                ip_to_ping=instance_ip) as ping_result:
-            with controllers[0].ssh() as remote:
-                logger.info("Ban active l3 agent")
-                remote.check_call(
-                    "pcs resource ban neutron-l3-agent {0}".format(
-                        active_hostname))
-                new_active_agent = self.wait_router_rescheduled(
-                    router_id=router['router']['id'],
-                    from_node=active_hostname)
-                new_active_hostname = new_active_agent['host']
-
-        # kill tcpdump on controllers
-        for controller in controllers:
-            logger.info('Killing tcpdump on {0}'.format(
-                controller.data['fqdn']))
-            with controller.ssh() as remote:
-                remote.execute('killall tcpdump')
+        remotes = {x.data['fqdn']: x.ssh() for x in controllers}
+        with capture.capture(
+                remotes,
+                args='-i {0} icmp'.format(active_qg_iface_id),
+                prefix='ip netns exec qrouter-{0}'.format(router_id)) as dump:
+            # Ban l3 agent
+            with self.background_ping_from_host(
+                    ip_to_ping=instance_ip) as ping_result:
+                with controllers[0].ssh() as remote:
+                    logger.info("Ban active l3 agent")
+                    ban_time = time.time()
+                    remote.check_call(
+                        "pcs resource ban neutron-l3-agent {0}".format(
+                            active_hostname))
+                    new_active_agent = self.wait_router_rescheduled(
+                        router_id=router['router']['id'],
+                        from_node=active_hostname)
+                    new_active_hostname = new_active_agent['host']
 
         # check that l3 active agents matching with tcpdump results
-        last_active_node = self.env.find_node_by_fqdn(active_hostname)
-        new_active_node = self.env.find_node_by_fqdn(new_active_hostname)
-        last_tcpdump_results = get_last_package_datetime(last_active_node)
-        new_tcpdump_results = get_last_package_datetime(new_active_node)
+        last_replies = dump.last_echo_reply()
+        last_tcpdump_results = last_replies[active_hostname]
+        new_tcpdump_results = last_replies[new_active_hostname]
         assert (last_tcpdump_results and new_tcpdump_results) is not None
         assert last_tcpdump_results < new_tcpdump_results
+        gap = dump.gap(active_hostname, new_active_hostname,
+                       proto=capture.PROTO_ICMP,
+                       icmp_type=capture.ICMP_ECHO_REPLY)
+        logger.info('Echo replies gap during failover is {0}s'.format(gap))
         assert (ping_result['sent'] - ping_result['received']) < 50
 
+        timeline = ping_result['timeline']
+        logger.info('Ping during failover: {0}'.format(timeline.stats()))
+        outage = timeline.longest_outage
+        assert outage is None or outage.duration < 50, (
+            'Ping outage is too long: {0}'.format(outage))
+        recovery_time = timeline.recovery_time(since=ban_time)
+        assert recovery_time is not None, (
+            'Ping is not recovered after l3 agent ban')
+        logger.info('Ping recovered in {0:.1f}s'.format(recovery_time))
+
     def reschedule_active_l3_agt(self, router_id,
                                  to_controller, from_controller):
         if to_controller != from_controller:
@@ -12,16 +12,17 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import csv
 import itertools
 import logging
 from random import randint
 import re
 
+from contextlib2 import ExitStack
 import pytest
 
 from mos_tests.functions import common
-from mos_tests.functions import file_cache
+from mos_tests.functions import image_registry
+from mos_tests.functions import iperf
 from mos_tests.neutron.python_tests import base
 from mos_tests import settings
 
@@ -29,18 +30,16 @@ logger = logging.getLogger(__name__)
 pytestmark = pytest.mark.undestructive
 
 BOOT_MARKER = 'INSTANCE BOOT COMPLETED'
-TCP_PORT = 5002
-UDP_PORT = 5003
+TCP_PORT = iperf.TCP_PORT
+UDP_PORT = iperf.UDP_PORT
 
 
 def wait_instances_to_boot(os_conn, instances):
     common.wait(lambda: all(os_conn.is_server_active(x) for x in instances),
                 timeout_seconds=5 * 60,
                 waiting_for="instances became to active state")
-    common.wait(
-        lambda: all(BOOT_MARKER in x.get_console_output() for x in instances),
-        timeout_seconds=5 * 60,
-        waiting_for="instances to be ready")
+    os_conn.wait_marker_in_servers_log(instances, BOOT_MARKER,
+                                       timeout=5 * 60)
 
 
 def delete_ports_policy(os_conn):
@@ -63,18 +62,12 @@ def delete_net_policy(os_conn):
             os_conn.delete_qos_policy(policy_id)
 
 
-@pytest.yield_fixture(scope='class')
+@pytest.fixture(scope='class')
 def iperf_image_id(os_conn):
-    logger.info('Creating ubuntu image')
-    image = os_conn.glance.images.create(name="image_ubuntu",
-                                         disk_format='qcow2',
-                                         container_format='bare')
-    with file_cache.get_file(settings.UBUNTU_QCOW2_URL) as f:
-        os_conn.glance.images.upload(image.id, f)
-
-    logger.info('Ubuntu image created')
-    yield image.id
-    os_conn.glance.images.delete(image.id)
+    image = image_registry.get_image(os_conn.glance,
+                                     settings.UBUNTU_QCOW2_URL,
+                                     name="image_ubuntu")
+    return image.id
 
 
 @pytest.fixture(scope='class')
@@ -183,40 +176,6 @@ class TestQoSBase(base.TestBase):
             wait_for_active=False,
             wait_for_avaliable=False)
 
-    def get_iperf_result(self,
-                         remote,
-                         server_ip,
-                         time=80,
-                         interval=20,
-                         udp=False):
-        interval = min(interval, time)
-        port = UDP_PORT if udp else TCP_PORT
-        if udp:
-            cmd = ('iperf -u -c {ip} -p {port} -x CDMS -y C -t {time} '
-                   '-i {interval} --bandwidth 10M')
-        else:
-            cmd = 'iperf -c {ip} -p {port} -y C -t {time} -i {interval}'
-        result = remote.check_call(cmd.format(ip=server_ip,
-                                              port=port,
-                                              time=time,
-                                              interval=interval))
-        assert not result['stderr'], 'Error during iperf execution, {}'.format(
-            result)
-        if udp:
-            # Show only server report
-            stdout = result['stdout'][-1:]
-        else:
-            stdout = result['stdout']
-            # Exclude summary
-            if len(stdout) > 1:
-                stdout = stdout[:-1]
-            # Strip first result, because it almost always too high
-            if len(stdout) > 1:
-                stdout = stdout[1:]
-        reader = csv.reader(stdout)
-        for line in reader:
-            yield line
-
     def check_iperf_bandwidth(self,
                               client,
                               server,
@@ -229,13 +188,29 @@ class TestQoSBase(base.TestBase):
                 client,
                 username='ubuntu',
                 vm_keypair=self.instance_keypair) as remote:
-            for line in self.get_iperf_result(remote, server_ip, **kwargs):
-                bandwidth = int(line[8])
-                if bandwidth < 0.75 * limit:
-                    raise Exception(
-                        'Bandwidth is too low: {0}, limit is {1}'.format(
-                            bandwidth, limit))
-                assert bandwidth <= limit * 1.05
+            result = iperf.run_iperf(remote, server_ip, **kwargs)
+        result.check_bandwidth(limit)
+
+    def run_iperf_pairs(self, pairs, ip_type='fixed', **kwargs):
+        """Run iperf between all (client, server) pairs simultaneously
+
+        Pairs should not share limited port, otherwise they share its
+        bandwidth.
+
+        :return: list of IperfResult in same order as pairs
+        """
+        with ExitStack() as stack:
+            iperf_pairs = []
+            for client, server in pairs:
+                server_ip = self.os_conn.get_nova_instance_ips(
+                    server)[ip_type]
+                remote = stack.enter_context(self.os_conn.ssh_to_instance(
+                    self.env,
+                    client,
+                    username='ubuntu',
+                    vm_keypair=self.instance_keypair))
+                iperf_pairs.append((remote, server_ip))
+            return iperf.run_iperf_pairs(iperf_pairs, **kwargs)
 
 
 @pytest.mark.check_env_('has_1_or_more_computes')
@@ -353,17 +328,10 @@ class TestTraficBetweenComputes(DifferentComputesInstancesMixin, TestQoSBase):
         """
 
         instance1, instance2 = instances
-        with pytest.raises(AssertionError):
-            self.check_iperf_bandwidth(instance1,
-                                       instance2,
-                                       limit=4000 * 1024,
-                                       time=20)
-
-        with pytest.raises(AssertionError):
-            self.check_iperf_bandwidth(instance2,
-                                       instance1,
-                                       limit=4000 * 1024,
-                                       time=20)
+        pairs = [(instance1, instance2), (instance2, instance1)]
+        for result in self.run_iperf_pairs(pairs, time=20):
+            with pytest.raises(AssertionError):
+                result.check_bandwidth(4000 * 1024)
 
         instance1_ip = os_conn.get_nova_instance_ips(instance1)['fixed']
         port1 = os_conn.get_port_by_fixed_ip(instance1_ip)
@@ -391,9 +359,9 @@ class TestTraficBetweenComputes(DifferentComputesInstancesMixin, TestQoSBase):
         os_conn.neutron.update_port(
             port2['id'], {'port': {'qos_policy_id': policy2['policy']['id']}})
 
-        self.check_iperf_bandwidth(instance1, instance2, limit=3000 * 1024)
-
-        self.check_iperf_bandwidth(instance2, instance1, limit=4000 * 1024)
+        result1, result2 = self.run_iperf_pairs(pairs)
+        result1.check_bandwidth(3000 * 1024)
+        result2.check_bandwidth(4000 * 1024)
 
     @pytest.mark.testrail_id('838310')
     def test_restrictions_on_net_and_vm(self, instances, os_conn,
@@ -499,25 +467,17 @@ class TestTraficBetweenComputes(DifferentComputesInstancesMixin, TestQoSBase):
         })
 
         instance1, instance2 = instances
-        with pytest.raises(AssertionError):
-            self.check_iperf_bandwidth(instance1,
-                                       instance2,
-                                       limit=3000 * 1024,
-                                       time=20)
-
-        with pytest.raises(AssertionError):
-            self.check_iperf_bandwidth(instance2,
-                                       instance1,
-                                       limit=3000 * 1024,
-                                       time=20)
+        pairs = [(instance1, instance2), (instance2, instance1)]
+        for result in self.run_iperf_pairs(pairs, time=20):
+            with pytest.raises(AssertionError):
+                result.check_bandwidth(3000 * 1024)
         # Update net with policy
         os_conn.neutron.update_network(
             self.net['network']['id'],
             {'network': {'qos_policy_id': policy1['policy']['id']}})
 
-        self.check_iperf_bandwidth(instance1, instance2, limit=3000 * 1024)
-
-        self.check_iperf_bandwidth(instance2, instance1, limit=3000 * 1024)
+        for result in self.run_iperf_pairs(pairs):
+            result.check_bandwidth(3000 * 1024)
 
 
 @pytest.mark.check_env_('is_qos_enabled')
@@ -19,6 +19,7 @@ from six.moves import configparser
 
 from mos_tests.environment.os_actions import OpenStackActions
 from mos_tests.functions import common as common_functions
+from mos_tests.functions import nova_bulk
 from mos_tests.neutron.python_tests.base import TestBase
 
 
@@ -41,28 +42,22 @@ def instances_on_diff_computes(
     netid = [net['id'] for net in nets if not net['router:external'] and
              net['name'] == 'admin_internal_net'][0]
 
-    instances = []
+    params_list = []
     for i in range(param['count']):
         compute = compute_hosts.pop(0)
         compute_hosts.append(compute)  # add back in list pop-ed value
-        # create instances
-        instance = os_conn.create_server(
+        params_list.append(dict(
             name='server%02d' % i,
             availability_zone='{}:{}'.format(zone.zoneName, compute),
             key_name=keypair.name,
             nics=[{'net-id': netid}],
-            security_groups=[security_group.id],
-            wait_for_active=False,
-            wait_for_avaliable=False)
-        instances.append(instance)
-    os_conn.wait_servers_active(instances)
-    os_conn.wait_servers_ssh_ready(instances)
-    # add floating IP to each instance
-    floating_ips = []
-    for instance in instances:
-        floating_ip = os_conn.nova.floating_ips.create()
-        floating_ips.append(floating_ip)
-        instance.add_floating_ip(floating_ip.ip)
+            security_groups=[security_group.id]))
+    # create instances and add floating IP to each instance
+    bulk = nova_bulk.ServersBulk(os_conn)
+    instances = bulk.wait_ready(bulk.create_each(params_list),
+                                floating_ip=True)
+    bulk.log_stats()
+    floating_ips = list(bulk.floating_ips.values())
     yield instances
     if 'undestructive' in request.node.keywords:
         for instance in instances:
@@ -23,6 +23,7 @@ from six.moves import configparser
 
 from mos_tests.conftest import ubuntu_image_id as ubuntu_image_id_base
 from mos_tests.functions import common
+from mos_tests.functions import nova_bulk
 from mos_tests.functions import service
 
 logger = logging.getLogger(__name__)
@@ -171,26 +172,27 @@ class TestLiveMigrationBase(object):
             assert len(create_args) == instances_count
         else:
             create_args = [{}] * instances_count
+        params_list = []
         for i in range(instances_count):
-            kwargs = create_args[i]
-            instance = self.os_conn.create_server(
+            params = dict(
                 name='server%02d' % i,
-                image_id=image_id,
+                image=image_id,
                 userdata=userdata,
                 flavor=flavor,
                 availability_zone=zone,
                 key_name=self.keypair.name,
                 nics=[{'net-id': self.network['network']['id']}],
-                security_groups=[self.security_group.id],
-                wait_for_active=False,
-                wait_for_avaliable=False,
-                **kwargs)
-            self.instances.append(instance)
-        self.os_conn.wait_servers_active(self.instances)
-
-        if userdata is None:
-            self.os_conn.wait_servers_ssh_ready(self.instances)
-        else:
+                security_groups=[self.security_group.id])
+            params.update(create_args[i])
+            params_list.append(params)
+        bulk = nova_bulk.ServersBulk(self.os_conn)
+        first = len(self.instances)
+        self.instances.extend(bulk.create_each(params_list))
+        self.instances[first:] = bulk.wait_ready(self.instances[first:],
+                                                 ssh=userdata is None)
+        bulk.log_stats()
+
+        if userdata is not None:
             self.os_conn.wait_marker_in_servers_log(self.instances,
                                                     marker=boot_marker)
 
@@ -16,25 +16,19 @@ import logging
 
 import pytest
 
-from mos_tests.functions import file_cache
+from mos_tests.functions import image_registry
 from mos_tests import settings
 
 logger = logging.getLogger(__name__)
 pytestmark = pytest.mark.undestructive
 
 
-@pytest.yield_fixture
+@pytest.fixture
 def ubuntu_image_id(os_conn):
-    logger.info('Creating ubuntu image')
-    image = os_conn.glance.images.create(name="image_ubuntu",
-                                         disk_format='qcow2',
-                                         container_format='bare')
-    with file_cache.get_file(settings.UBUNTU_QCOW2_URL) as f:
-        os_conn.glance.images.upload(image.id, f)
-
-    logger.info('Ubuntu image created')
-    yield image.id
-    os_conn.glance.images.delete(image.id)
+    image = image_registry.get_image(os_conn.glance,
+                                     settings.UBUNTU_QCOW2_URL,
+                                     name="image_ubuntu")
+    return image.id
 
 
 @pytest.yield_fixture
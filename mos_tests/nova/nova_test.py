@@ -13,8 +13,6 @@
 #    under the License.
 
 import logging
-import re
-import subprocess
 from time import sleep
 from time import time
 
@@ -27,8 +25,9 @@ from six.moves import configparser
 from mos_tests.environment.ssh import SSHClient
 from mos_tests.functions.base import OpenStackTestCase
 from mos_tests.functions import common as common_functions
-from mos_tests.functions import file_cache
+from mos_tests.functions import image_registry
 from mos_tests.functions import network_checks
+from mos_tests.functions import prober
 from mos_tests.functions import service
 from mos_tests.neutron.python_tests.base import TestBase
 from mos_tests import settings
@@ -523,47 +522,44 @@ class NovaIntegrationTests(OpenStackTestCase):
                        self.nova.hypervisors.list()}
         old_hyper = getattr(instance, "OS-EXT-SRV-ATTR:hypervisor_hostname")
         new_hyper = [h for h in hypervisors.keys() if h != old_hyper][0]
-        # Start ping of the vm in background
-        ping = subprocess.Popen(["/bin/ping", "-c20", "-i1", ip_to_ping],
-                                stdout=subprocess.PIPE)
-        # Then run the migration
-        try:
-            instance.live_migrate(new_hyper,
-                                  block_migration=True,
-                                  disk_over_commit=False)
-        except BadRequest:
-            instance.live_migrate(new_hyper,
-                                  block_migration=False,
-                                  disk_over_commit=False)
-
-        # Check that migration is over, usually it takes about 10-15 seconds
-        def instance_hypervisor():
-            instance.get()
-            return getattr(instance, "OS-EXT-SRV-ATTR:hypervisor_hostname")
-
-        common_functions.wait(lambda: instance_hypervisor() == new_hyper,
-                              timeout_seconds=timeout * 60,
-                              waiting_for='instance hypervisor to be changed')
+        # Ping the vm in background during migration
+        with prober.background_probe([ip_to_ping], interval=1) as timelines:
+            try:
+                instance.live_migrate(new_hyper,
+                                      block_migration=True,
+                                      disk_over_commit=False)
+            except BadRequest:
+                instance.live_migrate(new_hyper,
+                                      block_migration=False,
+                                      disk_over_commit=False)
+
+            # Check that migration is over, usually it takes about 10-15
+            # seconds
+            def instance_hypervisor():
+                instance.get()
+                return getattr(instance,
+                               "OS-EXT-SRV-ATTR:hypervisor_hostname")
+
+            common_functions.wait(
+                lambda: instance_hypervisor() == new_hyper,
+                timeout_seconds=timeout * 60,
+                waiting_for='instance hypervisor to be changed')
         self.assertEqual(instance.status, 'ACTIVE')
 
-        # Now wait till background ping is over
-        ping.wait()
         # And check that vm was reachable during migration
-        output = re.search(r'(\d+)% packet loss', ping.stdout.read())
-        loss = int(output.group(1))
-        if loss > 90:
+        timeline = timelines[ip_to_ping]
+        logger.info('Ping during migration: {0}'.format(timeline.stats()))
+        if timeline.loss_percent > 90:
             msg = "Packets loss during migration {}% exceeds the 90% limit"
-            raise AssertionError(msg.format(loss))
+            raise AssertionError(msg.format(timeline.loss_percent))
 
         # And now sure that vm is stable after the migration
-        ping = subprocess.Popen(["/bin/ping", "-c300", "-i0.4",
-                                ip_to_ping], stdout=subprocess.PIPE)
-        ping.wait()
-        output = re.search('([0-9]+)% packet loss', ping.stdout.read())
-        loss = int(output.group(1))
-        if loss > 10:
+        timeline = prober.probe([ip_to_ping], count=300,
+                                interval=0.4)[ip_to_ping]
+        logger.info('Ping after migration: {0}'.format(timeline.stats()))
+        if timeline.loss_percent > 10:
             msg = "Packets loss during stability {}% exceeds the 10% limit"
-            raise AssertionError(msg.format(loss))
+            raise AssertionError(msg.format(timeline.loss_percent))
 
     @pytest.mark.testrail_id('843882')
     def test_boot_instance_from_volume_bigger_than_flavor_size(self):
@@ -878,17 +874,12 @@ class TestNovaDeferredDelete(TestBase):
 @pytest.mark.undestructive
 class TestBugVerification(TestBase):
 
-    @pytest.yield_fixture
+    @pytest.fixture
     def ubuntu_image_id(self, os_conn):
-        logger.info('Creating ubuntu image')
-        image = os_conn.glance.images.create(name="image_ubuntu",
-                                             disk_format='qcow2',
-                                             container_format='bare')
-        with file_cache.get_file(settings.UBUNTU_QCOW2_URL) as f:
-            os_conn.glance.images.upload(image.id, f)
-        logger.info('Ubuntu image created')
-        yield image.id
-        os_conn.glance.images.delete(image.id)
+        image = image_registry.get_image(os_conn.glance,
+                                         settings.UBUNTU_QCOW2_URL,
+                                         name="image_ubuntu")
+        return image.id
 
     @pytest.yield_fixture
     def flavors(self, os_conn):
@@ -13,16 +13,15 @@
 #    under the License.
 
 import logging
-import ntpath
 import os
 import random
-import tempfile
 
 import pytest
 from six.moves import configparser
 from swiftclient import client
 
 from mos_tests.functions import os_cli
+from mos_tests.functions import remote_files
 
 logger = logging.getLogger(__name__)
 
@@ -79,18 +78,12 @@ def s3cmd_create_container(s3cmd_client):
         pass
 
 
-@pytest.yield_fixture
+@pytest.fixture
 def create_file_on_node(ctrl_remote, request):
     """Creates tmp file with requested size"""
     size_mb = getattr(request, 'param', 111)
-    _, f_path = tempfile.mkstemp(prefix='ObjStor_')
-    f_name = ntpath.basename(f_path)
-    cmd = 'fallocate -l {0}M {1}'.format(size_mb, f_path)
-    ctrl_remote.check_call(cmd)
-    yield f_path, f_name
-    # delete file
-    cmd = 'rm -rf {0}'.format(f_path)
-    ctrl_remote.check_call(cmd)
+    remote_file = remote_files.get_file(ctrl_remote, size_mb * 1024 ** 2)
+    return remote_file.path, remote_file.name
 
 
 @pytest.yield_fixture(scope='class')
@@ -35,11 +35,21 @@ PUBLIC_TEST_IP = os.environ.get('PUBLIC_TEST_IP', '8.8.8.8')
 
 # Path to folder with required images
 TEST_IMAGE_PATH = os.environ.get("TEST_IMAGE_PATH", os.path.expanduser('~/images'))  # noqa
+# Max size of files cache in GB (0 - unlimited)
+TEST_IMAGE_CACHE_SIZE_GB = float(os.environ.get('TEST_IMAGE_CACHE_SIZE_GB', 0))
+# Don't check cached files for update during this time (in hours)
+TEST_IMAGE_TRUST_HOURS = float(os.environ.get('TEST_IMAGE_TRUST_HOURS', 0))
 UBUNTU_QCOW2_URL = 'https://cloud-images.ubuntu.com/trusty/current/trusty-server-cloudimg-amd64-disk1.img'  # noqa
 FEDORA_QCOW2_URL = 'https://download.fedoraproject.org/pub/fedora/linux/releases/23/Cloud/x86_64/Images/Fedora-Cloud-Base-23-20151030.x86_64.qcow2'  # noqa
 WIN_SERVER_QCOW2 = 'windows_server_2012_r2_standard_eval_kvm_20140607.qcow2'
 UBUNTU_URL = 'http://archive.ubuntu.com/ubuntu/dists/trusty/main/installer-amd64/current/images/netboot/mini.iso'  # noqa
 
+# Way to reach instances fixed ips through DHCP namespace on controllers:
+# 'nc' - start `nc` in namespace for each connection,
+# 'forwarder' - use one persistent forwarding agent per node and namespace
+# SSH readiness checks always use 'forwarder'
+NETNS_PROXY_MODE = os.environ.get('NETNS_PROXY_MODE', 'nc')
+
 CONSOLE_LOG_LEVEL = os.environ.get('LOG_LEVEL', logging.DEBUG)
 
 # Openstack Apache proxy config file
@@ -62,6 +72,8 @@ MURANO_PACKAGE_DEPS_NAMES = (
     'Kubernetes Cluster',
     'Kubernetes Pod',
 )
+MURANO_REPO_URL = os.environ.get('MURANO_REPO_URL',
+                                 'http://storage.apps.openstack.org')
 MURANO_IMAGE_URL = 'http://storage.apps.openstack.org/images/debian-8-m-agent.qcow2'  # noqa
 MURANO_PACKAGE_URL = 'http://storage.apps.openstack.org/apps/io.murano.apps.apache.ApacheHttpServer.zip'  # noqa
 MURANO_BUNDLE_URL = 'http://storage.apps.openstack.org/bundles/docker-n-kubernetes.bundle'  # noqa
@@ -72,6 +84,28 @@ MURANO_PACKAGE_BUNDLE_NAMES = (
     'Kubernetes Pod',
 )
 MURANO_BUNDLE_NAME = "docker-n-kubernetes"
+# Count of environments for Murano concurrent deployment tests
+MURANO_SCALE_ENVIRONMENTS = int(os.environ.get('MURANO_SCALE_ENVIRONMENTS', 3))
+# Max count of simultaneous Murano deployments
+MURANO_DEPLOY_CONCURRENCY = int(os.environ.get('MURANO_DEPLOY_CONCURRENCY', 3))
+
+###########################
+# Heat benchmark settings #
+###########################
+
+# Directory to store heat benchmark results (JSON files).
+# Benchmark tests are skipped if it is not set.
+HEAT_BENCHMARK_RESULTS_DIR = os.environ.get('HEAT_BENCHMARK_RESULTS_DIR')
+# Counts of concurrent stacks for ramp
+HEAT_BENCHMARK_CONCURRENCY = [
+    int(x) for x in
+    os.environ.get('HEAT_BENCHMARK_CONCURRENCY', '1,5,10').split(',')]
+# Counts of resources in ResourceGroup
+HEAT_BENCHMARK_GROUP_SIZES = [
+    int(x) for x in
+    os.environ.get('HEAT_BENCHMARK_GROUP_SIZES', '2,10,50').split(',')]
+# Count of stacks per one concurrent stack slot
+HEAT_BENCHMARK_ROUNDS = int(os.environ.get('HEAT_BENCHMARK_ROUNDS', 3))
 
 ###################
 # Ironic settings #